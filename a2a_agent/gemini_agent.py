@@ -82,6 +82,7 @@ class Agent(LlmAgent):
             • Delete a financial goal
             • Get a list of bank partners
             • Get a list of partners a specific user can benefit from
+            • Check partner eligibility for many users at once
             • Create a new schedule
 
             **Response Style:**
@@ -117,6 +118,8 @@ class Agent(LlmAgent):
             ft.get_user_networth,
             ft.get_user_cashflow,
             ft.get_user_average_cashflow,
+            ft.get_user_forecast,
+            ft.get_user_summary,
             ft.get_user_goals,
             ft.update_user_goal,
             ft.create_user_account,
@@ -125,12 +128,14 @@ class Agent(LlmAgent):
             ft.delete_user_goal,
             ft.get_bank_partners,
             ft.get_user_eligible_partners,
+            ft.get_partner_eligibility,
             ft.create_user_schedule,
             ft.get_user_schedules,
             ft.update_user_schedule,
             ft.delete_user_schedule,
             ft.get_all_advisors,
             ft.get_advisors_by_type,
+            ft.get_advisor_free_slots,
             ft.schedule_meeting,
             ft.get_user_meetings,
             ft.cancel_meeting,
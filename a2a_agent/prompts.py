@@ -182,7 +182,7 @@ print(get_advisors_by_type('investment_advisor'))
 **User:** "Schedule a meeting with an advisor"
 **Response:** "I'll help you schedule a meeting."
 <tool_code>
-print(schedule_meeting(meeting_data={'user_id': 'user-001', 'advisor_id': 'adv-001', 'advisor_name': 'John Smith', 'advisor_type': 'financial_planner', 'meeting_time': '2024-12-20T10:00:00'}))
+print(schedule_meeting(meeting_data={'user_id': 'user-001', 'advisor_id': 'adv-mortgage-001', 'advisor_name': 'Alice Johnson', 'advisor_type': 'Mortgage', 'meeting_time': '2024-12-23T10:00:00'}))
 </tool_code>
 
 **User:** "Show my scheduled meetings"
@@ -2,11 +2,43 @@
 
 import os
 import requests
-from typing import Union, Optional
+from typing import List, Optional, Union
 import tempfile
+import threading
+from collections import OrderedDict
 
 API_BASE_URL = os.environ.get("API_BASE_URL", "https://backend-ep2-879168005744.us-west1.run.app/api")
 
+# Last body and ETag seen per GET, so unchanged data is revalidated with a 304
+# instead of being downloaded and parsed again
+_ETAG_CACHE_SIZE = 256
+_etag_cache = OrderedDict()
+_etag_cache_lock = threading.Lock()
+
+def _cached_get(url: str, params: Optional[dict] = None):
+    """
+    GETs `url` with If-None-Match when a previous response carried an ETag,
+    and returns the parsed JSON body (the cached one on a 304).
+    """
+    key = (url, tuple(sorted((params or {}).items())))
+    with _etag_cache_lock:
+        cached = _etag_cache.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(url, params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        with _etag_cache_lock:
+            _etag_cache.move_to_end(key)
+        return cached[1]
+    body = response.json()
+    etag = response.headers.get("ETag")
+    if response.status_code == 200 and etag:
+        with _etag_cache_lock:
+            _etag_cache[key] = (etag, body)
+            _etag_cache.move_to_end(key)
+            if len(_etag_cache) > _ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return body
+
 def get_user_profile(user_id: str) -> dict:
     """
     Gets a user's profile.
@@ -14,8 +46,7 @@ def get_user_profile(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}")
 
 def get_user_accounts(user_id: str) -> dict:
     """
@@ -24,8 +55,7 @@ def get_user_accounts(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/accounts")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/accounts")
 
 def get_user_transactions(user_id: str) -> dict:
     """
@@ -34,8 +64,7 @@ def get_user_transactions(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/transactions")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/transactions")
 
 def get_user_debts(user_id: str) -> dict:
     """
@@ -44,8 +73,7 @@ def get_user_debts(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/debts")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/debts")
 
 def get_user_investments(user_id: str) -> dict:
     """
@@ -54,8 +82,7 @@ def get_user_investments(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/investments")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/investments")
 
 def get_user_networth(user_id: str) -> dict:
     """
@@ -64,8 +91,7 @@ def get_user_networth(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/networth")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/networth")
 
 def get_user_cashflow(user_id: str) -> dict:
     """
@@ -74,8 +100,7 @@ def get_user_cashflow(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/cashflow")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/cashflow")
 
 def get_user_average_cashflow(user_id: str) -> dict:
     """
@@ -84,8 +109,28 @@ def get_user_average_cashflow(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/average_cashflow")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/average_cashflow")
+
+def get_user_forecast(user_id: str, months: int = 12) -> dict:
+    """
+    Projects the user's account balances over the coming months from their recurring schedules.
+    
+    Required Inputs:
+    - user_id (str): The unique identifier for the user (e.g., 'user-001')
+    - months (int): Number of calendar months to project, current month first (default: 12)
+    """
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/forecast", params={"months": months})
+
+def get_user_summary(user_id: str) -> dict:
+    """
+    Retrieves a user's whole financial picture in one call: profile, accounts,
+    debts, investments, net worth, 30-day cash flow, average monthly cash flow,
+    goals and schedules.
+    
+    Required Inputs:
+    - user_id (str): The unique identifier for the user (e.g., 'user-001')
+    """
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/summary")
 
 def get_user_goals(user_id: str) -> dict:
     """
@@ -94,8 +139,7 @@ def get_user_goals(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/goals")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/goals")
 
 def update_user_goal(goal_id: str, goal_data: dict) -> dict:
     """
@@ -134,8 +178,7 @@ def get_user_transactions_with_history(user_id: str, history_days: int = 30) ->
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     - history_days (int): Number of days to look back (default: 30)
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/transactions", params={"history": history_days})
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/transactions", params={"history": history_days})
 
 def create_user_goal(goal_data: dict) -> dict:
     """
@@ -293,8 +336,7 @@ def get_bank_partners() -> dict:
     Required Inputs:
     - None (no parameters required)
     """
-    response = requests.get(f"{API_BASE_URL}/partners")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/partners")
 
 def get_user_eligible_partners(user_id: str) -> dict:
     """
@@ -303,7 +345,16 @@ def get_user_eligible_partners(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/partners/user/{user_id}")
+    return _cached_get(f"{API_BASE_URL}/partners/user/{user_id}")
+
+def get_partner_eligibility(user_ids: Optional[List[str]] = None) -> dict:
+    """
+    Returns the partners each of many users can benefit from in one call, e.g. to plan a campaign.
+    
+    Required Inputs:
+    - user_ids (list, optional): User identifiers (e.g., ['user-001', 'user-002']); omit for every user
+    """
+    response = requests.post(f"{API_BASE_URL}/partners/eligibility", json={"user_ids": user_ids or []})
     return response.json()
 
 def create_user_schedule(schedule_data: dict, user_id: str) -> dict:
@@ -331,8 +382,7 @@ def get_user_schedules(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/users/{user_id}/schedules")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/users/{user_id}/schedules")
 
 def update_user_schedule(schedule_id: str, schedule_data: dict) -> dict:
     """
@@ -363,8 +413,7 @@ def get_all_advisors() -> dict:
     Required Inputs:
     - None (no parameters required)
     """
-    response = requests.get(f"{API_BASE_URL}/advisors")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/advisors")
 
 def get_advisors_by_type(advisor_type: str) -> dict:
     """
@@ -374,8 +423,21 @@ def get_advisors_by_type(advisor_type: str) -> dict:
     - advisor_type (str): The type of advisor specialization
         Examples: 'financial_planner', 'investment_advisor', 'tax_advisor'
     """
-    response = requests.get(f"{API_BASE_URL}/advisors/{advisor_type}")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/advisors/{advisor_type}")
+
+def get_advisor_free_slots(advisor_id: str, start: Optional[str] = None, days: int = 7) -> dict:
+    """
+    Gets the times an advisor is still free to meet, in UTC.
+    
+    Required Inputs:
+    - advisor_id (str): The unique identifier for the advisor (e.g., 'adv-mortgage-001')
+    - start (str, optional): First day to look at, 'YYYY-MM-DD' (default: today)
+    - days (int): Number of days to look ahead (default: 7)
+    """
+    params = {"days": days}
+    if start:
+        params["start"] = start
+    return _cached_get(f"{API_BASE_URL}/advisors/{advisor_id}/free_slots", params=params)
 
 def schedule_meeting(meeting_data: dict) -> dict:
     """
@@ -385,11 +447,13 @@ def schedule_meeting(meeting_data: dict) -> dict:
     - meeting_data (dict): Dictionary containing meeting information
         Example: {
             'user_id': 'user-001',
-            'advisor_id': 'adv-001',
-            'advisor_name': 'John Smith',
-            'advisor_type': 'financial_planner',
-            'meeting_time': '2024-12-20T10:00:00'
+            'advisor_id': 'adv-mortgage-001',
+            'advisor_name': 'Alice Johnson',
+            'advisor_type': 'Mortgage',
+            'meeting_time': '2024-12-23T10:00:00',
+            'duration_minutes': 60
         }
+    Returns an error (409) if the advisor already has a meeting at that time.
     """
     response = requests.post(f"{API_BASE_URL}/meetings", json=meeting_data)
     return response.json()
@@ -401,8 +465,7 @@ def get_user_meetings(user_id: str) -> dict:
     Required Inputs:
     - user_id (str): The unique identifier for the user (e.g., 'user-001')
     """
-    response = requests.get(f"{API_BASE_URL}/meetings/{user_id}")
-    return response.json()
+    return _cached_get(f"{API_BASE_URL}/meetings/{user_id}")
 
 def cancel_meeting(meeting_id: str) -> dict:
     """
@@ -554,6 +617,18 @@ def get_tool_prompt() -> str:
     print(get_user_average_cashflow(user_id='user-001'))
     </tool_code>
 
+    **User:** "What will my balances look like in six months?"
+    **Response:** "I'll project your balances from your scheduled transfers."
+    <tool_code>
+    print(get_user_forecast(user_id='user-001', months=6))
+    </tool_code>
+
+    **User:** "How am I doing financially?"
+    **Response:** "I'll pull together an overview of your finances."
+    <tool_code>
+    print(get_user_summary(user_id='user-001'))
+    </tool_code>
+
     **Debts & Investments:**
     **User:** "Show my current debts"
     **Response:** "I'll retrieve your debt information."
@@ -605,6 +680,12 @@ def get_tool_prompt() -> str:
     print(get_user_eligible_partners(user_id='user-001'))
     </tool_code>
 
+    **User:** "Which customers should we target for the SecureHome Mortgage offer?"
+    **Response:** "I'll check partner eligibility across all users."
+    <tool_code>
+    print(get_partner_eligibility())
+    </tool_code>
+
     **Schedules:**
     **User:** "Create a monthly savings schedule"
     **Response:** "I'll set up a monthly savings schedule for you."
@@ -643,10 +724,16 @@ def get_tool_prompt() -> str:
     print(get_advisors_by_type('investment_advisor'))
     </tool_code>
 
+    **User:** "When is the mortgage advisor free this week?"
+    **Response:** "I'll look up the advisor's open time slots."
+    <tool_code>
+    print(get_advisor_free_slots(advisor_id='adv-mortgage-001'))
+    </tool_code>
+
     **User:** "Schedule a meeting with an advisor"
     **Response:** "I'll help you schedule a meeting."
     <tool_code>
-    print(schedule_meeting(meeting_data={'user_id': 'user-001', 'advisor_id': 'adv-001', 'advisor_name': 'John Smith', 'advisor_type': 'financial_planner', 'meeting_time': '2024-12-20T10:00:00'}))
+    print(schedule_meeting(meeting_data={'user_id': 'user-001', 'advisor_id': 'adv-mortgage-001', 'advisor_name': 'Alice Johnson', 'advisor_type': 'Mortgage', 'meeting_time': '2024-12-23T10:00:00'}))
     </tool_code>
 
     **User:** "Show my scheduled meetings"
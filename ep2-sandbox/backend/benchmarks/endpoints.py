@@ -0,0 +1,315 @@
+# backend/benchmarks/endpoints.py
+
+"""
+Latency and throughput of the API's endpoints at several dataset sizes.
+
+For each size, a synthetic dataset is generated (`generate_data.py`) with a
+fixed number of transactions per user, loaded into a store, and every
+scenario below is requested through `main.app` in-process over httpx's ASGI
+transport, so no server or network is involved. Each scenario reports p50 and
+p99 latency and throughput per size, and a scaling exponent: the slope of
+log(p50) against log(total transactions) across the sizes.
+
+Per-user endpoints should not slow down as other users' data grows, so their
+exponent should stay near 0; an endpoint that goes back to scanning every row
+shows up with an exponent near 1. Scenarios that are expected to grow with the
+dataset (e.g. listing every user) are marked `global` and only compared
+against the baseline.
+
+Results are written as JSON. Pass an earlier result as `--baseline` to list
+the scenarios that got slower, or whose exponent rose, since then; the exit
+status is 1 if any did. Run from `backend/code`:
+
+    python ../benchmarks/endpoints.py --sizes 1000 4000 16000
+    python ../benchmarks/endpoints.py --sizes 1000 4000 16000 --baseline ../benchmarks/results/endpoints-abc1234.json
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import orjson
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "..", "code"))
+
+from core.store import DataStore, Store, set_store
+from generate_data import DEFAULT_CSV, DEFAULT_SOURCE, JsonSink, SQLiteSink, Templates, generate
+from main import app
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# A scenario regresses if its p50 grows by more than this fraction...
+P50_TOLERANCE = 0.25
+# ...or its scaling exponent rises by more than this
+EXPONENT_TOLERANCE = 0.3
+# Exponent above which a per-user scenario is reported as scaling with the dataset
+PER_USER_EXPONENT_LIMIT = 0.5
+
+
+@dataclass
+class Scenario:
+    router: str
+    name: str
+    method: str
+    path: str
+    params: Optional[dict] = None
+    body: Optional[dict] = None
+    # "user": should cost O(that user's rows); "global": expected to grow with the dataset
+    scale: str = "user"
+
+
+def scenarios() -> List[Scenario]:
+    """Requests to time; `{user_id}` and `{advisor_id}` are filled in per request."""
+    today = datetime.now(timezone.utc).date()
+    next_year = (today + timedelta(days=365)).isoformat()
+    return [
+        Scenario("users", "get_user", "GET", "/api/users/{user_id}"),
+        Scenario("users", "list_users", "GET", "/api/users", scale="global"),
+        Scenario("accounts", "user_accounts", "GET", "/api/users/{user_id}/accounts"),
+        Scenario("goals", "user_goals", "GET", "/api/goals/{user_id}"),
+        Scenario("goals", "create_goal", "POST", "/api/goals", body={
+            "user_id": "{user_id}", "description": "Benchmark goal", "target_amount": 1000.0,
+            "target_date": next_year, "current_amount_saved": 0.0}),
+        Scenario("transactions", "user_transactions", "GET", "/api/users/{user_id}/transactions",
+                 params={"history": 365}),
+        Scenario("transactions", "user_transactions_page", "GET", "/api/users/{user_id}/transactions",
+                 params={"history": 365, "limit": 20}),
+        Scenario("financials", "debts", "GET", "/api/users/{user_id}/debts"),
+        Scenario("financials", "investments", "GET", "/api/users/{user_id}/investments"),
+        Scenario("financials", "networth", "GET", "/api/users/{user_id}/networth"),
+        Scenario("financials", "cashflow", "GET", "/api/users/{user_id}/cashflow"),
+        Scenario("financials", "average_cashflow", "GET", "/api/users/{user_id}/average_cashflow"),
+        Scenario("financials", "cashflow_range", "GET", "/api/users/{user_id}/cashflow/range",
+                 params={"start": (today - timedelta(days=90)).isoformat()}),
+        Scenario("financials", "spending", "GET", "/api/users/{user_id}/spending",
+                 params={"group_by": "category", "start": (today - timedelta(days=365)).isoformat()}),
+        Scenario("financials", "forecast", "GET", "/api/users/{user_id}/forecast"),
+        Scenario("partners", "user_partners", "GET", "/api/partners/user/{user_id}"),
+        Scenario("partners", "eligibility", "POST", "/api/partners/eligibility", body={"user_ids": ["{user_id}"]}),
+        Scenario("schedule", "user_schedules", "GET", "/api/users/{user_id}/schedules"),
+        Scenario("meeting", "user_meetings", "GET", "/api/meetings/{user_id}"),
+        Scenario("meeting", "free_slots", "GET", "/api/advisors/{advisor_id}/free_slots", params={"days": 14}),
+        Scenario("summary", "user_summary", "GET", "/api/users/{user_id}/summary"),
+    ]
+
+
+def fill(value, names: Dict[str, str]):
+    if isinstance(value, str):
+        return value.format(**names)
+    if isinstance(value, dict):
+        return {k: fill(v, names) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, names) for v in value]
+    return value
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def build_store(backend: str, directory: str, users: int, per_user: int, seed: int) -> Store:
+    templates = Templates(DEFAULT_SOURCE, DEFAULT_CSV)
+    if backend == "sqlite":
+        from core.sqlite_store import SQLiteStore
+
+        path = os.path.join(directory, "cymbal.sqlite3")
+        generate(SQLiteSink(path), templates, users, users * per_user, seed=seed)
+        return SQLiteStore(path)
+    generate(JsonSink(directory), templates, users, users * per_user, seed=seed)
+    return DataStore(directory, fsync=False)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, user_ids: List[str], advisor_ids: List[str],
+                       requests: int, warmup: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    targets = [{"user_id": rng.choice(user_ids), "advisor_id": rng.choice(advisor_ids)}
+               for _ in range(warmup + requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def send(names: Dict[str, str], record: bool):
+        started = time.perf_counter()
+        response = await client.request(scenario.method, fill(scenario.path, names),
+                                        params=fill(scenario.params, names), json=fill(scenario.body, names))
+        elapsed = time.perf_counter() - started
+        if record:
+            latencies.append(elapsed)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    # Warm-up requests build the derived views the endpoint reads from
+    for names in targets[:warmup]:
+        await send(names, record=False)
+
+    pending = iter(targets[warmup:])
+
+    async def worker():
+        for names in pending:
+            await send(names, record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "router": scenario.router,
+        "scenario": scenario.name,
+        "scale": scenario.scale,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "throughput_rps": round(requests / elapsed, 1),
+        "statuses": statuses,
+    }
+
+
+async def run_size(store: Store, args) -> List[dict]:
+    set_store(store)
+    user_ids = [user["user_id"] for user in store.all("users")]
+    advisor_ids = [advisor["advisor_id"] for advisor in store.all("advisors")]
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for i, scenario in enumerate(scenarios()):
+            if args.only and scenario.router not in args.only and scenario.name not in args.only:
+                continue
+            results.append(await run_scenario(client, scenario, user_ids, advisor_ids, args.requests,
+                                              args.warmup, args.concurrency, args.seed + i))
+    return results
+
+
+def scaling_exponent(points: List[tuple]) -> Optional[float]:
+    """Least-squares slope of log(p50) over log(size)."""
+    points = [(math.log(size), math.log(p50)) for size, p50 in points if size > 0 and p50 > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / spread, 3)
+
+
+def summarize(runs: List[dict]) -> Dict[str, dict]:
+    """Per scenario: its exponent and p50 at the largest size."""
+    by_scenario: Dict[str, dict] = {}
+    for run in runs:
+        for result in run["results"]:
+            key = f"{result['router']}/{result['scenario']}"
+            entry = by_scenario.setdefault(key, {"scale": result["scale"], "points": []})
+            entry["points"].append((run["transactions"], result["p50_ms"]))
+    return {
+        key: {
+            "scale": entry["scale"],
+            "exponent": scaling_exponent(entry["points"]),
+            "largest_p50_ms": max(entry["points"])[1],
+        }
+        for key, entry in by_scenario.items()
+    }
+
+
+def regressions(summary: Dict[str, dict], baseline: Optional[Dict[str, dict]]) -> List[str]:
+    found = []
+    for key, entry in summary.items():
+        exponent = entry["exponent"]
+        if entry["scale"] == "user" and exponent is not None and exponent > PER_USER_EXPONENT_LIMIT:
+            found.append(f"{key}: scales with the dataset (exponent {exponent})")
+        before = (baseline or {}).get(key)
+        if before is None:
+            continue
+        if before["exponent"] is not None and exponent is not None \
+                and exponent > before["exponent"] + EXPONENT_TOLERANCE:
+            found.append(f"{key}: exponent {before['exponent']} -> {exponent}")
+        if entry["largest_p50_ms"] > before["largest_p50_ms"] * (1 + P50_TOLERANCE):
+            found.append(f"{key}: p50 {before['largest_p50_ms']}ms -> {entry['largest_p50_ms']}ms")
+    return found
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000], help="Users per dataset")
+    parser.add_argument("--transactions-per-user", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario and size")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="Routers or scenario names to run")
+    parser.add_argument("--output", help="Result file (default: results/endpoints-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    runs = []
+    for users in sorted(args.sizes):
+        with tempfile.TemporaryDirectory() as directory:
+            store = build_store(args.backend, directory, users, args.transactions_per_user, args.seed)
+            try:
+                results = asyncio.run(run_size(store, args))
+            finally:
+                set_store(None)
+        transactions = users * args.transactions_per_user
+        runs.append({"users": users, "transactions": transactions, "results": results})
+        print(f"\n{users} users, {transactions} transactions")
+        print(f"{'scenario':<40} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        for result in results:
+            print(f"{result['router'] + '/' + result['scenario']:<40} {result['p50_ms']:>9.3f} "
+                  f"{result['p99_ms']:>9.3f} {result['throughput_rps']:>9.1f}")
+
+    summary = summarize(runs)
+    print(f"\n{'scenario':<40} {'exponent':>9}")
+    for key, entry in summary.items():
+        exponent = "-" if entry["exponent"] is None else f"{entry['exponent']:.3f}"
+        print(f"{key + (' (global)' if entry['scale'] == 'global' else ''):<40} {exponent:>9}")
+
+    report = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "seed": args.seed,
+        "transactions_per_user": args.transactions_per_user,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "runs": runs,
+        "summary": summary,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"endpoints-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    print(f"\nWrote {output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "rb") as f:
+            baseline = orjson.loads(f.read())["summary"]
+    found = regressions(summary, baseline)
+    for line in found:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# backend/benchmarks/generate_data.py
+
+"""
+Generates a synthetic Cymbal Bank dataset at any scale, for benchmarking.
+
+The output is a complete `db/` directory (users, accounts, transactions,
+schedules, goals, meetings, plus the advisors and partners copied from the
+source), or a SQLite database for the SQLite backend. The same seed and
+arguments always produce the same data.
+
+Everything is modelled on the bundled dataset:
+
+- account IDs follow `create_account_for_user`: `acc-{initials}-{code}-NNN`,
+  numbered per prefix across all users who share those initials, with the
+  counters written to `sequences.json` so new accounts continue after them.
+  The code and the account kinds come from the bundled accounts
+- transactions reuse the descriptions, categories, merchant IDs, amounts and
+  account kinds of `db/transactions.json`, plus the expenses of
+  `transaction_history.csv` mapped onto the same categories and merchants
+- schedules, goals and meetings use the ID formats of their endpoints
+
+Rows are streamed to disk per user, so memory stays flat however many
+transactions are requested. Run from `backend/code`:
+
+    python ../benchmarks/generate_data.py --users 100000 --transactions 50000000 --out /tmp/db-large
+    python ../benchmarks/generate_data.py --users 10000 --transactions 2000000 --sqlite /tmp/large.sqlite3
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from core.advisor_calendar import parse_availability
+from core.identifiers import initials_of
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code")
+DEFAULT_SOURCE = os.path.join(CODE_DIR, "db")
+DEFAULT_CSV = os.path.join(CODE_DIR, "..", "..", "..", "transaction_history.csv")
+
+# Rows handed to the SQLite backend per insert_many call
+SQLITE_BATCH_SIZE = 10000
+
+FIRST_NAMES = [
+    "Marcus", "Janet", "Ashwin", "David", "Fiona", "Priya", "Dmitri", "Montserrat", "Dusty", "Margaret",
+    "Aisha", "Ben", "Carmen", "Diego", "Elena", "Farah", "George", "Hana", "Ivan", "Julia", "Kenji",
+    "Lucia", "Mateo", "Nadia", "Omar", "Paula", "Quinn", "Rosa", "Sanjay", "Tara", "Umar", "Vera",
+    "Wei", "Ximena", "Yusuf", "Zoe", "Amara", "Bruno", "Chloe", "Dev", "Emeka", "Freya", "Gita",
+]
+LAST_INITIALS = "ABCDEFGHIJKLMNOPRSTVWY"
+STREETS = ["Tech Lane", "Marketing Ave", "Maple Street", "Oak Drive", "Harbor Road", "Elm Court", "Cedar Way"]
+CITIES = ["Silicon Valley, CA 94043", "New York, NY 10001", "Austin, TX 73301", "Chicago, IL 60601",
+          "Seattle, WA 98101", "Denver, CO 80202", "Boston, MA 02108"]
+
+# Categories of transaction_history.csv -> categories of db/transactions.json
+CSV_CATEGORIES = {
+    "Food & Dining": "Food",
+    "Shopping": "Shopping",
+    "Transportation": "Transportation",
+    "Travel": "Travel",
+    "Entertainment": "Subscriptions",
+    "Housing": "Housing",
+}
+
+# How likely a generated user is to hold an account of each kind (sub_type)
+ACCOUNT_ODDS = {
+    "checking": 1.0, "savings": 0.8, "credit_card": 0.7, "401k": 0.5, "brokerage": 0.2, "529": 0.1,
+    "403b": 0.05, "pension": 0.05, "student_loan": 0.3, "mortgage": 0.25, "auto_loan": 0.2,
+}
+
+
+def read_json(path: str) -> List[dict]:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class Templates:
+    """Account and transaction shapes taken from the source dataset."""
+
+    def __init__(self, source_dir: str, csv_path: Optional[str]):
+        self.users = read_json(os.path.join(source_dir, "users.json"))
+        self.advisors = read_json(os.path.join(source_dir, "advisors.json"))
+        self.bank_partners = read_json(os.path.join(source_dir, "bank_partners.json"))
+        accounts = read_json(os.path.join(source_dir, "accounts.json"))
+        transactions = read_json(os.path.join(source_dir, "transactions.json"))
+
+        # sub_type -> (category, type, ID code, institutions, balances)
+        self.accounts: Dict[str, Tuple[str, str, str, List[str], List[float]]] = {}
+        for acc in accounts:
+            code = acc["account_id"].split("-")[2]
+            category, type_, _, institutions, balances = self.accounts.setdefault(
+                acc["sub_type"], (acc["category"], acc["type"], code, [], []))
+            institutions.append(acc["institution"])
+            balances.append(float(acc["balance"]))
+
+        # (description, category, merchant_id, sub_type) -> amounts seen
+        kinds = {acc["account_id"]: acc["sub_type"] for acc in accounts}
+        shapes: Dict[Tuple[str, str, str, str], List[float]] = {}
+        for t in transactions:
+            key = (t["description"], t["category"], t["merchant_id"], kinds.get(t["account_id"], "checking"))
+            shapes.setdefault(key, []).append(float(t["amount"]))
+
+        merchants = {}
+        for (_, category, merchant_id, _), _amounts in shapes.items():
+            merchants.setdefault(category, merchant_id)
+        if csv_path and os.path.exists(csv_path):
+            with open(csv_path, newline="") as f:
+                for row in csv.DictReader(f):
+                    category = CSV_CATEGORIES.get(row["category"])
+                    amount = float(row["amount"])
+                    if category is None or category not in merchants or amount >= 0:
+                        continue
+                    key = (row["item_purchased"], category, merchants[category], "credit_card")
+                    shapes.setdefault(key, []).append(amount)
+
+        self.transactions = list(shapes.items())
+        # Picked in proportion to how often they occur in the source
+        self.weights = [len(amounts) for _, amounts in self.transactions]
+
+
+class JsonSink:
+    """Streams each collection into its JSON file in the output directory."""
+
+    FILES = {"users": "users.json", "accounts": "accounts.json", "transactions": "transactions.json",
+             "schedules": "schedule.json", "life_goals": "life_goals.json", "meetings": "meetings.json",
+             "advisors": "advisors.json", "bank_partners": "bank_partners.json", "sequences": "sequences.json"}
+
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.files = {name: open(os.path.join(out_dir, file_name), "wb") for name, file_name in self.FILES.items()}
+        self.started = set()
+
+    def write(self, name: str, row: dict):
+        f = self.files[name]
+        f.write(b",\n" if name in self.started else b"[\n")
+        self.started.add(name)
+        f.write(orjson.dumps(row))
+
+    def close(self):
+        for name, f in self.files.items():
+            f.write(b"\n]\n" if name in self.started else b"[]\n")
+            f.close()
+
+
+class SQLiteSink:
+    """Writes each collection into a SQLite database in batches."""
+
+    def __init__(self, path: str):
+        from core.sqlite_store import SQLiteStore
+
+        self.store = SQLiteStore(path)
+        self.batches: Dict[str, List[dict]] = {}
+
+    def write(self, name: str, row: dict):
+        batch = self.batches.setdefault(name, [])
+        batch.append(row)
+        if len(batch) >= SQLITE_BATCH_SIZE:
+            self.store.insert_many(name, batch)
+            batch.clear()
+
+    def close(self):
+        for name, batch in self.batches.items():
+            if batch:
+                self.store.insert_many(name, batch)
+        self.store.conn.execute("ANALYZE")
+
+
+class Generator:
+    def __init__(self, templates: Templates, seed: int, end: date, days: int):
+        self.templates = templates
+        self.rng = random.Random(seed)
+        self.end = end
+        self.days = days
+        self.counters: Dict[str, int] = {}
+        self.next_transaction = 1
+        # Next free one-hour slot per advisor, so generated meetings never overlap
+        self.advisor_slots = {adv["advisor_id"]: self._slots(adv) for adv in templates.advisors}
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _slots(self, advisor: dict) -> Iterator[datetime]:
+        windows = []
+        for entry in advisor.get("availability", []):
+            try:
+                windows.append(parse_availability(entry))
+            except ValueError:
+                continue
+        day = self.end + timedelta(days=1)
+        while windows:
+            for weekday, opens, closes in windows:
+                if weekday != day.weekday():
+                    continue
+                slot = datetime.combine(day, opens, timezone.utc)
+                while slot + timedelta(hours=1) <= datetime.combine(day, closes, timezone.utc):
+                    yield slot
+                    slot += timedelta(hours=1)
+            day += timedelta(days=1)
+
+    def user(self, number: int, width: int) -> dict:
+        rng = self.rng
+        persona = rng.choice(self.templates.users)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_INITIALS)}."
+        return {
+            "user_id": f"user-{number:0{width}d}",
+            "name": name,
+            "age": rng.randint(21, 80),
+            "risk_tolerance": persona.get("risk_tolerance"),
+            "profile_picture": persona.get("profile_picture"),
+            "address": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            "credit_score": rng.randint(580, 850),
+            "member_since": rng.randint(2000, self.end.year),
+            "financial_blurb": persona["financial_blurb"],
+            "goals": persona["goals"],
+        }
+
+    def accounts(self, user: dict) -> List[dict]:
+        rng = self.rng
+        initials = initials_of(user["name"])
+        accounts = []
+        for sub_type, odds in ACCOUNT_ODDS.items():
+            if sub_type not in self.templates.accounts or rng.random() >= odds:
+                continue
+            category, type_, code, institutions, balances = self.templates.accounts[sub_type]
+            prefix = f"acc-{initials}-{code}-"
+            self.counters[prefix] = self.counters.get(prefix, 0) + 1
+            accounts.append({
+                "account_id": f"{prefix}{self.counters[prefix]:03d}",
+                "user_id": user["user_id"],
+                "category": category,
+                "type": type_,
+                "sub_type": sub_type,
+                "description": f"{user['name'].split()[0]}'s {sub_type.replace('_', ' ').title()}",
+                "balance": round(rng.choice(balances) * rng.uniform(0.2, 2.0), 2),
+                "institution": rng.choice(institutions),
+            })
+        return accounts
+
+    def transactions(self, accounts: List[dict], count: int) -> Iterator[dict]:
+        rng = self.rng
+        by_kind = {}
+        for acc in accounts:
+            by_kind.setdefault(acc["sub_type"], acc["account_id"])
+        fallback = accounts[0]["account_id"]
+        shapes = rng.choices(self.templates.transactions, weights=self.templates.weights, k=count)
+        for (description, category, merchant_id, kind), amounts in shapes:
+            day = self.end - timedelta(days=rng.randrange(self.days))
+            transaction_id = f"txn_id_{self.next_transaction:03d}"
+            self.next_transaction += 1
+            yield {
+                "transaction_id": transaction_id,
+                "account_id": by_kind.get(kind, fallback),
+                "merchant_id": merchant_id,
+                "date": f"{day.isoformat()}T00:00:00Z",
+                "description": description,
+                "amount": round(rng.choice(amounts) * rng.uniform(0.8, 1.2), 2),
+                "category": category,
+            }
+
+    def schedule(self, user: dict, accounts: List[dict]) -> Optional[dict]:
+        rng = self.rng
+        sources = [acc for acc in accounts if acc["sub_type"] == "checking"]
+        targets = [acc for acc in accounts if acc["category"] == "asset" and acc["sub_type"] != "checking"]
+        if not sources or not targets:
+            return None
+        target = rng.choice(targets)
+        start = self.end - timedelta(days=rng.randrange(365))
+        return {
+            "user_id": user["user_id"],
+            "schedule_id": f"schedule_{self.uuid()}",
+            "source_account_id": sources[0]["account_id"],
+            "destination_account_id": target["account_id"],
+            "description": f"{target['sub_type'].replace('_', ' ').title()} Contribution",
+            "frequency": rng.choice(["monthly", "monthly", "weekly", "biweekly"]),
+            "start_date": f"{start.isoformat()}T00:00:00Z",
+            "end_date": f"{(start + timedelta(days=365 * rng.randint(1, 5))).isoformat()}T00:00:00Z",
+            "amount": float(rng.choice([50, 100, 200, 250, 500, 800, 1000])),
+        }
+
+    def goal(self, user: dict) -> dict:
+        rng = self.rng
+        target = float(rng.choice([5000, 10000, 20000, 50000, 100000]))
+        return {
+            "goal_id": f"goal-{self.uuid()}",
+            "user_id": user["user_id"],
+            "description": rng.choice(user["goals"]) if user["goals"] else "Build an emergency fund",
+            "target_amount": target,
+            "target_date": (self.end + timedelta(days=rng.randint(180, 3650))).isoformat(),
+            "current_amount_saved": round(target * rng.uniform(0, 0.9), 2),
+        }
+
+    def meeting(self, user: dict) -> Optional[dict]:
+        advisor = self.rng.choice(self.templates.advisors)
+        slot = next(self.advisor_slots[advisor["advisor_id"]], None)
+        if slot is None:
+            return None
+        return {
+            "meeting_id": f"meet-{self.uuid()}",
+            "user_id": user["user_id"],
+            "advisor_id": advisor["advisor_id"],
+            "advisor_name": advisor["name"],
+            "advisor_type": advisor["advisor_type"],
+            "meeting_time": slot.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "duration_minutes": 60,
+            "notes": None,
+        }
+
+
+def generate(sink, templates: Templates, users: int, transactions: int, seed: int = 0,
+             end: Optional[date] = None, days: int = 365, schedule_rate: float = 0.3,
+             goal_rate: float = 0.5, meeting_rate: float = 0.05) -> Dict[str, int]:
+    """Writes a dataset to `sink` and returns the number of rows per collection."""
+    generator = Generator(templates, seed, end or datetime.now(timezone.utc).date(), days)
+    rng = generator.rng
+    counts = {name: 0 for name in JsonSink.FILES}
+
+    def write(name: str, row: Optional[dict]):
+        if row is not None:
+            sink.write(name, row)
+            counts[name] += 1
+
+    width = max(3, len(str(users)))
+    per_user, extra = divmod(transactions, users) if users else (0, 0)
+    for number in range(1, users + 1):
+        user = generator.user(number, width)
+        write("users", user)
+        accounts = generator.accounts(user)
+        for acc in accounts:
+            write("accounts", acc)
+        for t in generator.transactions(accounts, per_user + (1 if number <= extra else 0)):
+            write("transactions", t)
+        if rng.random() < schedule_rate:
+            write("schedules", generator.schedule(user, accounts))
+        if rng.random() < goal_rate:
+            write("life_goals", generator.goal(user))
+        if rng.random() < meeting_rate:
+            write("meetings", generator.meeting(user))
+
+    for advisor in templates.advisors:
+        write("advisors", advisor)
+    for partner in templates.bank_partners:
+        write("bank_partners", partner)
+    for prefix, last in generator.counters.items():
+        write("sequences", {"prefix": prefix, "last": last})
+    sink.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=100000, help="Total across all users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None,
+                        help="Last transaction day, YYYY-MM-DD (default: today; fix it for identical reruns)")
+    parser.add_argument("--days", type=int, default=365, help="Days of transaction history")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Dataset to model the output on")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="transaction_history.csv to draw expenses from")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out", help="Directory to write the JSON files to")
+    output.add_argument("--sqlite", help="SQLite database to write to")
+    args = parser.parse_args()
+
+    sink = SQLiteSink(args.sqlite) if args.sqlite else JsonSink(args.out)
+    counts = generate(sink, Templates(args.source, args.csv), args.users, args.transactions, seed=args.seed,
+                      end=args.end_date, days=args.days)
+    for name, count in counts.items():
+        print(f"{name}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
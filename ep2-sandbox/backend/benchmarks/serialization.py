@@ -0,0 +1,88 @@
+# backend/benchmarks/serialization.py
+
+"""
+Compares the two ways a transaction listing can be serialized:
+
+- `response_model`: what FastAPI does for `response_model=List[Transaction]`,
+  i.e. validate every row, dump it through Pydantic and render it with
+  `JSONResponse`
+- `orjson`: the fast path used by the transactions endpoint (`rows_response`),
+  which renders the stored rows directly with orjson
+
+Run from `backend/code`:
+
+    python ../benchmarks/serialization.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.models import Transaction
+
+CATEGORIES = ["Income", "Housing", "Dining", "Travel", "Groceries", "Debt"]
+
+
+def make_transactions(count: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "transaction_id": f"txn-{i:07d}",
+            "account_id": f"acc-mw-c-{rng.randint(1, 9):03d}",
+            "merchant_id": f"merch-{rng.randint(1, 500):04d}",
+            "date": (start + timedelta(days=rng.randint(0, 600))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "description": f"Purchase {i}",
+            "amount": round(rng.uniform(-500, 500), 2),
+            "category": rng.choice(CATEGORIES),
+        }
+        for i in range(count)
+    ]
+
+
+def response_model_path(rows: List[dict]) -> bytes:
+    field = create_response_field(name="Response_get_user_transactions", type_=List[Transaction])
+    content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=False))
+    return JSONResponse(content).body
+
+
+def orjson_path(rows: List[dict]) -> bytes:
+    return ORJSONResponse(rows).body
+
+
+def best_of(fn: Callable[[List[dict]], bytes], rows: List[dict], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'response_model ms':>18} {'orjson ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        rows = make_transactions(size)
+        slow = best_of(response_model_path, rows, args.repeat)
+        fast = best_of(orjson_path, rows, args.repeat)
+        print(f"{size:>8} {slow * 1000:>18.2f} {fast * 1000:>10.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
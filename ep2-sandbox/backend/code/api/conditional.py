@@ -0,0 +1,108 @@
+# backend/api/conditional.py
+
+"""
+Conditional GET support for the read endpoints.
+
+Each read endpoint declares the collections its response is derived from.
+The ETag is a hash of the store instance, the request target and those
+collections' revision counters, so it is computed without reading or
+serializing any rows, and a request whose `If-None-Match` matches it is
+answered with an empty 304. Error responses carry no ETag, so a match means
+the client got this URL's 200 response at this very state, and the resource
+it names still exists. `If-None-Match: *` is not answered with a 304: whether
+the resource exists is only known once the endpoint runs.
+
+Writes to single rows (goals, schedules) work the other way round: their
+responses carry the row's version as a strong ETag, and a client that sends it
+back in `If-Match` only overwrites the row if nobody changed it in between.
+Otherwise the write fails with 412 Precondition Failed; a tag that is not a
+row version matches no row and fails the same way.
+
+Endpoints whose response also depends on the current date (history windows,
+cash flow periods) add today's UTC date to the stamp; the transaction data is
+dated by day, so this is when their results can roll over.
+"""
+
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from core.store import ConflictError, get_store
+
+# A version no row is ever at, for If-Match tags that cannot match a row
+NO_VERSION = -1
+
+
+def compute_etag(collections, extra: str = "") -> str:
+    store = get_store()
+    revisions = [f"{name}={store.revision(name)}" for name in collections]
+    stamp = ":".join([store.instance_id, extra] + revisions)
+    return f'W/"{hashlib.blake2b(stamp.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header value; `*` matches nothing."""
+    if not if_none_match:
+        return False
+    opaque = etag[2:]
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def today_utc(request: Request) -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def conditional(*collections: str, vary: Optional[Callable[[Request], str]] = None):
+    """
+    Dependency that stamps the response with an ETag over `collections`.
+
+    `vary`, if given, returns anything else the response depends on, which is
+    folded into the stamp. Raises a 304 when the client already has the
+    current version.
+    """
+    def check(request: Request, response: Response):
+        target = f"{request.url.path}?{request.url.query}"
+        etag = compute_etag(collections, f"{target}:{vary(request) if vary else ''}")
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    return Depends(check)
+
+
+def row_etag(version: int) -> str:
+    """ETag of a single row: its version number."""
+    return f'"{version}"'
+
+
+def expected_version(if_match: Optional[str]) -> Optional[int]:
+    """
+    The row version a write is conditional on, from an If-Match header carrying
+    a row ETag. None means the write is unconditional; a header that is not a
+    single row ETag gives `NO_VERSION`, which no row matches.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        return NO_VERSION
+
+
+@contextmanager
+def precondition(if_match: Optional[str]) -> Iterator[Optional[int]]:
+    """
+    Yields `expected_version(if_match)` for the write in the block, and answers
+    a version conflict there with 412 Precondition Failed when the client set
+    that version. Conflicts of unconditional writes stay retryable 409s.
+    """
+    version = expected_version(if_match)
+    try:
+        yield version
+    except ConflictError as exc:
+        if version is None:
+            raise
+        raise HTTPException(status_code=412, detail=str(exc))
@@ -0,0 +1,74 @@
+# backend/api/endpoints/events.py
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import orjson
+from api.metrics import TimedRoute
+from core import config
+from core.events import Event, EventFeed, get_event_feed
+from core.store import get_store
+
+router = APIRouter(route_class=TimedRoute)
+
+# Milliseconds a client waits before reconnecting after the stream drops
+RETRY_MS = 3000
+
+
+def parse_event_id(value: Optional[str], feed: EventFeed) -> Optional[int]:
+    """The position in `feed` of an event ID ("<instance>-<seq>"), or None if it is not one of its IDs."""
+    instance_id, _, seq = (value or "").rpartition("-")
+    if instance_id != feed.instance_id or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+def format_event(feed: EventFeed, event: Event) -> bytes:
+    return b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (
+        feed.instance_id.encode(), event.seq, event.op.encode(), orjson.dumps(event.to_dict()))
+
+
+def format_marker(feed: EventFeed, name: bytes, seq: int) -> bytes:
+    return b"id: %s-%d\nevent: %s\ndata: {}\n\n" % (feed.instance_id.encode(), seq, name)
+
+
+async def stream_events(feed: EventFeed, user_id: str, resume_id: Optional[str]):
+    yield b"retry: %d\n\n" % RETRY_MS
+    position = parse_event_id(resume_id, feed) if resume_id else None
+    if position is None:
+        # A fresh stream starts with an ID to resume from; an unknown ID also means the client is out of date
+        position = feed.current()
+        yield format_marker(feed, b"reset" if resume_id else b"ready", position)
+    while True:
+        # Reading may rebuild the feed's account map from the store, which blocks
+        events = await run_in_threadpool(feed.read, user_id, position)
+        if events is None:
+            position = feed.current()
+            yield format_marker(feed, b"reset", position)
+        elif events:
+            yield b"".join(format_event(feed, event) for event in events)
+            position = events[-1].seq
+        elif not await feed.wait(user_id, position, config.EVENTS_HEARTBEAT_SECONDS):
+            yield b": keep-alive\n\n"
+
+
+@router.get("/users/{user_id}/events")
+def stream_user_events(user_id: str, after: Optional[str] = Query(None),
+                       last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events stream of changes to the user's accounts, transactions, goals, schedules and meetings.
+
+    Each event carries the changed row ("put"), or its key ("delete"); a "reload" means the whole
+    collection was replaced and should be refetched. Reconnecting with `Last-Event-ID` (or `after`)
+    resumes after that event; a "reset" event means the client must refetch everything and then
+    follow the stream from there. A new stream opens with a "ready" event.
+    """
+    normalized_user_id = user_id.replace("_", "-")
+    store = get_store()
+    if not store.get("users", normalized_user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    feed = get_event_feed(store)
+    return StreamingResponse(stream_events(feed, normalized_user_id, last_event_id or after), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
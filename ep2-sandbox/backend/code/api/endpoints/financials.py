@@ -1,104 +1,130 @@
-import json
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-from api.models import Account, NetWorth, CashFlow, AverageCashFlow
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from api.conditional import conditional, today_utc
+from api.metrics import TimedRoute
+from api.models import Account, NetWorth, CashFlow, AverageCashFlow, CashFlowRange, Forecast, Spending
+from core.cashflow import get_cashflow_index
+from core.forecast import MAX_FORECAST_MONTHS, get_forecast_view
+from core.networth import get_net_worth_view
+from core.spending import GROUP_BY, get_spending_index
+from core.store import EPOCH, Row, Store, epoch_day, get_store
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
+def debt_accounts(accounts: List[Row]) -> List[Row]:
+    return [acc for acc in accounts if acc["category"] == "liability"]
 
-def load_data(file_name: str) -> List[Dict[str, Any]]:
-    try:
-        with open(f"db/{file_name}", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail=f"{file_name} not found")
+def investment_accounts(accounts: List[Row]) -> List[Row]:
+    return [acc for acc in accounts if acc["category"] == "asset" and acc["type"] == "investment"]
 
-@router.get("/users/{user_id}/debts", response_model=List[Account], tags=["Financials"])
+@router.get("/users/{user_id}/debts", response_model=List[Account], tags=["Financials"],
+            dependencies=[conditional("accounts")])
 def get_user_debts(user_id: str) -> List[Account]:
     """
     Retrieves all debt accounts for a specific user.
     """
     normalized_user_id = user_id.replace("_", "-")
-    accounts = load_data("accounts.json")
-    debt_accounts = [
-        acc for acc in accounts if acc["user_id"] == normalized_user_id and acc["category"] == "liability"
-    ]
-    if not debt_accounts:
+    accounts = get_store().find("accounts", "user_id", normalized_user_id)
+    debts = debt_accounts(accounts)
+    if not debts:
         raise HTTPException(status_code=404, detail="No debt accounts found for this user")
-    return debt_accounts
+    return debts
 
-@router.get("/users/{user_id}/investments", response_model=List[Account], tags=["Financials"])
+@router.get("/users/{user_id}/investments", response_model=List[Account], tags=["Financials"],
+            dependencies=[conditional("accounts")])
 def get_user_investments(user_id: str) -> List[Account]:
     """
     Retrieves all investment accounts for a specific user.
     """
     normalized_user_id = user_id.replace("_", "-")
-    accounts = load_data("accounts.json")
-    investment_accounts = [
-        acc for acc in accounts if acc["user_id"] == normalized_user_id and acc["category"] == "asset" and acc["type"] == "investment"
-    ]
-    if not investment_accounts:
+    accounts = get_store().find("accounts", "user_id", normalized_user_id)
+    investments = investment_accounts(accounts)
+    if not investments:
         raise HTTPException(status_code=404, detail="No investment accounts found for this user")
-    return investment_accounts
+    return investments
 
-@router.get("/users/{user_id}/networth", response_model=NetWorth, tags=["Financials"])
+@router.get("/users/{user_id}/networth", response_model=NetWorth, tags=["Financials"],
+            dependencies=[conditional("accounts")])
 def get_user_net_worth(user_id: str) -> NetWorth:
     """
     Calculates the net worth of a specific user.
     """
     normalized_user_id = user_id.replace("_", "-")
-    accounts = load_data("accounts.json")
-    user_accounts = [acc for acc in accounts if acc["user_id"] == normalized_user_id]
-    if not user_accounts:
+    net_worth, account_count = get_net_worth_view(get_store()).get(normalized_user_id)
+    if not account_count:
         raise HTTPException(status_code=404, detail="No accounts found for this user")
 
-    net_worth = sum(acc["balance"] for acc in user_accounts)
     return NetWorth(net_worth=net_worth)
 
-@router.get("/users/{user_id}/cashflow", response_model=CashFlow, tags=["Financials"])
+def cash_flow_last_30_days(store: Store, user_id: str) -> float:
+    # Transactions dated on any day after the one 30 days ago
+    start_day = epoch_day(datetime.now(timezone.utc) - timedelta(days=30)) + 1
+    return get_cashflow_index(store).total(user_id, start_day=start_day)
+
+def average_monthly_cash_flow(store: Store, user_id: str) -> float:
+    start_day = epoch_day(datetime.now(timezone.utc) - timedelta(days=90)) + 1
+    total_cash_flow = get_cashflow_index(store).total(user_id, start_day=start_day)
+    return total_cash_flow / 3 if total_cash_flow else 0
+
+@router.get("/users/{user_id}/cashflow", response_model=CashFlow, tags=["Financials"],
+            dependencies=[conditional("accounts", "transactions", vary=today_utc)])
 def get_user_cash_flow(user_id: str) -> CashFlow:
     """
     Calculates the cash flow for a specific user over the last 30 days.
     """
     normalized_user_id = user_id.replace("_", "-")
-    transactions = load_data("transactions.json")
-    accounts = load_data("accounts.json")
-    user_account_ids = [
-        acc["account_id"] for acc in accounts if acc["user_id"] == normalized_user_id
-    ]
-
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_transactions = [
-        t
-        for t in transactions
-        if t["account_id"] in user_account_ids
-        and datetime.fromisoformat(t["date"].replace("Z", "")) > thirty_days_ago
-    ]
+    return CashFlow(cash_flow_last_30_days=cash_flow_last_30_days(get_store(), normalized_user_id))
 
-    cash_flow = sum(t["amount"] for t in recent_transactions)
-    return CashFlow(cash_flow_last_30_days=cash_flow)
-
-@router.get("/users/{user_id}/average_cashflow", response_model=AverageCashFlow, tags=["Financials"])
+@router.get("/users/{user_id}/average_cashflow", response_model=AverageCashFlow, tags=["Financials"],
+            dependencies=[conditional("accounts", "transactions", vary=today_utc)])
 def get_user_average_cash_flow(user_id: str) -> AverageCashFlow:
     """
     Calculates the average monthly cash flow for a specific user over the last 3 months.
     """
     normalized_user_id = user_id.replace("_", "-")
-    transactions = load_data("transactions.json")
-    accounts = load_data("accounts.json")
-    user_account_ids = [
-        acc["account_id"] for acc in accounts if acc["user_id"] == normalized_user_id
-    ]
+    average_cash_flow = average_monthly_cash_flow(get_store(), normalized_user_id)
+    return AverageCashFlow(average_monthly_cash_flow=average_cash_flow)
 
-    ninety_days_ago = datetime.now() - timedelta(days=90)
-    recent_transactions = [
-        t
-        for t in transactions
-        if t["account_id"] in user_account_ids
-        and datetime.fromisoformat(t["date"].replace("Z", "")) > ninety_days_ago
-    ]
+@router.get("/users/{user_id}/cashflow/range", response_model=CashFlowRange, tags=["Financials"],
+            dependencies=[conditional("accounts", "transactions")])
+def get_user_cash_flow_range(user_id: str, start: Optional[date] = None, end: Optional[date] = None) -> CashFlowRange:
+    """
+    Calculates the net cash flow for a specific user from `start` (inclusive)
+    to `end` (exclusive). Either bound may be omitted.
+    """
+    normalized_user_id = user_id.replace("_", "-")
+    start_day = (start - EPOCH).days if start else None
+    end_day = (end - EPOCH).days if end else None
+    cash_flow = get_cashflow_index(get_store()).total(normalized_user_id, start_day=start_day, end_day=end_day)
+    return CashFlowRange(start=start, end=end, cash_flow=cash_flow)
 
-    total_cash_flow = sum(t["amount"] for t in recent_transactions)
-    average_cash_flow = total_cash_flow / 3 if total_cash_flow else 0
-    return AverageCashFlow(average_monthly_cash_flow=average_cash_flow)
+@router.get("/users/{user_id}/spending", response_model=Spending, tags=["Financials"],
+            dependencies=[conditional("accounts", "transactions")])
+def get_user_spending(user_id: str, group_by: str = Query("category", pattern=f"^({'|'.join(GROUP_BY)})$"),
+                      start: Optional[date] = None, end: Optional[date] = None) -> Spending:
+    """
+    Totals a specific user's spending (transactions with a negative amount,
+    as positive sums) from `start` (inclusive) to `end` (exclusive) per
+    category, merchant or month. Either bound may be omitted.
+    """
+    normalized_user_id = user_id.replace("_", "-")
+    store = get_store()
+    if not store.find("accounts", "user_id", normalized_user_id):
+        raise HTTPException(status_code=404, detail="No accounts found for this user")
+    groups = get_spending_index(store).spending(normalized_user_id, group_by, start=start, end=end)
+    return Spending(group_by=group_by, start=start, end=end, total=sum(total for _, total, _ in groups),
+                    groups=[{"key": key, "total": total, "count": count} for key, total, count in groups])
+
+@router.get("/users/{user_id}/forecast", response_model=Forecast, tags=["Financials"],
+            dependencies=[conditional("accounts", "schedules", vary=today_utc)])
+def get_user_forecast(user_id: str, months: int = Query(12, ge=1, le=MAX_FORECAST_MONTHS)) -> Forecast:
+    """
+    Projects the balance of each of the user's accounts over the next `months`
+    calendar months (the current one first) from their recurring schedules.
+    """
+    normalized_user_id = user_id.replace("_", "-")
+    forecast = get_forecast_view(get_store()).forecast(datetime.now(timezone.utc).date()).for_user(normalized_user_id, months)
+    if forecast is None:
+        raise HTTPException(status_code=404, detail="No accounts found for this user")
+    return forecast
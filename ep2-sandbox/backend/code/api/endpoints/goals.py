@@ -1,41 +1,27 @@
 # backend/api/endpoints/goals.py
 
-import json
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from typing import List, Optional
+from api.conditional import conditional, precondition, row_etag
+from api.metrics import TimedRoute
 from api.models import LifeGoal
-import uuid
+from core.store import get_store
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-DATA_FILE = "db/life_goals.json"
-
-def read_goals_data() -> List[LifeGoal]:
-    with open(DATA_FILE, "r") as f:
-        goals_data = json.load(f)
-    return [LifeGoal(**goal) for goal in goals_data]
-
-def write_goals_data(goals: List[LifeGoal]):
-    with open(DATA_FILE, "w") as f:
-        json.dump([goal.model_dump() for goal in goals], f, indent=2)
-
-@router.get("/goals/{user_id}", response_model=List[LifeGoal])
+@router.get("/goals/{user_id}", response_model=List[LifeGoal], dependencies=[conditional("life_goals")])
 def get_user_goals(user_id: str):
     """
     Get user's financial goals.
     """
     normalized_user_id = user_id.replace("_", "-")
-    goals = read_goals_data()
-    user_goals = [goal for goal in goals if goal.user_id == normalized_user_id]
-    return user_goals
+    return get_store().find("life_goals", "user_id", normalized_user_id)
 
 @router.post("/goals", response_model=LifeGoal, status_code=status.HTTP_201_CREATED)
-def create_goal(goal_payload: LifeGoal):
+def create_goal(goal_payload: LifeGoal, response: Response):
     """
     Create a new financial goal. The goal_id is generated automatically.
     """
-    goals = read_goals_data()
-    
     # Create a new LifeGoal instance to ensure a server-generated UUID
     new_goal = LifeGoal(
         user_id=goal_payload.user_id,
@@ -45,36 +31,35 @@ def create_goal(goal_payload: LifeGoal):
         current_amount_saved=goal_payload.current_amount_saved
     )
     
-    goals.append(new_goal)
-    write_goals_data(goals)
+    store = get_store()
+    with store.transaction("life_goals"):
+        store.insert("life_goals", new_goal.model_dump(), expected_version=0)
+        response.headers["ETag"] = row_etag(store.version("life_goals", new_goal.goal_id))
     return new_goal
 
 @router.put("/goals/{goal_id}", response_model=LifeGoal)
-def update_goal(goal_id: str, updated_goal: LifeGoal):
+def update_goal(goal_id: str, updated_goal: LifeGoal, response: Response, if_match: Optional[str] = Header(None)):
     """
-    Update a financial goal.
+    Update a financial goal. With `If-Match`, only if it is still at that version.
     """
-    goals = read_goals_data()
-    goal_index = next((i for i, goal in enumerate(goals) if goal.goal_id == goal_id), None)
+    # The goal keeps the ID it is stored under, whatever the payload says
+    updated_goal = updated_goal.model_copy(update={"goal_id": goal_id})
 
-    if goal_index is None:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    store = get_store()
+    with store.transaction("life_goals"), precondition(if_match) as version:
+        if store.replace("life_goals", goal_id, updated_goal.model_dump(), expected_version=version) is None:
+            raise HTTPException(status_code=404, detail="Goal not found")
+        response.headers["ETag"] = row_etag(store.version("life_goals", goal_id))
 
-    goals[goal_index] = updated_goal
-    write_goals_data(goals)
     return updated_goal
 
 @router.delete("/goals/{goal_id}", status_code=204)
-def cancel_goal(goal_id: str):
+def cancel_goal(goal_id: str, if_match: Optional[str] = Header(None)):
     """
     Cancel a customer goal.
     """
-    goals = read_goals_data()
-    goal_to_delete = next((g for g in goals if g.goal_id == goal_id), None)
-
-    if not goal_to_delete:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    with precondition(if_match) as version:
+        if get_store().delete("life_goals", goal_id, expected_version=version) is None:
+            raise HTTPException(status_code=404, detail="Goal not found")
 
-    updated_goals = [g.model_dump() for g in goals if g.goal_id != goal_id]
-    write_goals_data(updated_goals)
-    return
\ No newline at end of file
+    return
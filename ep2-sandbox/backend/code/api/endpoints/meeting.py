@@ -1,93 +1,98 @@
-import json
-from fastapi import APIRouter, HTTPException, Body
-from typing import List
-from api.models import Advisor, Meeting
-import datetime
+from fastapi import APIRouter, HTTPException, Body, Query
+from typing import List, Optional
+from api.conditional import conditional, today_utc
+from api.metrics import TimedRoute
+from api.models import Advisor, FreeSlot, Meeting
+from core.advisor_calendar import DEFAULT_MEETING_MINUTES, get_advisor_calendar
+from core.store import get_store
 
-router = APIRouter()
+from datetime import date, datetime, timezone
 
-ADVISOR_DATA_FILE = "db/advisors.json"
-MEETING_DATA_FILE = "db/meetings.json"
+router = APIRouter(route_class=TimedRoute)
 
-# Helper functions for data handling
-def read_data(file_path: str) -> list:
-    try:
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def write_data(file_path: str, data: list):
-    with open(file_path, "w") as f:
-        json.dump(data, f, indent=2, default=str) # Use default=str for datetime
-
-def get_advisors() -> List[Advisor]:
-    advisors_data = read_data(ADVISOR_DATA_FILE)
-    return [Advisor(**advisor) for advisor in advisors_data]
-
-def get_meetings() -> List[Meeting]:
-    meetings_data = read_data(MEETING_DATA_FILE)
-    return [Meeting(**meeting) for meeting in meetings_data]
+MAX_SLOT_DAYS = 90
 
 # --- API Endpoints ---
 
-@router.get("/advisors", response_model=List[Advisor])
+@router.get("/advisors", response_model=List[Advisor], dependencies=[conditional("advisors")])
 def list_advisors():
     """
     Get a list of all available financial advisors.
     """
-    return get_advisors()
+    return get_store().all("advisors")
 
-@router.get("/advisors/{advisor_type}", response_model=List[Advisor])
+@router.get("/advisors/{advisor_type}", response_model=List[Advisor], dependencies=[conditional("advisors")])
 def get_advisors_by_type(advisor_type: str):
     """
     Get advisors by their specialization type.
     """
-    advisors = get_advisors()
-    filtered_advisors = [adv for adv in advisors if adv.advisor_type.lower() == advisor_type.lower()]
+    advisors = get_store().all("advisors")
+    filtered_advisors = [adv for adv in advisors if adv["advisor_type"].lower() == advisor_type.lower()]
     if not filtered_advisors:
         raise HTTPException(status_code=404, detail=f"No advisors found for type: {advisor_type}")
     return filtered_advisors
 
+@router.get("/advisors/{advisor_id}/free_slots", response_model=List[FreeSlot],
+            dependencies=[conditional("advisors", "meetings", vary=today_utc)])
+def get_free_slots(
+    advisor_id: str,
+    start: Optional[date] = None,
+    days: int = Query(7, ge=1, le=MAX_SLOT_DAYS),
+    min_minutes: int = Query(DEFAULT_MEETING_MINUTES, ge=1),
+):
+    """
+    Get the free time in an advisor's weekly availability over `days` days
+    from `start` (default today, UTC): the availability windows with booked
+    meetings taken out, keeping gaps of at least `min_minutes`.
+    """
+    store = get_store()
+    advisor = store.get("advisors", advisor_id)
+    if not advisor:
+        raise HTTPException(status_code=404, detail="Advisor not found")
+
+    if start is None:
+        start = datetime.now(timezone.utc).date()
+    slots = get_advisor_calendar(store).free_slots(advisor, start, days, min_minutes)
+    return [{"start": datetime.fromtimestamp(lo, timezone.utc), "end": datetime.fromtimestamp(hi, timezone.utc)}
+            for lo, hi in slots]
+
 @router.post("/meetings", response_model=Meeting, status_code=201)
 def schedule_meeting(meeting_request: Meeting):
     """
     Schedule a new meeting with an advisor.
     """
-    meetings = [m.model_dump() for m in get_meetings()]
-    
-    # Simple validation to prevent double booking the exact same time
-    for existing_meeting in meetings:
-        if existing_meeting['name'] == meeting_request.name and \
-           existing_meeting['meeting_time'] == meeting_request.meeting_time.isoformat():
+    store = get_store()
+    calendar = get_advisor_calendar(store)
+    new_meeting = meeting_request.model_dump(mode="json")
+
+    # The double booking check and the insert must not interleave with another booking
+    with store.transaction("advisors", "meetings"):
+        if new_meeting["advisor_id"] is None:
+            new_meeting["advisor_id"] = calendar.advisor_id(new_meeting["advisor_name"])
+        elif not store.get("advisors", new_meeting["advisor_id"]):
+            raise HTTPException(status_code=404, detail="Advisor not found")
+
+        # Reject any overlap with a meeting already booked with the advisor
+        if calendar.conflict(new_meeting):
             raise HTTPException(status_code=409, detail="This time slot is already booked with the advisor.")
 
-    new_meeting = meeting_request.model_dump()
-    meetings.append(new_meeting)
-    write_data(MEETING_DATA_FILE, meetings)
+        store.insert("meetings", new_meeting, expected_version=0)
     return Meeting(**new_meeting)
 
 
-@router.get("/meetings/{user_id}", response_model=List[Meeting])
+@router.get("/meetings/{user_id}", response_model=List[Meeting], dependencies=[conditional("meetings")])
 def get_user_meetings(user_id: str):
     """
     Get all scheduled meetings for a specific user.
     """
-    meetings = get_meetings()
-    user_meetings = [meeting for meeting in meetings if meeting.user_id == user_id]
-    return user_meetings
+    return get_store().find("meetings", "user_id", user_id)
 
 @router.delete("/meetings/{meeting_id}", status_code=204)
 def cancel_meeting(meeting_id: str):
     """
     Cancel a scheduled meeting.
     """
-    meetings = get_meetings()
-    meeting_to_delete = next((m for m in meetings if m.meeting_id == meeting_id), None)
-
-    if not meeting_to_delete:
+    if get_store().delete("meetings", meeting_id) is None:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
-    updated_meetings = [m.model_dump() for m in meetings if m.meeting_id != meeting_id]
-    write_data(MEETING_DATA_FILE, updated_meetings)
     return
@@ -1,51 +1,58 @@
-import json
 from fastapi import APIRouter, HTTPException
-from pathlib import Path
+from api.conditional import conditional
+from api.metrics import TimedRoute
+from api.models import PartnerEligibility, PartnerEligibilityRequest
+from core.eligibility import get_partner_index
+from core.store import get_store
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.get("/partners", tags=["Partners"])
+@router.get("/partners", tags=["Partners"], dependencies=[conditional("bank_partners")])
 def get_bank_partners():
     """
     Retrieves a list of all available bank partners and their associated benefits.
     """
-    try:
-        with open(f"db/bank_partners.json", "r") as f:
-            partners_data = json.load(f)
-        return partners_data
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Bank partners file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Error decoding bank partners JSON.")
-
-@router.get("/partners/user/{user_id}", tags=["Partners"])
+    return get_store().all("bank_partners")
+
+@router.get("/partners/user/{user_id}", tags=["Partners"], dependencies=[conditional("users", "bank_partners")])
 def get_user_benefits(user_id: str):
     """
     Identifies and returns a list of partners a specific user can benefit from.
     """
-    try:
-        with open(f"db/users.json", "r") as f:
-            users_data = json.load(f)
-        with open(f"db/bank_partners.json", "r") as f:
-            partners_data = json.load(f)
-
-        user = next((user for user in users_data if user["user_id"] == user_id), None)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found.")
-
-        user_credit_score = user.get("credit_score")
-
-        eligible_partners = []
-        for partner in partners_data:
-            eligibility = partner.get("eligibility_criteria")
-            if not eligibility or "minimum_credit_score" not in eligibility:
-                eligible_partners.append(partner)
-            elif user_credit_score and user_credit_score >= eligibility["minimum_credit_score"]:
-                eligible_partners.append(partner)
-
-        return eligible_partners
-
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Data file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Error decoding JSON.")
+    store = get_store()
+
+    user = store.get("users", user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found.")
+
+    return get_partner_index(store).eligible(user.get("credit_score"))
+
+@router.post("/partners/eligibility", tags=["Partners"], response_model=PartnerEligibility)
+def get_partner_eligibility(request: PartnerEligibilityRequest):
+    """
+    Returns the partners each of many users can benefit from, e.g. to target a
+    campaign. Without `user_ids` every user is included. Each partner is listed
+    once in `partners`; `eligible` maps user IDs to partner IDs.
+    """
+    store = get_store()
+    index = get_partner_index(store)
+
+    with store.consistent_read():
+        if request.user_ids:
+            user_ids = list(dict.fromkeys(request.user_ids))
+            users = {user_id: store.get("users", user_id) for user_id in user_ids}
+        else:
+            users = {user["user_id"]: user for user in store.all("users")}
+
+        eligible, not_found, partners = {}, [], []
+        for user_id, user in users.items():
+            if user is None:
+                not_found.append(user_id)
+                continue
+            benefits = index.eligible(user.get("credit_score"))
+            eligible[user_id] = [partner["partner_id"] for partner in benefits]
+            # Each list is a prefix of the same order, so the longest covers them all
+            if len(benefits) > len(partners):
+                partners = benefits
+
+    return {"partners": partners, "eligible": eligible, "not_found": not_found}
@@ -1,40 +1,20 @@
 # backend/api/endpoints/transactions.py
 
-import json
 import uuid
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from typing import List, Optional
+from api.conditional import conditional, precondition, row_etag
+from api.metrics import TimedRoute
 from api.models import Schedule
+from core.store import get_store
 
-from datetime import datetime, timedelta, timezone
-
-router = APIRouter()
-
-SCHEDULES_FILE = "db/schedule.json"
-
-def read_schedules_data() -> List[Schedule]:
-    """Reads schedule data from the JSON file."""
-    try:
-        with open(SCHEDULES_FILE, "r") as f:
-            schedules_data = json.load(f)
-        return [Schedule(**s) for s in schedules_data]
-    except (FileNotFoundError, json.JSONDecodeError):
-        # If the file doesn't exist or is empty, return an empty list
-        return []
-
-def write_schedules_data(schedules: List[Schedule]):
-    """Writes the list of schedules back to the JSON file."""
-    with open(SCHEDULES_FILE, "w") as f:
-        json_data = [s.model_dump() for s in schedules]
-        json.dump(json_data, f, indent=4)
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/users/{user_id}/schedules", response_model=Schedule, status_code=status.HTTP_201_CREATED)
-def create_schedule_for_user(user_id: str, schedule_in: Schedule):
+def create_schedule_for_user(user_id: str, schedule_in: Schedule, response: Response):
     """
     Create a new scheduled transaction for a specific user.
     """
-    schedules = read_schedules_data()
-    
     # Exclude both user_id and schedule_id from the input model
     schedule_data = schedule_in.model_dump(exclude={'user_id', 'schedule_id'})
     
@@ -45,56 +25,56 @@ def create_schedule_for_user(user_id: str, schedule_in: Schedule):
         **schedule_data
     )
     
-    schedules.append(new_schedule)
-    write_schedules_data(schedules)
+    store = get_store()
+    with store.transaction("schedules"):
+        store.insert("schedules", new_schedule.model_dump(), expected_version=0)
+        response.headers["ETag"] = row_etag(store.version("schedules", new_schedule.schedule_id))
     
     return new_schedule
 
-@router.get("/users/{user_id}/schedules", response_model=List[Schedule])
+@router.get("/users/{user_id}/schedules", response_model=List[Schedule], dependencies=[conditional("schedules")])
 def get_schedules_for_user(user_id: str):
     """
     Retrieve all scheduled transactions for a specific user.
     """
-    schedules = read_schedules_data()
-    user_schedules = [s for s in schedules if s.user_id == user_id]
-        
-    return user_schedules
+    return get_store().find("schedules", "user_id", user_id)
 
 @router.put("/schedules/{schedule_id}", response_model=Schedule)
-def update_schedule(schedule_id: str, schedule_update: Schedule):
+def update_schedule(schedule_id: str, schedule_update: Schedule, response: Response,
+                    if_match: Optional[str] = Header(None)):
     """
-    Update an existing scheduled transaction by its ID.
+    Update an existing scheduled transaction by its ID. With `If-Match`, only
+    if it is still at that version.
     """
-    schedules = read_schedules_data()
-    schedule_index = next((i for i, s in enumerate(schedules) if s.schedule_id == schedule_id), None)
+    store = get_store()
+    with store.transaction("schedules"), precondition(if_match) as version:
+        existing_schedule = store.get("schedules", schedule_id)
 
-    if schedule_index is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found")
-    
-    # Get the existing schedule object and update its fields
-    existing_schedule = schedules[schedule_index]
-    update_data = schedule_update.model_dump(exclude_unset=True) # Only include fields that were provided
-    updated_schedule = existing_schedule.model_copy(update=update_data)
-    
-    schedules[schedule_index] = updated_schedule
-    write_schedules_data(schedules)
+        if existing_schedule is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found")
+
+        if version is None:
+            # The merge below is based on this read; make sure nothing overwrote it
+            version = store.version("schedules", schedule_id)
+
+        # Update the existing schedule's fields, keeping the ID it is stored under
+        update_data = schedule_update.model_dump(exclude_unset=True) # Only include fields that were provided
+        update_data["schedule_id"] = schedule_id
+        updated_schedule = Schedule(**existing_schedule).model_copy(update=update_data)
+
+        store.replace("schedules", schedule_id, updated_schedule.model_dump(), expected_version=version)
+        response.headers["ETag"] = row_etag(store.version("schedules", schedule_id))
     
     return updated_schedule
 
 @router.delete("/schedules/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_schedule(schedule_id: str):
+def delete_schedule(schedule_id: str, if_match: Optional[str] = Header(None)):
     """
     Delete a scheduled transaction by its ID.
     """
-    schedules = read_schedules_data()
-    
-    initial_length = len(schedules)
-    schedules_to_keep = [s for s in schedules if s.schedule_id != schedule_id]
-    
-    if len(schedules_to_keep) == initial_length:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found")
-    
-    write_schedules_data(schedules_to_keep)
+    with precondition(if_match) as version:
+        if get_store().delete("schedules", schedule_id, expected_version=version) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found")
     
     # A 204 response does not return any content in the body
     return
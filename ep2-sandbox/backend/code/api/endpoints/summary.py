@@ -0,0 +1,45 @@
+# backend/api/endpoints/summary.py
+
+from fastapi import APIRouter, HTTPException
+from api.conditional import conditional, today_utc
+from api.endpoints.financials import (
+    average_monthly_cash_flow, cash_flow_last_30_days, debt_accounts, investment_accounts,
+)
+from api.metrics import TimedRoute
+from api.models import UserSummary
+from core.networth import get_net_worth_view
+from core.store import get_store
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/users/{user_id}/summary", response_model=UserSummary,
+            dependencies=[conditional("users", "accounts", "transactions", "life_goals", "schedules",
+                                      vary=today_utc)])
+def get_user_summary(user_id: str):
+    """
+    Get everything the dashboard shows for a user in one call: profile,
+    accounts, debts, investments, net worth, cash flow, goals and schedules.
+    All parts are read from the same state of the store.
+    """
+    normalized_user_id = user_id.replace("_", "-")
+    store = get_store()
+
+    with store.consistent_read():
+        user = store.get("users", normalized_user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        accounts = store.find("accounts", "user_id", normalized_user_id)
+        net_worth, _ = get_net_worth_view(store).get(normalized_user_id)
+
+        return {
+            "profile": {**user, "net_worth": net_worth},
+            "accounts": accounts,
+            "debts": debt_accounts(accounts),
+            "investments": investment_accounts(accounts),
+            "net_worth": net_worth,
+            "cash_flow_last_30_days": cash_flow_last_30_days(store, normalized_user_id),
+            "average_monthly_cash_flow": average_monthly_cash_flow(store, normalized_user_id),
+            "goals": store.find("life_goals", "user_id", normalized_user_id),
+            "schedules": store.find("schedules", "user_id", normalized_user_id),
+        }
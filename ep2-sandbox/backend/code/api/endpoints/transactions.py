@@ -1,50 +1,173 @@
 # backend/api/endpoints/transactions.py
 
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Iterator, List, Optional
+from api.conditional import conditional, today_utc
+from api.metrics import TimedRoute
+from api.models import BulkIngestResult, Transaction
+from api.responses import rows_response
+from core.ingest import CsvParser, LineSplitter, NdjsonParser, Record, TransactionValidator
+from core.store import Row, TransactionPosition, get_store, transaction_position
+
+import base64
 import json
-from fastapi import APIRouter, HTTPException
-from typing import List
-from api.models import Transaction, Account
+import orjson
+from datetime import datetime, time, timedelta, timezone
+from itertools import islice
+
+router = APIRouter(route_class=TimedRoute)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+MAX_PAGE_SIZE = 1000
+
+# Records validated and stored per batch during a bulk ingest
+INGEST_CHUNK_ROWS = 5000
+# Row errors listed in a bulk ingest response; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def encode_cursor(row: Row) -> str:
+    """Opaque cursor pointing just past `row` in (date, transaction_id) order."""
+    date, transaction_id = transaction_position(row)
+    raw = json.dumps([date.isoformat(), transaction_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
 
-from datetime import datetime, timedelta, timezone
+def decode_cursor(cursor: str) -> TransactionPosition:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, transaction_id = json.loads(raw)
+        return datetime.fromisoformat(date), str(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-router = APIRouter()
 
-TRANSACTIONS_FILE = "db/transactions.json"
-ACCOUNTS_FILE = "db/accounts.json"
+def ndjson_lines(rows: Iterator[Row]) -> Iterator[bytes]:
+    for row in rows:
+        yield orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def history_cutoff(history: int) -> datetime:
+    """
+    Start of the history window: midnight UTC `history` days before today,
+    which covers everything since `history` days ago to the second.
+    """
+    first_day = datetime.now(timezone.utc).date() - timedelta(days=history)
+    return datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+
 
-def read_transactions_data() -> List[Transaction]:
-    with open(TRANSACTIONS_FILE, "r") as f:
-        transactions_data = json.load(f)
-    return [Transaction(**tx) for tx in transactions_data]
+def listing_variant(request: Request) -> str:
+    """The history window moves with the date, and each media type gets its own ETag."""
+    return f"{today_utc(request)}:{'ndjson' if wants_ndjson(request) else 'json'}"
 
-def read_accounts_data() -> List[Account]:
-    with open(ACCOUNTS_FILE, "r") as f:
-        accounts_data = json.load(f)
-    return [Account(**acc) for acc in accounts_data]
 
-@router.get("/users/{user_id}/transactions", response_model=List[Transaction])
-def get_user_transactions(user_id: str, history: int = 30):
+@router.get("/users/{user_id}/transactions", response_model=List[Transaction],
+            dependencies=[conditional("accounts", "transactions", vary=listing_variant)])
+def get_user_transactions(
+    user_id: str,
+    request: Request,
+    response: Response,
+    history: int = 30,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
     """
-    Get all transactions for a user from the last N days.
+    Get the transactions for a user from the last N days, oldest first. The
+    window starts at midnight UTC N days ago, so it holds whole UTC days.
+
+    With `limit`, at most that many transactions are returned and, if more
+    remain, the `X-Next-Cursor` response header holds the `cursor` to pass to
+    fetch the next page. With `Accept: application/x-ndjson` the transactions
+    are sent one JSON object per line, streamed as they are read when there
+    is no `limit`.
     """
-    # Calculate the cutoff date for the history period
-    now = datetime.now(timezone.utc)
-    cutoff_date = now - timedelta(days=history)
+    # The cutoff only moves when the date does, so the ETag's date covers it
+    cutoff_date = history_cutoff(history)
 
     normalized_user_id = user_id.replace("_", "-")
-    accounts = read_accounts_data()
-    user_account_ids = [acc.account_id for acc in accounts if acc.user_id == normalized_user_id]
+    store = get_store()
 
-    if not user_account_ids:
+    if not store.find("accounts", "user_id", normalized_user_id):
         raise HTTPException(status_code=404, detail="User or user accounts not found")
 
-    transactions = read_transactions_data()
-    
-    # Filter transactions by account and date
-    user_transactions = [
-        tx for tx in transactions 
-        if tx.account_id in user_account_ids and 
-           datetime.fromisoformat(tx.date.replace('Z', '+00:00')) >= cutoff_date
-    ]
-    
-    return user_transactions
+    after = decode_cursor(cursor) if cursor else None
+    rows = store.iter_transactions_for_user(normalized_user_id, since=cutoff_date, after=after)
+
+    if limit is None:
+        if wants_ndjson(request):
+            return StreamingResponse(ndjson_lines(rows), media_type=NDJSON_MEDIA_TYPE,
+                                     headers={"ETag": response.headers["ETag"]})
+        return rows_response(list(rows), response)
+
+    # Read one row past the page to tell whether there is a next page
+    page = list(islice(rows, limit + 1))
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1])
+    if wants_ndjson(request):
+        # A page is at most MAX_PAGE_SIZE rows, read before the headers are sent
+        return StreamingResponse(ndjson_lines(iter(page)), media_type=NDJSON_MEDIA_TYPE,
+                                 headers=dict(response.headers))
+    return rows_response(page, response)
+
+
+@router.post("/transactions:bulk", response_model=BulkIngestResult)
+async def bulk_ingest_transactions(request: Request, account_id: Optional[str] = None):
+    """
+    Load many transactions from a CSV (`Content-Type: text/csv`) or NDJSON
+    (`application/x-ndjson`) body.
+
+    Rows may have the `Transaction` fields or the columns of
+    `transaction_history.csv`; `account_id` is used for rows without one.
+    The body is read in chunks of INGEST_CHUNK_ROWS records, and the valid
+    rows of each are stored as one batch before the next is read, so derived
+    views are updated once per chunk and memory does not grow with the body.
+    Each batch is checked again in the same store transaction as its insert,
+    so a row another writer stored meanwhile is not overwritten. Invalid rows
+    are skipped and reported by line.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type == CSV_MEDIA_TYPE:
+        parser = CsvParser()
+    elif media_type == NDJSON_MEDIA_TYPE:
+        parser = NdjsonParser()
+    else:
+        raise HTTPException(status_code=415, detail=f"Send {CSV_MEDIA_TYPE} or {NDJSON_MEDIA_TYPE}")
+
+    store = get_store()
+    validator = TransactionValidator(store, default_account_id=account_id)
+    splitter = LineSplitter()
+    totals = {"received": 0, "rejected": 0, "inserted": 0}
+    reported: List[dict] = []
+
+    def report(errors: List[dict]):
+        totals["rejected"] += len(errors)
+        reported.extend(errors[:max(MAX_REPORTED_ERRORS - len(reported), 0)])
+
+    def ingest(records: List[Record]):
+        rows, errors = validator.validate(records)
+        totals["received"] += len(records)
+        report(errors)
+        if rows:
+            with store.transaction("accounts", "transactions"):
+                totals["inserted"] += store.insert_many("transactions", validator.confirm(rows))
+            report(validator.late_errors)
+            validator.late_errors = []
+
+    pending: List[Record] = []
+    async for chunk in request.stream():
+        pending.extend(parser.feed(splitter.feed(chunk)))
+        if len(pending) >= INGEST_CHUNK_ROWS:
+            await run_in_threadpool(ingest, pending)
+            pending = []
+    pending.extend(parser.feed(splitter.close()))
+    pending.extend(parser.close())
+    await run_in_threadpool(ingest, pending)
+    return BulkIngestResult(errors=reported, **totals)
@@ -1,49 +1,35 @@
 # backend/api/endpoints/users.py
 
-import json
 from fastapi import APIRouter, HTTPException
 from typing import List
-from api.models import User, Account
+from api.conditional import conditional
+from api.metrics import TimedRoute
+from api.models import User
+from core.networth import get_net_worth_view
+from core.store import get_store
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-USERS_DATA_FILE = "db/users.json"
-ACCOUNTS_DATA_FILE = "db/accounts.json"
-
-def read_users_data() -> List[User]:
-    with open(USERS_DATA_FILE, "r") as f:
-        users_data = json.load(f)
-    return [User(**user) for user in users_data]
-
-def read_accounts_data() -> List[Account]:
-    with open(ACCOUNTS_DATA_FILE, "r") as f:
-        accounts_data = json.load(f)
-    return [Account(**acc) for acc in accounts_data]
-
-@router.get("/users", response_model=List[User])
+@router.get("/users", response_model=List[User], dependencies=[conditional("users")])
 def get_users():
     """
     Get all users.
     """
-    return read_users_data()
+    return get_store().all("users")
 
-@router.get("/users/{user_id}", response_model=User)
+@router.get("/users/{user_id}", response_model=User, dependencies=[conditional("users", "accounts")])
 def get_user(user_id: str):
     """
     Get user profile.
     """
     normalized_user_id = user_id.replace("_", "-")
-    
-    users = read_users_data()
-    user = next((u for u in users if u.user_id == normalized_user_id), None)
-    
+    store = get_store()
+
+    user = store.get("users", normalized_user_id)
+
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    accounts = read_accounts_data()
-    user_accounts = [acc for acc in accounts if acc.user_id == normalized_user_id]
-    
-    net_worth = sum(acc.balance for acc in user_accounts)
-    user.net_worth = net_worth
-    
-    return user
+
+    net_worth, _ = get_net_worth_view(store).get(normalized_user_id)
+
+    return {**user, "net_worth": net_worth}
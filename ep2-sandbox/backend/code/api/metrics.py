@@ -0,0 +1,128 @@
+# backend/api/metrics.py
+
+"""
+Collects the request metrics of `core/metrics.py` and serves them at /metrics.
+
+`MetricsMiddleware` is a plain ASGI middleware, so it sees streamed bodies
+byte for byte and does not buffer responses. Routes are labelled with their
+path template ("/api/users/{user_id}") rather than the request path, which
+keeps the number of series bounded; routers opt in with
+`APIRouter(route_class=TimedRoute)`, which also marks when the endpoint
+function starts and returns so its time can be told apart from serialization.
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Callable
+
+from fastapi import APIRouter, Response
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import METRICS, UNMATCHED_ROUTE, Metrics, RequestTimings, current_timings
+
+
+def _mark_start():
+    timings = current_timings.get()
+    if timings is not None:
+        timings.handler_start = time.perf_counter()
+        timings.storage_at_start = timings.storage
+
+
+def _mark_end():
+    timings = current_timings.get()
+    if timings is not None:
+        timings.handler_end = time.perf_counter()
+        timings.storage_at_end = timings.storage
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """Wraps an endpoint to record when it starts and returns; FastAPI still sees its signature."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            _mark_start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _mark_end()
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        _mark_start()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            _mark_end()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """An APIRoute that reports its path template and endpoint timings to the metrics."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def matches(self, scope: Scope):
+        match, child_scope = super().matches(scope)
+        if match != Match.NONE:
+            child_scope["route_path"] = self.path
+        return match, child_scope
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, metrics: Metrics = METRICS):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        sizes = {"request": 0, "response": 0}
+        status = 500
+
+        async def counting_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.started()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            finished = time.perf_counter()
+            current_timings.reset(token)
+            # Bodies the endpoint never read still count, by their declared length
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length" and value.isdigit():
+                    sizes["request"] = max(sizes["request"], int(value))
+            self.metrics.record(scope["method"], scope.get("route_path", UNMATCHED_ROUTE), status,
+                                finished - started, sizes["request"], sizes["response"], timings.phases(finished))
+
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/metrics", tags=["Metrics"], include_in_schema=False)
+def get_metrics():
+    """Request metrics of this worker in the Prometheus text format."""
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -43,6 +43,18 @@ class Transaction(BaseModel):
     amount: float
     category: str
 
+class BulkRowError(BaseModel):
+    line: int
+    transaction_id: Optional[str] = None
+    error: str
+
+class BulkIngestResult(BaseModel):
+    received: int
+    inserted: int
+    rejected: int
+    # At most MAX_REPORTED_ERRORS; `rejected` counts them all
+    errors: List[BulkRowError]
+
 class EligibilityCriteria(BaseModel):
     minimum_credit_score: Optional[int] = None
 
@@ -55,6 +67,14 @@ class BankPartner(BaseModel):
     benefit_value: float
     eligibility_criteria: Optional[EligibilityCriteria] = None
 
+class PartnerEligibilityRequest(BaseModel):
+    user_ids: List[str] = []
+
+class PartnerEligibility(BaseModel):
+    partners: List[BankPartner]
+    eligible: Dict[str, List[str]]
+    not_found: List[str] = []
+
 class LifeGoal(BaseModel):
     goal_id: str = Field(default_factory=lambda: f"goal-{uuid4()}")
     user_id: str
@@ -84,6 +104,23 @@ class CashFlow(BaseModel):
 class AverageCashFlow(BaseModel):
     average_monthly_cash_flow: float
 
+class CashFlowRange(BaseModel):
+    start: Optional[datetime.date] = None
+    end: Optional[datetime.date] = None
+    cash_flow: float
+
+class SpendingGroup(BaseModel):
+    key: str
+    total: float
+    count: int
+
+class Spending(BaseModel):
+    group_by: str
+    start: Optional[datetime.date] = None
+    end: Optional[datetime.date] = None
+    total: float
+    groups: List[SpendingGroup]
+
 class Schedule(BaseModel):
     user_id: str
     schedule_id: str
@@ -95,14 +132,43 @@ class Schedule(BaseModel):
     end_date: str
     amount: float
 
+class AccountForecast(BaseModel):
+    account_id: str
+    balance: float
+    changes: List[float]
+    projected_balances: List[float]
+
+class Forecast(BaseModel):
+    user_id: str
+    months: List[str]
+    net_change: List[float]
+    accounts: List[AccountForecast]
+
+class UserSummary(BaseModel):
+    profile: User
+    accounts: List[Account]
+    debts: List[Account]
+    investments: List[Account]
+    net_worth: float
+    cash_flow_last_30_days: float
+    average_monthly_cash_flow: float
+    goals: List[LifeGoal]
+    schedules: List[Schedule]
+
 class Meeting(BaseModel):
     meeting_id: str = Field(default_factory=lambda: f"meet-{uuid4()}")
     user_id: str
+    advisor_id: Optional[str] = None
     advisor_name: str
     advisor_type: str
     meeting_time: datetime.datetime
+    duration_minutes: int = Field(60, gt=0, le=480)
     notes: Optional[str] = None
 
+class FreeSlot(BaseModel):
+    start: datetime.datetime
+    end: datetime.datetime
+
 class Advisor(BaseModel):
     advisor_id: str = Field(default_factory=lambda: f"adv-{uuid4()}")
     name: str
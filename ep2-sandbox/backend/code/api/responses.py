@@ -0,0 +1,25 @@
+# backend/api/responses.py
+
+"""
+Fast path for responses made of rows straight from the store.
+
+Rows in the store were validated when they were written, so validating them
+again against the endpoint's `response_model` and serializing them through
+Pydantic is pure overhead on large listings. `rows_response` hands them to
+orjson directly; the endpoint keeps its `response_model` for the OpenAPI
+schema. Only use it where the stored rows already have the exact shape of
+the model, i.e. every field is present.
+"""
+
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+
+def rows_response(content: Any, response: Response) -> ORJSONResponse:
+    """
+    Serializes `content` with orjson, bypassing `response_model` validation.
+    Headers already set on `response` (ETag, pagination) are carried over.
+    """
+    return ORJSONResponse(content, headers=dict(response.headers))
@@ -0,0 +1,220 @@
+# app/core/advisor_calendar.py
+
+"""
+Advisor calendars: booked meetings per advisor, for conflict checks and free slots.
+
+Each advisor's meetings are kept as half-open [start, end) intervals in epoch
+seconds, sorted by start, along with the running maximum of their ends. New
+bookings are only accepted when they overlap no existing interval, but rows
+written before that check, or straight into the data files, may overlap, so
+nothing relies on the ends themselves being sorted. Whether a new meeting
+conflicts is then a bisection on the starts and a look at the running end
+before it, and the meetings inside any window are found by bisecting the
+running ends.
+
+Meetings name their advisor by `advisor_id` or, in older rows, only by
+`advisor_name`; the latter is resolved through the advisors collection, and a
+name that matches no advisor gets a calendar of its own. Weekly availability
+("Monday 10:00-12:00") and meeting times are taken in UTC.
+
+The calendar subscribes to the store and applies each meeting write as it
+happens; a reload of either collection marks it stale and it is rebuilt on
+the next read.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from core.store import DerivedView, Row, Store, date_epoch, epoch_seconds
+
+# Length of a meeting that does not state one
+DEFAULT_MEETING_MINUTES = 60
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+Interval = Tuple[int, int]
+
+
+def meeting_interval(meeting: Row) -> Interval:
+    """[start, end) of a meeting in epoch seconds."""
+    start = date_epoch(meeting["meeting_time"])
+    return start, start + 60 * (meeting.get("duration_minutes") or DEFAULT_MEETING_MINUTES)
+
+
+def parse_availability(entry: str) -> Tuple[int, time, time]:
+    """"Monday 10:00-12:00" -> (weekday, start, end)."""
+    day, hours = entry.split()
+    start, end = hours.split("-")
+    return WEEKDAYS.index(day.lower()), time.fromisoformat(start), time.fromisoformat(end)
+
+
+def availability_windows(advisor: Row, start: date, days: int) -> List[Interval]:
+    """The advisor's weekly availability laid out over `days` days from `start`, merged and sorted."""
+    weekly = []
+    for entry in advisor.get("availability", []):
+        try:
+            weekly.append(parse_availability(entry))
+        except ValueError:
+            # Skip entries that are not in the "Day HH:MM-HH:MM" form
+            continue
+
+    windows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for weekday, opens, closes in weekly:
+            if weekday == day.weekday() and opens < closes:
+                windows.append((epoch_seconds(datetime.combine(day, opens, timezone.utc)),
+                                epoch_seconds(datetime.combine(day, closes, timezone.utc))))
+    windows.sort()
+
+    merged: List[Interval] = []
+    for lo, hi in windows:
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+class Bookings:
+    """
+    One advisor's booked intervals, sorted by start, with the meeting ID of each.
+
+    `reach[i]` is the latest end among the first i + 1 intervals. The intervals
+    may overlap, so their ends need not be sorted, but `reach` always is.
+    """
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.reach: List[int] = []
+        self.meeting_ids: List[str] = []
+
+    def _extend_reach(self, i: int):
+        """Recompute `reach` from position i on."""
+        del self.reach[i:]
+        for end in self.ends[i:]:
+            self.reach.append(max(self.reach[-1], end) if self.reach else end)
+
+    def add(self, interval: Interval, meeting_id: str):
+        i = bisect_right(self.starts, interval[0])
+        self.starts.insert(i, interval[0])
+        self.ends.insert(i, interval[1])
+        self.meeting_ids.insert(i, meeting_id)
+        self._extend_reach(i)
+
+    def remove(self, interval: Interval, meeting_id: str):
+        i = bisect_left(self.starts, interval[0])
+        while i < len(self.starts) and self.starts[i] == interval[0]:
+            if self.meeting_ids[i] == meeting_id:
+                del self.starts[i], self.ends[i], self.meeting_ids[i]
+                self._extend_reach(i)
+                return
+            i += 1
+
+    def conflict(self, interval: Interval) -> Optional[str]:
+        """ID of a booked meeting overlapping `interval`, if any."""
+        start, end = interval
+        i = bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] < end:
+            return self.meeting_ids[i]
+        if i > 0 and self.reach[i - 1] > start:
+            # Some interval starting earlier runs past `start`; the nearest such one
+            for j in range(i - 1, -1, -1):
+                if self.ends[j] > start:
+                    return self.meeting_ids[j]
+        return None
+
+    def busy(self, window: Interval) -> List[Interval]:
+        """Booked intervals overlapping `window`, in order of start."""
+        lo, hi = window
+        busy = []
+        # Before the first running end past `lo`, every interval has ended by `lo`
+        for i in range(bisect_right(self.reach, lo), len(self.starts)):
+            if self.starts[i] >= hi:
+                break
+            if self.ends[i] > lo:
+                busy.append((self.starts[i], self.ends[i]))
+        return busy
+
+
+class AdvisorCalendar(DerivedView):
+    """Per-advisor `Bookings`, kept in sync with a store through its listener hook."""
+
+    collections = ("advisors", "meetings")
+
+    def __init__(self, store: Store):
+        self.advisor_ids: Dict[str, str] = {}
+        self.bookings: Dict[str, Bookings] = {}
+        super().__init__(store)
+
+    def _key(self, meeting: Row) -> str:
+        return meeting.get("advisor_id") or self.advisor_ids.get(meeting["advisor_name"], meeting["advisor_name"])
+
+    def _apply(self, meeting: Row, add: bool):
+        try:
+            interval = meeting_interval(meeting)
+        except (KeyError, TypeError, ValueError):
+            # A meeting without a usable time blocks nothing
+            return
+        bookings = self.bookings.setdefault(self._key(meeting), Bookings())
+        if add:
+            bookings.add(interval, meeting["meeting_id"])
+        else:
+            bookings.remove(interval, meeting["meeting_id"])
+
+    def build(self, store: Store) -> Tuple[List[Row], List[Row]]:
+        return store.all("advisors"), store.all("meetings")
+
+    def publish(self, state: Tuple[List[Row], List[Row]]):
+        advisors, meetings = state
+        self.advisor_ids = {advisor["name"]: advisor["advisor_id"] for advisor in advisors}
+        self.bookings = {}
+        for meeting in meetings:
+            self._apply(meeting, add=True)
+
+    def apply(self, name: str, old: Optional[Row], new: Optional[Row]):
+        if name == "advisors":
+            self.stale = True
+            return
+        if old is not None:
+            self._apply(old, add=False)
+        if new is not None:
+            self._apply(new, add=True)
+
+    def advisor_id(self, advisor_name: str) -> Optional[str]:
+        """ID of the advisor with this name, or None if there is none."""
+        self.fresh()
+        with self.lock:
+            return self.advisor_ids.get(advisor_name)
+
+    def conflict(self, meeting: Row) -> Optional[str]:
+        """ID of a meeting already booked with the same advisor that overlaps `meeting`, if any."""
+        self.fresh()
+        with self.lock:
+            bookings = self.bookings.get(self._key(meeting))
+            return bookings.conflict(meeting_interval(meeting)) if bookings else None
+
+    def free_slots(self, advisor: Row, start: date, days: int, min_minutes: int) -> List[Interval]:
+        """
+        Gaps of at least `min_minutes` in the advisor's availability over `days`
+        days from `start`, once their booked meetings are taken out.
+        """
+        self.fresh()
+        min_seconds = 60 * min_minutes
+        free = []
+        with self.lock:
+            bookings = self.bookings.get(advisor["advisor_id"], Bookings())
+            for lo, hi in availability_windows(advisor, start, days):
+                cursor = lo
+                for busy_start, busy_end in bookings.busy((lo, hi)):
+                    if busy_start - cursor >= min_seconds:
+                        free.append((cursor, busy_start))
+                    cursor = max(cursor, busy_end)
+                if hi - cursor >= min_seconds:
+                    free.append((cursor, hi))
+        return free
+
+
+get_advisor_calendar = AdvisorCalendar.attached
@@ -0,0 +1,94 @@
+# app/core/cashflow.py
+
+"""
+Per-user daily net cash flow with prefix sums.
+
+For each user the index keeps the sorted days (days since the Unix epoch,
+UTC) on which they had transactions and, aligned with them, the running
+total of their net flow up to and including that day. The net flow over any
+window is then two binary searches and a subtraction, independent of how
+many transactions the user has.
+
+The series are built per user from their transaction columns
+(`core/columnar.py`), which are read from the store's indexed per-user
+listing: one `np.add.reduceat` sums each day and a cumulative sum gives the
+running totals. A transaction write updates the series of the user it
+touches in place of a rebuild: the amount goes into its day, and into the
+running totals from that day on. An account write drops the owner's series
+and a reload drops every user's; each is rebuilt from its own transactions
+when next read, never from a scan of every user's. Running totals are kept
+as `Decimal`, as in the net worth view, so however many updates they go
+through they equal a fresh sum of the amounts. Transactions whose date does
+not parse, or whose amount is not a number, are left out.
+"""
+
+from decimal import Decimal
+from typing import Optional
+
+import numpy as np
+
+from core.columnar import ColumnarIndex, TransactionColumns, group_sums
+
+
+def _amount(amount: float) -> Decimal:
+    return Decimal(repr(amount))
+
+
+class DailySeries:
+    """
+    Sorted days with the running total of net flow through each day, an
+    object array of `Decimal`.
+    """
+
+    def __init__(self, days: np.ndarray, prefix: np.ndarray):
+        self.days = days
+        self.prefix = prefix
+
+    @classmethod
+    def of(cls, days: np.ndarray, amounts: np.ndarray) -> "DailySeries":
+        """Sums transactions given as aligned arrays of epoch days and amounts, in any order."""
+        exact = np.array([_amount(amount) for amount in amounts.tolist()], dtype=object)
+        days, daily, _ = group_sums(days, exact)
+        return cls(days, np.cumsum(daily))
+
+    def plus(self, day: int, amount: float) -> "DailySeries":
+        """
+        A copy with `amount` added on `day`: to that day's flow and every
+        running total from it on. Readers may still hold this series, so it
+        is left as it is.
+        """
+        i = int(np.searchsorted(self.days, day))
+        if i < len(self.days) and self.days[i] == day:
+            days, prefix = self.days, self.prefix.copy()
+        else:
+            days = np.insert(self.days, i, day)
+            prefix = np.insert(self.prefix, i, self._through(i))
+        prefix[i:] += _amount(amount)
+        return DailySeries(days, prefix)
+
+    def _through(self, i: int) -> Decimal:
+        """Running total over the first `i` days."""
+        return self.prefix[i - 1] if i else Decimal(0)
+
+    def total(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> float:
+        """Net flow over start_day <= day < end_day."""
+        lo = int(np.searchsorted(self.days, start_day)) if start_day is not None else 0
+        hi = int(np.searchsorted(self.days, end_day)) if end_day is not None else len(self.days)
+        return float(self._through(hi) - self._through(lo)) if hi > lo else 0.0
+
+
+class CashflowIndex(ColumnarIndex):
+    """Per-user `DailySeries`, loaded on demand and kept in sync with a store through its listener hook."""
+
+    def derive(self, columns: TransactionColumns) -> DailySeries:
+        return DailySeries.of(columns.days, columns.amounts)
+
+    def revise(self, state: DailySeries, day: int, amount: float) -> DailySeries:
+        return state.plus(day, amount)
+
+    def total(self, user_id: str, start_day: Optional[int] = None, end_day: Optional[int] = None) -> float:
+        """Net cash flow of the user over start_day <= day < end_day."""
+        return self.user(user_id).total(start_day, end_day)
+
+
+get_cashflow_index = CashflowIndex.attached
@@ -0,0 +1,232 @@
+# app/core/columnar.py
+
+"""
+Per-user columnar transaction arrays for the financial aggregates.
+
+A user's transactions are held as NumPy columns: the UTC epoch day (int64),
+the amount (float64) and int32 codes for the account, category and
+merchant, sorted by (account, day). Aggregates are vectorized masks over
+those columns, and per-group totals a single `np.add.reduceat` over the
+selected rows ordered by group, rather than Python loops over rows.
+
+Columns are built per user, on first read, from the store's indexed
+per-user listing. The day column comes from the epochs the store keeps for
+its date-sorted listings, so no date is parsed again; a read never decodes
+another user's transactions, and a
+worker only holds columns for the users it serves: at most
+`MAX_CACHED_USERS` of them, the least recently read dropped first. A write
+drops the columns of the user it touches; a reload of the underlying
+collections, such as another worker's writes, drops every user's. Each is
+rebuilt from its own listing when next read. Transactions whose date does
+not parse (which the listing leaves out), or whose amount is not a finite
+number, are left out.
+"""
+
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.store import DerivedView, Row, Store, date_epoch
+
+# Users whose columns a worker keeps at once
+MAX_CACHED_USERS = 1024
+
+SECONDS_PER_DAY = 86400
+
+
+def _amount(transaction: Row) -> Optional[float]:
+    """Amount of the transaction, or None if it is not a finite number."""
+    amount = transaction.get("amount")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount):
+        return None
+    return float(amount)
+
+
+def _entry(transaction: Row) -> Optional[Tuple[int, float]]:
+    """(epoch day, amount) of the transaction, or None if the columns leave it out."""
+    amount = _amount(transaction)
+    try:
+        day = date_epoch(transaction["date"]) // SECONDS_PER_DAY
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (day, amount) if amount is not None else None
+
+
+def month_of(days: np.ndarray) -> np.ndarray:
+    """Months since January 1970 of epoch days."""
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def group_sums(codes: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The distinct `codes` in ascending order, with the sum and the number of the `values` of each."""
+    if not len(codes):
+        return codes, values, np.zeros(0, dtype=np.int64)
+    order = np.argsort(codes, kind="stable")
+    codes, values = codes[order], values[order]
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    return codes[starts], np.add.reduceat(values, starts), np.diff(np.append(starts, len(codes)))
+
+
+class TransactionColumns:
+    """
+    One user's transactions as columns sorted by (account, day), built from
+    (UTC epoch seconds, row) pairs as `iter_dated_transactions_for_user`
+    lists them.
+
+    `accounts`, `categories` and `merchants` hold codes into the lists of
+    names of the same name with an `_names` suffix.
+    """
+
+    def __init__(self, transactions: Iterable[Tuple[int, Row]]):
+        names: Tuple[Dict[Any, int], Dict[Any, int], Dict[Any, int]] = ({}, {}, {})
+        epochs: List[int] = []
+        amounts: List[float] = []
+        codes: Tuple[List[int], List[int], List[int]] = ([], [], [])
+        for epoch, t in transactions:
+            amount = _amount(t)
+            if amount is None:
+                continue
+            epochs.append(epoch)
+            amounts.append(amount)
+            for field, known, column in zip(("account_id", "category", "merchant_id"), names, codes):
+                column.append(known.setdefault(t.get(field), len(known)))
+
+        accounts = np.array(codes[0], dtype=np.int32)
+        # Rows come in (date, transaction_id) order, which a stable sort keeps within each account
+        order = np.argsort(accounts, kind="stable")
+        # Floor division keeps the days of dates before 1970 right
+        self.days = (np.array(epochs, dtype=np.int64) // SECONDS_PER_DAY)[order]
+        self.amounts = np.array(amounts, dtype=np.float64)[order]
+        self.accounts = accounts[order]
+        self.categories = np.array(codes[1], dtype=np.int32)[order]
+        self.merchants = np.array(codes[2], dtype=np.int32)[order]
+        self.account_names, self.category_names, self.merchant_names = (list(known) for known in names)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def window(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> np.ndarray:
+        """Mask of the transactions dated start_day <= day < end_day; either bound may be None."""
+        mask = np.ones(len(self.days), dtype=bool)
+        if start_day is not None:
+            mask &= self.days >= start_day
+        if end_day is not None:
+            mask &= self.days < end_day
+        return mask
+
+    def net_flow(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> float:
+        """Sum of the amounts dated start_day <= day < end_day."""
+        return float(self.amounts[self.window(start_day, end_day)].sum())
+
+    def totals(self, codes: np.ndarray, mask: np.ndarray, names: List[Any]) -> List[Tuple[Any, float, int]]:
+        """(name, sum of amounts, count) of each group of `codes` among the rows selected by `mask`."""
+        groups, sums, counts = group_sums(codes[mask], self.amounts[mask])
+        return [(names[code], float(total), int(count)) for code, total, count in zip(groups, sums, counts)]
+
+
+class ColumnarIndex(DerivedView):
+    """
+    Per-user `TransactionColumns` of a store, loaded on demand and dropped as
+    the user's accounts or transactions change.
+
+    Subclasses may keep less than the whole columns per user by overriding
+    `derive`, and update what they keep on a transaction write instead of
+    dropping it by overriding `revise`.
+    """
+
+    collections = ("transactions", "accounts")
+
+    def __init__(self, store: Store, max_users: int = MAX_CACHED_USERS):
+        self.max_users = max_users
+        self.users: "OrderedDict[str, Any]" = OrderedDict()
+        # Accounts of the users kept or being loaded, so a transaction write finds whose data it changes
+        self.account_users: Dict[str, str] = {}
+        self.user_accounts: Dict[str, List[str]] = {}
+        # Token of each load in flight; a write to the user's data withdraws it
+        self.loading: Dict[str, object] = {}
+        super().__init__(store)
+
+    def build(self, store: Store) -> None:
+        # Nothing is read up front; users are loaded as they are read
+        return None
+
+    def publish(self, state: None):
+        self.users.clear()
+        self.account_users.clear()
+        self.user_accounts.clear()
+        self.loading.clear()
+
+    def apply(self, name: str, old: Optional[Row], new: Optional[Row]):
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            if name == "accounts":
+                self._drop(row["user_id"])
+                # The account may have changed hands; whoever loads it next registers it again
+                owner = self.account_users.pop(row["account_id"], None)
+                if owner is not None:
+                    self._drop(owner)
+            else:
+                owner = self.account_users.get(row.get("account_id"))
+                if owner is None:
+                    continue
+                entry = _entry(row)
+                if entry is None:
+                    # Not in the columns, so nothing derived from them changes
+                    continue
+                state = self.users.get(owner)
+                day, amount = entry
+                revised = self.revise(state, day, sign * amount) if state is not None else None
+                if revised is None:
+                    self._drop(owner)
+                else:
+                    self.users[owner] = revised
+
+    def _drop(self, user_id: str):
+        self.users.pop(user_id, None)
+        self.loading.pop(user_id, None)
+        for account_id in self.user_accounts.pop(user_id, ()):
+            if self.account_users.get(account_id) == user_id:
+                del self.account_users[account_id]
+
+    def derive(self, columns: TransactionColumns) -> Any:
+        """What is kept of a user's columns; the columns themselves by default."""
+        return columns
+
+    def revise(self, state: Any, day: int, amount: float) -> Any:
+        """
+        `state` with a transaction of `amount` added on `day` (negative to
+        remove one), as a new object since readers may hold the old one; or
+        None to drop the user and load them again when next read, the default.
+        """
+        return None
+
+    def user(self, user_id: str) -> Any:
+        """The derived columns of the user, loading them from the store if they are not kept."""
+        self.fresh()
+        with self.lock:
+            state = self.users.get(user_id)
+            if state is not None:
+                self.users.move_to_end(user_id)
+                return state
+            token = self.loading[user_id] = object()
+
+        store = self.store_ref()
+        accounts = [acc["account_id"] for acc in store.find("accounts", "user_id", user_id)]
+        with self.lock:
+            if self.loading.get(user_id) is token:
+                self.user_accounts[user_id] = accounts
+                for account_id in accounts:
+                    self.account_users[account_id] = user_id
+        state = self.derive(TransactionColumns(store.iter_dated_transactions_for_user(user_id)))
+
+        with self.lock:
+            # Only kept if no write to the user's data landed while it was read
+            if self.loading.get(user_id) is token:
+                del self.loading[user_id]
+                self.users[user_id] = state
+                while len(self.users) > self.max_users:
+                    self._drop(next(iter(self.users)))
+        return state
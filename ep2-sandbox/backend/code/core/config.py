@@ -3,4 +3,33 @@
 # In a real application, this would load from environment variables or a config file.
 # For this sandbox, we can keep it simple.
 
+import os
+
 API_PREFIX = "/api"
+
+# Directory holding the JSON "database" files. Relative paths are resolved
+# against the working directory, which is `code/` locally and `/app` in Docker.
+DB_DIR = os.environ.get("DB_DIR", "db")
+
+# Number of journaled writes after which a collection's journal is folded
+# back into its JSON snapshot.
+JOURNAL_COMPACT_THRESHOLD = int(os.environ.get("JOURNAL_COMPACT_THRESHOLD", "1000"))
+
+# Whether every journal append and snapshot is fsync'ed before returning.
+JOURNAL_FSYNC = os.environ.get("JOURNAL_FSYNC", "true").lower() == "true"
+
+# Storage backend serving the routers: "json" (in-memory store over the JSON
+# files in DB_DIR), "mmap" (the same files converted to memory-mapped columnar
+# snapshots that several worker processes share) or "sqlite" (the SQLite
+# database at SQLITE_PATH).
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(DB_DIR, "cymbal.sqlite3"))
+
+# Whether a background thread books due schedule occurrences as transactions,
+# and whether occurrences missed while it was not running are booked too.
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "false").lower() == "true"
+SCHEDULER_CATCH_UP = os.environ.get("SCHEDULER_CATCH_UP", "true").lower() == "true"
+
+# Seconds between keep-alive comments on an idle change stream
+# (GET /users/{user_id}/events), so proxies keep the connection open.
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "15"))
@@ -0,0 +1,63 @@
+# app/core/eligibility.py
+
+"""
+Partner eligibility by credit score.
+
+Partners are kept in one list: first those anyone can use (no
+`minimum_credit_score`), then the rest sorted by their minimum score, with
+the minimums in a parallel list. The partners a given score qualifies for are
+therefore always a prefix of that list, found with one bisection. The index is
+marked stale whenever the partners collection changes and rebuilt on the next
+read; partner catalogues are small, so there is nothing to gain from
+maintaining it incrementally.
+"""
+
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from core.store import DerivedView, Row, Store
+
+
+def minimum_credit_score(partner: Row) -> Optional[int]:
+    """The partner's minimum credit score, or None if it has no such condition."""
+    return (partner.get("eligibility_criteria") or {}).get("minimum_credit_score")
+
+
+class PartnerIndex(DerivedView):
+    """Partners ordered by minimum credit score, kept in sync with a store through its listener hook."""
+
+    collections = ("bank_partners",)
+
+    def __init__(self, store: Store):
+        self.partners: List[Row] = []
+        # Minimum scores of partners[unconditional:], ascending
+        self.thresholds: List[int] = []
+        self.unconditional = 0
+        super().__init__(store)
+
+    def build(self, store: Store) -> Tuple[List[Row], List[Row]]:
+        partners = store.all("bank_partners")
+        open_to_all = [p for p in partners if minimum_credit_score(p) is None]
+        # Stable, so partners with the same minimum keep their file order
+        gated = sorted((p for p in partners if minimum_credit_score(p) is not None), key=minimum_credit_score)
+        return open_to_all, gated
+
+    def publish(self, state: Tuple[List[Row], List[Row]]):
+        open_to_all, gated = state
+        self.partners = open_to_all + gated
+        self.thresholds = [minimum_credit_score(p) for p in gated]
+        self.unconditional = len(open_to_all)
+
+    def eligible(self, credit_score: Optional[int]) -> List[Row]:
+        """
+        Partners available at `credit_score`: every unconditional partner, then
+        those whose minimum it meets, lowest minimum first. A user without a
+        score only gets the unconditional ones.
+        """
+        self.fresh()
+        with self.lock:
+            gated = bisect_right(self.thresholds, credit_score) if credit_score else 0
+            return self.partners[:self.unconditional + gated]
+
+
+get_partner_index = PartnerIndex.attached
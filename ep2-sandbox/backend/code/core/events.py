@@ -0,0 +1,214 @@
+# app/core/events.py
+
+"""
+Per-user change feed over the store's listener hook.
+
+Every write to a user's accounts, transactions, goals, schedules or meetings
+becomes an event numbered from a single sequence per store, so event numbers
+only grow. Events are kept per user in a bounded buffer, so a reader only
+sees (and is only woken for) its own user's changes, and a client that
+reconnects with the last number it saw gets exactly what it missed, as long
+as that is still buffered.
+
+Transactions name an account, not a user; the feed keeps its own account ->
+user map, updated from account events, so the listener never reads the
+store. After the accounts are reloaded the map is rebuilt on the next read,
+and transaction events that arrive meanwhile wait for it.
+
+A reload of a whole collection (e.g. a bulk ingest) is one event delivered
+to every user; clients refetch that collection. A client whose position is
+no longer buffered, or comes from another process, must refetch everything.
+The feed lives in one process; writes other workers make to a shared store
+reach it when it next reads (see `Store.refresh`), not as they happen.
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from core.store import DerivedView, Row, Store
+
+# Collections in the feed and their key fields
+WATCHED = {
+    "accounts": "account_id",
+    "transactions": "transaction_id",
+    "life_goals": "goal_id",
+    "schedules": "schedule_id",
+    "meetings": "meeting_id",
+}
+
+# Events buffered per user, and reload events buffered overall
+EVENTS_PER_USER = 256
+
+# Transaction events allowed to wait for the account map before they are
+# replaced by a reload of the transactions
+MAX_PENDING = 10000
+
+
+class Event:
+    __slots__ = ("seq", "collection", "op", "key", "row")
+
+    def __init__(self, seq: int, collection: str, op: str, key: Optional[str] = None, row: Optional[Row] = None):
+        self.seq = seq
+        self.collection = collection
+        # "put", "delete" or "reload"
+        self.op = op
+        self.key = key
+        self.row = row
+
+    def to_dict(self) -> Dict:
+        return {"seq": self.seq, "collection": self.collection, "op": self.op, "key": self.key, "row": self.row}
+
+
+Waiter = Tuple[asyncio.AbstractEventLoop, asyncio.Event]
+
+
+class EventFeed(DerivedView):
+    """
+    Buffered per-user change events of a store, with async waiting for new
+    ones. The view's state is the account -> user map.
+    """
+
+    collections = tuple(WATCHED)
+
+    def __init__(self, store: Store):
+        # Event numbers are this feed's own, so positions from any other feed (or worker) are refused
+        self.instance_id = os.urandom(8).hex()
+        self.seq = 0
+        self.by_user: Dict[str, Deque[Event]] = {}
+        # Highest event number evicted from each buffer; positions before it can no longer resume
+        self.evicted: Dict[str, int] = {}
+        self.reloads: Deque[Event] = deque(maxlen=EVENTS_PER_USER)
+        self.reloads_evicted = 0
+        self.owners: Dict[str, str] = {}
+        self.pending: List[Tuple[Event, str]] = []
+        self.waiters: Dict[Optional[str], Set[Waiter]] = {}
+        super().__init__(store)
+
+    # --- Publishing (runs in the writer's thread, under the store's locks) ---
+
+    def on_change(self, name: str, old: Optional[Row], new: Optional[Row]):
+        if name not in WATCHED:
+            return
+        with self.lock:
+            self.seq += 1
+            if name == "accounts":
+                self.generation += 1
+            if old is None and new is None:
+                if name == "accounts":
+                    self.stale = True
+                self._reload(Event(self.seq, name, "reload"))
+                return
+
+            row = new if new is not None else old
+            event = Event(self.seq, name, "put" if new is not None else "delete", row[WATCHED[name]], new)
+            if name == "accounts":
+                if new is None:
+                    self.owners.pop(old["account_id"], None)
+                else:
+                    self.owners[new["account_id"]] = new["user_id"]
+            if name != "transactions":
+                self._append(row.get("user_id"), event)
+            elif self.stale:
+                self.pending.append((event, row.get("account_id")))
+                if len(self.pending) > MAX_PENDING:
+                    self.pending = []
+                    self._reload(Event(self.seq, name, "reload"))
+            else:
+                self._append(self.owners.get(row.get("account_id")), event)
+
+    def _append(self, user_id: Optional[str], event: Event):
+        if user_id is None:
+            return
+        events = self.by_user.get(user_id)
+        if events is None:
+            events = self.by_user[user_id] = deque(maxlen=EVENTS_PER_USER)
+        if len(events) == events.maxlen:
+            self.evicted[user_id] = events[0].seq
+        events.append(event)
+        self._wake(self.waiters.get(user_id, ()))
+
+    def _reload(self, event: Event):
+        if len(self.reloads) == self.reloads.maxlen:
+            self.reloads_evicted = self.reloads[0].seq
+        self.reloads.append(event)
+        for waiters in self.waiters.values():
+            self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, ready in waiters:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The waiter's event loop has closed
+                continue
+
+    # --- Reading ---
+
+    def current(self) -> int:
+        """Number of the latest event; reading from it yields only later events."""
+        with self.lock:
+            return self.seq
+
+    def build(self, store: Store) -> Dict[str, str]:
+        return {acc["account_id"]: acc["user_id"] for acc in store.all("accounts")}
+
+    def publish(self, owners: Dict[str, str]):
+        """Installs the rebuilt account -> user map and files the transaction events that waited for it."""
+        self.owners = owners
+        pending, self.pending = self.pending, []
+        touched = set()
+        for event, account_id in pending:
+            user_id = owners.get(account_id)
+            if user_id is not None:
+                self._append(user_id, event)
+                touched.add(user_id)
+        # Filed late, so they may sort before events appended meanwhile
+        for user_id in touched:
+            events = self.by_user[user_id]
+            ordered = sorted(events, key=lambda e: e.seq)
+            events.clear()
+            events.extend(ordered)
+
+    def read(self, user_id: str, after: int) -> Optional[List[Event]]:
+        """
+        The user's events numbered after `after`, oldest first, or None if some
+        of them are no longer buffered (or `after` is not from this feed).
+        """
+        self.fresh()
+        with self.lock:
+            if after > self.seq or after < self.evicted.get(user_id, 0) or after < self.reloads_evicted:
+                return None
+            events = [e for e in self.by_user.get(user_id, ()) if e.seq > after]
+            reloads = [e for e in self.reloads if e.seq > after]
+        if reloads:
+            events = sorted(events + reloads, key=lambda e: e.seq)
+        return events
+
+    async def wait(self, user_id: str, after: int, timeout: float) -> bool:
+        """Waits until the user may have events after `after`. Returns False on timeout."""
+        ready = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ready)
+        with self.lock:
+            latest = self.by_user.get(user_id)
+            if (latest and latest[-1].seq > after) or (self.reloads and self.reloads[-1].seq > after) \
+                    or self.pending:
+                return True
+            self.waiters.setdefault(user_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                waiters = self.waiters.get(user_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self.waiters[user_id]
+
+
+get_event_feed = EventFeed.attached
@@ -0,0 +1,218 @@
+# app/core/forecast.py
+
+"""
+Balance forecasts from recurring schedules.
+
+Every schedule is expanded into its dated occurrences over a horizon in one
+vectorized pass: the number of occurrences of each schedule in the window is
+computed arithmetically from its frequency, and `np.repeat` lays them out
+without looping over occurrences in Python. Monthly-type schedules
+fall on the day of month they started on, or the last day of shorter months.
+
+Each occurrence debits the source account and credits the destination
+account. Amounts are summed into an (account, calendar month) matrix with a
+single `np.bincount`, which serves every user's forecast. The matrix is a
+view derived from the store, rebuilt when schedules change, accounts are
+added, removed or change owner, or the day rolls over. Balance updates, such
+as the transfers the schedule runner books, only replace the balance vector
+with a copy carrying the account's new balance, so a forecast being read
+outside the view's lock sees one consistent vector.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.store import EPOCH, DerivedView, Row, Store, parse_date
+
+# frequency -> (unit, step); "D" steps are days, "M" steps are calendar months
+FREQUENCIES: Dict[str, Tuple[str, int]] = {
+    "daily": ("D", 1),
+    "weekly": ("D", 7),
+    "biweekly": ("D", 14),
+    "monthly": ("M", 1),
+    "quarterly": ("M", 3),
+    "yearly": ("M", 12),
+    "annually": ("M", 12),
+}
+
+# Longest forecast served, in calendar months including the current one
+MAX_FORECAST_MONTHS = 60
+
+
+def _month_of(days: np.ndarray) -> np.ndarray:
+    """Months since 1970-01 of epoch days."""
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _first_day(months: np.ndarray) -> np.ndarray:
+    """Epoch day of the first day of months since 1970-01."""
+    return months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+def _ceil_div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return -(-a // b)
+
+
+def expand_schedules(schedules: List[Row], first_day: int, last_day: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Occurrences of `schedules` dated first_day <= day <= last_day (epoch days).
+
+    Returns two aligned arrays: the position of each occurrence's schedule in
+    `schedules` and its epoch day. Schedules with an unknown frequency or
+    unparseable dates have no occurrences.
+    """
+    valid, starts, ends, monthly, steps = [], [], [], [], []
+    for i, schedule in enumerate(schedules):
+        frequency = FREQUENCIES.get(str(schedule.get("frequency", "")).lower())
+        try:
+            start = (parse_date(schedule["start_date"]).date() - EPOCH).days
+            end = (parse_date(schedule["end_date"]).date() - EPOCH).days
+        except (KeyError, TypeError, ValueError):
+            continue
+        if frequency is None:
+            continue
+        valid.append(i)
+        starts.append(start)
+        ends.append(end)
+        monthly.append(frequency[0] == "M")
+        steps.append(frequency[1])
+
+    empty = np.empty(0, dtype=np.int64)
+    if not valid:
+        return empty, empty
+
+    valid = np.array(valid, dtype=np.int64)
+    starts = np.array(starts, dtype=np.int64)
+    steps = np.array(steps, dtype=np.int64)
+    monthly = np.array(monthly, dtype=bool)
+    lo = np.maximum(starts, first_day)
+    hi = np.minimum(np.array(ends, dtype=np.int64), last_day)
+
+    # Occurrence k of a schedule falls in day (or month) unit `origin + k * step`
+    start_months = _month_of(starts)
+    origin = np.where(monthly, start_months, starts)
+    lo_unit = np.where(monthly, _month_of(lo), lo)
+    hi_unit = np.where(monthly, _month_of(hi), hi)
+    k_first = np.maximum(_ceil_div(lo_unit - origin, steps), 0)
+    k_last = (hi_unit - origin) // steps
+    counts = np.where(hi >= lo, np.maximum(k_last - k_first + 1, 0), 0)
+
+    total = int(counts.sum())
+    if total == 0:
+        return empty, empty
+    owner = np.repeat(np.arange(len(valid)), counts)
+    k = k_first[owner] + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    units = origin[owner] + k * steps[owner]
+    # Months land on the starting day of month, clamped to the month's length
+    day_of_month = (starts - _first_day(start_months))[owner]
+    month_length = _first_day(units + 1) - _first_day(units)
+    month_days = _first_day(units) + np.minimum(day_of_month, month_length - 1)
+    days = np.where(monthly[owner], month_days, units)
+
+    # Months at either end of the window may hold an occurrence outside it
+    inside = (days >= lo[owner]) & (days <= hi[owner])
+    return valid[owner[inside]], days[inside]
+
+
+class ScheduleForecast:
+    """Scheduled net change per account and calendar month, starting with the current month."""
+
+    def __init__(self, schedules: List[Row], accounts: List[Row], today: date, months: int = MAX_FORECAST_MONTHS):
+        self.today = today
+        self.months = months
+        today_day = (today - EPOCH).days
+        first_month = int(_month_of(np.array([today_day]))[0])
+        self.month_labels = [str(m) for m in np.arange(first_month, first_month + months).astype("datetime64[M]")]
+
+        self.account_ids: List[str] = [acc["account_id"] for acc in accounts]
+        self.account_codes: Dict[str, int] = {acc_id: code for code, acc_id in enumerate(self.account_ids)}
+        self.balances = np.array([acc["balance"] for acc in accounts], dtype=np.float64)
+        self.user_accounts: Dict[str, List[int]] = {}
+        for acc in accounts:
+            self.user_accounts.setdefault(acc["user_id"], []).append(self.account_codes[acc["account_id"]])
+
+        # Occurrences after today, through the last day of the final month
+        last_day = int(_first_day(np.array([first_month + months]))[0]) - 1
+        owner, days = expand_schedules(schedules, today_day + 1, last_day)
+        buckets = _month_of(days) - first_month
+        amounts = np.array([float(s.get("amount") or 0.0) for s in schedules], dtype=np.float64)[owner]
+
+        # Legs on accounts outside the accounts collection are dropped
+        cells, weights = [], []
+        for field, sign in (("source_account_id", -1.0), ("destination_account_id", 1.0)):
+            leg_codes = np.array([self.account_codes.get(s.get(field), -1) for s in schedules], dtype=np.int64)
+            leg = leg_codes[owner]
+            known = leg >= 0
+            cells.append(leg[known] * months + buckets[known])
+            weights.append(sign * amounts[known])
+        size = len(self.account_ids) * months
+        self.changes = np.bincount(np.concatenate(cells), weights=np.concatenate(weights),
+                                   minlength=size).reshape(len(self.account_ids), months)
+
+    def for_user(self, user_id: str, months: int) -> Optional[Dict]:
+        """The first `months` months of the user's forecast, or None if they have no accounts."""
+        codes = self.user_accounts.get(user_id)
+        if not codes:
+            return None
+        # Balance writes swap in a new vector; read one for the whole forecast
+        balances = self.balances
+        changes = self.changes[codes, :months]
+        projected = balances[codes, None] + np.cumsum(changes, axis=1)
+        return {
+            "user_id": user_id,
+            "months": self.month_labels[:months],
+            "net_change": changes.sum(axis=0).tolist(),
+            "accounts": [
+                {
+                    "account_id": self.account_ids[code],
+                    "balance": float(balances[code]),
+                    "changes": changes[i].tolist(),
+                    "projected_balances": projected[i].tolist(),
+                }
+                for i, code in enumerate(codes)
+            ],
+        }
+
+
+class ForecastView(DerivedView):
+    """The `ScheduleForecast` of a store's schedules from the current day."""
+
+    collections = ("schedules", "accounts")
+
+    def __init__(self, store: Store):
+        self.today: Optional[date] = None
+        self.current: Optional[ScheduleForecast] = None
+        super().__init__(store)
+
+    def build(self, store: Store) -> ScheduleForecast:
+        return ScheduleForecast(store.all("schedules"), store.all("accounts"), self.today)
+
+    def publish(self, forecast: ScheduleForecast):
+        self.current = forecast
+
+    def apply(self, name: str, old: Optional[Row], new: Optional[Row]):
+        if name == "accounts" and old is not None and new is not None and old["user_id"] == new["user_id"]:
+            code = self.current.account_codes.get(new["account_id"])
+            if code is not None:
+                balances = self.current.balances.copy()
+                balances[code] = new["balance"]
+                self.current.balances = balances
+                return
+        # Schedule writes and new, deleted or re-owned accounts change the matrix itself
+        self.stale = True
+
+    def forecast(self, today: date) -> ScheduleForecast:
+        """The forecast from `today`; a new day rebuilds it, as a schedule write does."""
+        with self.lock:
+            if self.today != today:
+                self.today = today
+                self.stale = True
+        self.fresh()
+        with self.lock:
+            return self.current
+
+
+get_forecast_view = ForecastView.attached
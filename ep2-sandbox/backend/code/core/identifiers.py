@@ -0,0 +1,87 @@
+# app/core/identifiers.py
+
+"""
+Account ID allocation.
+
+Account IDs have the form `acc-{initials}-{type code}-NNN`, numbered per
+prefix. The next number comes from a persistent counter per prefix kept in
+the store's `sequences` collection (see `Store.next_sequence`), so allocating
+one is a single keyed read and write however many accounts exist. A counter
+that does not exist yet is seeded from the highest number already in use,
+looking only at the accounts of users who share those initials; the
+`InitialsIndex` keeps that user-id -> initials mapping (and its inverse) in
+sync with the users collection.
+"""
+
+from typing import Dict, Optional, Set, Tuple
+
+from core.store import DerivedView, Row, Store
+
+
+def initials_of(name: str) -> str:
+    """Lower-case initials of a display name ("Marcus W." -> "mw")."""
+    return "".join(part[0] for part in name.split()).lower()
+
+
+class InitialsIndex(DerivedView):
+    """user_id -> initials and initials -> user_ids, kept in sync with a store through its listener hook."""
+
+    collections = ("users",)
+
+    def __init__(self, store: Store):
+        self.by_user: Dict[str, str] = {}
+        self.by_initials: Dict[str, Set[str]] = {}
+        super().__init__(store)
+
+    def build(self, store: Store) -> Tuple[Dict[str, str], Dict[str, Set[str]]]:
+        by_user = {user["user_id"]: initials_of(user["name"]) for user in store.all("users")}
+        by_initials: Dict[str, Set[str]] = {}
+        for user_id, initials in by_user.items():
+            by_initials.setdefault(initials, set()).add(user_id)
+        return by_user, by_initials
+
+    def publish(self, state: Tuple[Dict[str, str], Dict[str, Set[str]]]):
+        self.by_user, self.by_initials = state
+
+    def apply(self, name: str, old: Optional[Row], new: Optional[Row]):
+        if old is not None:
+            initials = self.by_user.pop(old["user_id"], None)
+            self.by_initials.get(initials, set()).discard(old["user_id"])
+        if new is not None:
+            initials = initials_of(new["name"])
+            self.by_user[new["user_id"]] = initials
+            self.by_initials.setdefault(initials, set()).add(new["user_id"])
+
+    def initials(self, user_id: str) -> Optional[str]:
+        """Initials of the user, or None if there is no such user."""
+        self.fresh()
+        with self.lock:
+            return self.by_user.get(user_id)
+
+    def users_with(self, initials: str) -> Set[str]:
+        """IDs of every user with these initials."""
+        self.fresh()
+        with self.lock:
+            return set(self.by_initials.get(initials, ()))
+
+
+get_initials_index = InitialsIndex.attached
+
+
+def next_account_number(store: Store, prefix: str, initials: str) -> int:
+    """Allocates the next number for account IDs starting with `prefix`."""
+
+    def highest_in_use() -> int:
+        highest = 0
+        for user_id in get_initials_index(store).users_with(initials):
+            for acc in store.find("accounts", "user_id", user_id):
+                if not acc["account_id"].startswith(prefix):
+                    continue
+                try:
+                    highest = max(highest, int(acc["account_id"][len(prefix):]))
+                except ValueError:
+                    # Ignore malformed IDs
+                    continue
+        return highest
+
+    return store.next_sequence(prefix, highest_in_use)
@@ -0,0 +1,243 @@
+# app/core/ingest.py
+
+"""
+Parsing and validation for bulk transaction ingest.
+
+Uploads arrive as CSV or NDJSON in arbitrary byte chunks. The parsers are fed
+the complete lines of each chunk and return the records they finish, so a
+body of any size is handled a piece at a time; a CSV field may span lines
+when quoted. Records are numbered by the line they start on.
+
+Two shapes of record are accepted: the `Transaction` model's fields, and the
+columns of `transaction_history.csv` (`item_purchased` becomes the
+description and `merchant` the merchant ID; `net_worth` and `payment_method`
+are dropped). Rows without an `account_id` take the default account of the
+upload. Dates are normalized to the data files' `YYYY-MM-DDTHH:MM:SSZ` form.
+
+`TransactionValidator` checks records a chunk at a time, and each chunk is
+stored before the next is checked. It remembers only the IDs accepted from
+the chunk in hand: a transaction ID repeated within the chunk is reported as
+a duplicate, and one repeated from an earlier chunk is found in the store,
+so neither overwrites the earlier row and memory does not grow with the
+upload. Other writers may store a conflicting row (or delete an account)
+while a chunk is being checked, so `confirm` checks its rows once more in
+the same store transaction as their insert.
+"""
+
+import codecs
+import csv
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import orjson
+
+from core.store import Row, Store, parse_date
+
+# Fields of a stored transaction, all required
+TRANSACTION_FIELDS = ("transaction_id", "account_id", "merchant_id", "date", "description", "amount", "category")
+
+# Transaction field -> the transaction_history.csv column used when it is absent
+HISTORY_FIELDS = {"description": "item_purchased", "merchant_id": "merchant"}
+
+# A record: the line it starts on, and its fields or why it could not be parsed
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class LineSplitter:
+    """Turns byte chunks into complete lines, holding back a trailing partial line."""
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self.pending = ""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        self.pending += self.decoder.decode(chunk)
+        *lines, self.pending = self.pending.split("\n")
+        return lines
+
+    def close(self) -> List[str]:
+        tail = self.pending + self.decoder.decode(b"", final=True)
+        self.pending = ""
+        return [tail] if tail else []
+
+
+class NdjsonParser:
+    def __init__(self):
+        self.line = 0
+
+    def feed(self, lines: List[str]) -> List[Record]:
+        records = []
+        for text in lines:
+            self.line += 1
+            if not text.strip():
+                continue
+            try:
+                value = orjson.loads(text)
+            except orjson.JSONDecodeError as e:
+                records.append((self.line, None, f"Invalid JSON: {e}"))
+                continue
+            if isinstance(value, dict):
+                records.append((self.line, value, None))
+            else:
+                records.append((self.line, None, "Expected a JSON object"))
+        return records
+
+    def close(self) -> List[Record]:
+        return []
+
+
+class CsvParser:
+    """CSV with a header row; a record continues onto the next line while a quote is open."""
+
+    def __init__(self):
+        self.line = 0
+        self.header: Optional[List[str]] = None
+        self.record: List[str] = []
+        self.record_line = 0
+        self.quotes = 0
+
+    def _parse(self, complete: List[Tuple[int, str]]) -> List[Record]:
+        records = []
+        for (line, _), values in zip(complete, csv.reader(text for _, text in complete)):
+            if self.header is None:
+                self.header = [name.strip() for name in values]
+            elif not any(value.strip() for value in values):
+                continue
+            elif len(values) != len(self.header):
+                records.append((line, None, f"Expected {len(self.header)} columns, got {len(values)}"))
+            else:
+                records.append((line, dict(zip(self.header, values)), None))
+        return records
+
+    def feed(self, lines: List[str]) -> List[Record]:
+        complete = []
+        for text in lines:
+            self.line += 1
+            if not self.record:
+                self.record_line = self.line
+            self.record.append(text.rstrip("\r"))
+            self.quotes += text.count('"')
+            if self.quotes % 2 == 0:
+                complete.append((self.record_line, "\n".join(self.record)))
+                self.record, self.quotes = [], 0
+        return self._parse(complete)
+
+    def close(self) -> List[Record]:
+        if not self.record:
+            return []
+        # An unterminated quote runs to the end of the body
+        complete = [(self.record_line, "\n".join(self.record))]
+        self.record, self.quotes = [], 0
+        return self._parse(complete)
+
+
+def normalize_date(value: str) -> str:
+    """`value` as UTC `YYYY-MM-DDTHH:MM:SSZ`, raising ValueError if it is not an ISO 8601 date."""
+    parsed = parse_date(value)
+    if len(value) == 20 and value[10] == "T" and value[19] == "Z":
+        return value
+    if len(value) == 10:
+        return value + "T00:00:00Z"
+    return parsed.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def normalize(record: Dict[str, Any], default_account_id: Optional[str]) -> Row:
+    """Maps a record onto the transaction fields, raising ValueError for missing or malformed ones."""
+    row: Row = {}
+    missing = []
+    for field in TRANSACTION_FIELDS:
+        value = record.get(field)
+        if value in (None, "") and field in HISTORY_FIELDS:
+            value = record.get(HISTORY_FIELDS[field])
+        if value in (None, "") and field == "account_id":
+            value = default_account_id
+        if isinstance(value, str):
+            value = value.strip()
+        elif field != "amount" and value is not None:
+            raise ValueError(f"{field} must be a string")
+        if value is None or value == "":
+            missing.append(field)
+        row[field] = value
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    try:
+        if isinstance(row["amount"], bool):
+            raise ValueError
+        amount = float(row["amount"])
+        # NaN and infinities do not survive the JSON files and break every aggregate
+        if not math.isfinite(amount):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid amount: {row['amount']!r}")
+    row["amount"] = amount
+    try:
+        row["date"] = normalize_date(row["date"])
+    except ValueError:
+        raise ValueError(f"Invalid date: {row['date']!r}")
+    return row
+
+
+class TransactionValidator:
+    """Validates records against the store, a chunk at a time."""
+
+    def __init__(self, store: Store, default_account_id: Optional[str] = None):
+        self.store = store
+        self.default_account_id = default_account_id
+        self.accounts: Dict[str, bool] = {}
+        # IDs accepted from the chunk not yet stored
+        self.accepted: Set[str] = set()
+        # Rows that passed `validate` but not `confirm`
+        self.late_errors: List[Dict[str, Any]] = []
+
+    def validate(self, records: Iterable[Record]) -> Tuple[List[Tuple[int, Row]], List[Dict[str, Any]]]:
+        """
+        Returns the rows to store, with their line, and an error ({line,
+        transaction_id, error}) per rejected record. Store the rows through
+        `confirm` before validating the next chunk.
+        """
+        rows, errors = [], []
+        for line, record, problem in records:
+            transaction_id = record.get("transaction_id") if record else None
+            if problem is None:
+                try:
+                    row = normalize(record, self.default_account_id)
+                    problem = self._conflict(row)
+                except ValueError as e:
+                    problem = str(e)
+            if problem is not None:
+                errors.append({"line": line, "transaction_id": transaction_id if isinstance(transaction_id, str)
+                               else None, "error": problem})
+                continue
+            self.accepted.add(row["transaction_id"])
+            rows.append((line, row))
+        return rows, errors
+
+    def confirm(self, rows: Iterable[Tuple[int, Row]]) -> Iterator[Row]:
+        """
+        Checks (line, row) pairs that passed `validate` against the store again
+        and yields those still valid. Run it inside
+        `store.transaction("accounts", "transactions")` together with their
+        insert; the rest are added to `late_errors`. Once it is exhausted the
+        rows are in the store, and their IDs are forgotten.
+        """
+        self.accounts, self.accepted = {}, set()
+        for line, row in rows:
+            problem = self._conflict(row)
+            if problem is not None:
+                self.late_errors.append({"line": line, "transaction_id": row["transaction_id"], "error": problem})
+                continue
+            self.accepted.add(row["transaction_id"])
+            yield row
+        self.accepted = set()
+
+    def _conflict(self, row: Row) -> Optional[str]:
+        account_id = row["account_id"]
+        if account_id not in self.accounts:
+            self.accounts[account_id] = self.store.get("accounts", account_id) is not None
+        if not self.accounts[account_id]:
+            return f"Account {account_id} not found"
+        if row["transaction_id"] in self.accepted:
+            return "Duplicate transaction_id in this upload"
+        if self.store.get("transactions", row["transaction_id"]) is not None:
+            return "Transaction already exists"
+        return None
@@ -0,0 +1,152 @@
+# app/core/journal.py
+
+"""
+Write-ahead journal and snapshot files backing the data store.
+
+Each collection is persisted as a JSON snapshot (the familiar `db/*.json`
+file) plus an append-only journal of the mutations made since that snapshot
+was written. A mutation costs one appended line instead of a rewrite of the
+whole file. Compaction folds the journal into a fresh snapshot that is
+written to a temporary file and atomically renamed into place.
+
+Journal entries are idempotent ("put this row", "delete this key"), so
+replaying an entry that is already reflected in the snapshot is harmless.
+That is what makes recovery safe if the process dies mid-compaction.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import orjson
+
+Entry = Dict[str, Any]
+
+
+class Journal:
+    """Append-only log of mutations for one collection, one JSON object per line."""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.rotated_path = path + ".compacting"
+        self.fsync = fsync
+
+    def size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, entry: Entry) -> int:
+        """Appends an entry and returns the number of bytes written."""
+        line = _encode(entry)
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return len(line)
+
+    def append_many(self, entries: Iterable[Entry]) -> Tuple[int, int]:
+        """Appends entries with a single fsync. Returns the bytes and entries written."""
+        size = count = 0
+        with open(self.path, "ab") as f:
+            for entry in entries:
+                line = _encode(entry)
+                f.write(line)
+                size += len(line)
+                count += 1
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return size, count
+
+    def read(self, offset: int = 0) -> Tuple[List[Entry], int]:
+        """
+        Reads the complete entries from `offset` onwards.
+
+        Returns the entries and the offset just past the last complete line.
+        A trailing line without a newline is a write still in progress (or a
+        torn write from a crash) and is left for later.
+        """
+        return _read_entries(self.path, offset)
+
+    def recover(self) -> Iterator[Entry]:
+        """
+        Yields every entry needed to rebuild the collection on top of its snapshot.
+
+        This includes a journal left behind by an interrupted compaction. A
+        torn final line from a crash is truncated so later appends start clean.
+        """
+        if os.path.exists(self.rotated_path):
+            entries, _ = _read_entries(self.rotated_path, 0)
+            yield from entries
+        entries, offset = _read_entries(self.path, 0)
+        if offset < self.size():
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        yield from entries
+
+    def rotate(self):
+        """
+        Moves the current journal aside so compaction can fold it into the snapshot.
+
+        A rotated journal left by a compaction that failed has not reached
+        the snapshot yet, so the current one is appended to it instead of
+        replacing it.
+        """
+        if not os.path.exists(self.path):
+            return
+        if not os.path.exists(self.rotated_path):
+            os.replace(self.path, self.rotated_path)
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.rotated_path, "r+b") as f:
+            # Complete lines only, so a torn line cannot run into the next entry
+            end = f.read().rfind(b"\n") + 1
+            f.truncate(end)
+            f.seek(end)
+            f.write(data[:data.rfind(b"\n") + 1])
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        # Dying before this replays the entries twice, which is harmless
+        os.remove(self.path)
+
+    def discard_rotated(self):
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+
+def _encode(entry: Entry) -> bytes:
+    return orjson.dumps(entry, default=str, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def _read_entries(path: str, offset: int) -> Tuple[List[Entry], int]:
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+
+    entries = []
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if line.strip():
+            entries.append(orjson.loads(line))
+    return entries, offset + end
+
+
+def write_snapshot(path: str, rows: List[Dict[str, Any]], indent: int = 4, fsync: bool = True):
+    """Writes `rows` to a temporary file and atomically renames it over `path`."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(rows, f, indent=indent, default=str)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
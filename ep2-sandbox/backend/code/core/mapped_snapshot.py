@@ -0,0 +1,370 @@
+# app/core/mapped_snapshot.py
+
+"""
+Memory-mappable columnar snapshot of one collection.
+
+The file is written once and then only read, through a read-only `mmap`, so
+every worker process maps the same pages of the OS page cache instead of
+parsing its own copy of the rows. A new version is written to a temporary
+file and renamed over the old one; readers that still map the old file keep
+a consistent view until they remap.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    magic "CYMBCOL1" | header length (u64) | header (JSON) | sections...
+
+The header names each section's offset from the start of the sections.
+Each field of the rows is a column:
+
+- `f8` / `i8` / `b1`: fixed-width float64 / int64 / bool values, with an
+  optional u8 tag per row when some rows hold an int in a float column
+  (TAG_INT), None (TAG_NULL) or lack the field (TAG_ABSENT);
+- `str`: u32 string IDs, NULL_ID for None and ABSENT_ID for a missing field;
+- `json`: like `str`, the string being the value's JSON text (lists, dicts,
+  mixed types).
+
+Strings are stored once each in a table sorted by code point, as u64 end
+offsets into a UTF-8 blob. Because the table is sorted, string IDs compare
+like the strings, so the prebuilt indexes are plain sorted u32 arrays that
+are searched with `numpy.searchsorted` directly on the mapping:
+
+- the primary key: key IDs in sorted order, and the row of each;
+- each secondary index: value IDs in sorted order, and the row of each;
+- the timeline: rows ordered by (group ID, epoch, key ID), with the group
+  IDs and epochs in that order, for date-ranged listings per group.
+
+Row versions and the collection revision at the time of writing are stored
+too, so every process that maps the file agrees on them, along with the
+size and mtime of the JSON file the rows were first converted from (the
+header's `source`), so a snapshot older than its JSON file can be told apart,
+and the revision they had then (`source_revision`), so a snapshot holding
+writes compacted into it since can be told apart too.
+"""
+
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from core.store import Row
+
+MAGIC = b"CYMBCOL1"
+FORMAT_VERSION = 1
+
+NULL_ID = 0xFFFFFFFF
+ABSENT_ID = 0xFFFFFFFE
+
+TAG_VALUE, TAG_INT, TAG_NULL, TAG_ABSENT = 0, 1, 2, 3
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+# memoryview format and numpy dtype of each fixed-width column kind
+FIXED_KINDS = {"f8": ("d", np.float64), "i8": ("q", np.int64), "b1": ("?", np.bool_)}
+
+_ABSENT = object()
+
+
+def _column_kind(values: List[Any]) -> str:
+    present = [v for v in values if v is not None and v is not _ABSENT]
+    if all(isinstance(v, str) for v in present):
+        return "str"
+    if all(isinstance(v, bool) for v in present):
+        return "b1"
+    if any(isinstance(v, bool) for v in present):
+        return "json"
+    if all(isinstance(v, int) and INT64_MIN <= v <= INT64_MAX for v in present):
+        return "i8"
+    if all(isinstance(v, (int, float)) for v in present):
+        return "f8"
+    return "json"
+
+
+class _Sections:
+    """Accumulates the 8-byte aligned sections of a file being written."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def add(self, data: bytes) -> int:
+        offset = self.size
+        self.parts.append(data)
+        self.size += len(data)
+        padding = -self.size % 8
+        if padding:
+            self.parts.append(b"\0" * padding)
+            self.size += padding
+        return offset
+
+
+def write_mapped_snapshot(path: str, rows: Sequence[Row], key: str, versions: Sequence[int], revision: int,
+                          indexes: Tuple[str, ...] = (), timeline: Optional[Tuple[str, str]] = None,
+                          epoch: Optional[Callable[[Any], int]] = None, source: Optional[List[int]] = None,
+                          source_revision: Optional[int] = None, fsync: bool = True):
+    """
+    Writes `rows` (with their `versions`) to a temporary file and atomically
+    renames it over `path`. `timeline=(group_field, date_field)` also stores
+    the rows ordered by group and `epoch(row[date_field])`; rows whose date
+    raises are left out of it. `source` and `source_revision` are recorded as
+    is in the header.
+    """
+    fields: Dict[str, None] = {}
+    for row in rows:
+        for field in row:
+            fields.setdefault(field, None)
+    if key not in fields:
+        fields[key] = None
+    columns = {field: [row.get(field, _ABSENT) for row in rows] for field in fields}
+    kinds = {field: _column_kind(values) for field, values in columns.items()}
+    if kinds[key] != "str" or any(not isinstance(v, str) for v in columns[key]):
+        raise ValueError(f"Key field {key} must be a string in every row")
+
+    texts = {field: [v if v is None or v is _ABSENT else orjson.dumps(v).decode() for v in values]
+             for field, values in columns.items() if kinds[field] == "json"}
+    strings = set()
+    for field, values in columns.items():
+        if kinds[field] == "str":
+            strings.update(v for v in values if isinstance(v, str))
+        elif kinds[field] == "json":
+            strings.update(v for v in texts[field] if isinstance(v, str))
+    table = sorted(strings)
+    string_ids = {s: i for i, s in enumerate(table)}
+
+    def ids_of(values) -> np.ndarray:
+        return np.fromiter((NULL_ID if v is None else ABSENT_ID if v is _ABSENT else string_ids[v] for v in values),
+                           dtype=np.uint32, count=len(values))
+
+    sections = _Sections()
+    header: Dict[str, Any] = {"format": FORMAT_VERSION, "rows": len(rows), "revision": revision, "key": key,
+                              "source": source, "source_revision": source_revision, "columns": [], "indexes": {},
+                              "timeline": None}
+    column_ids: Dict[str, np.ndarray] = {}
+    for field, values in columns.items():
+        kind = kinds[field]
+        column: Dict[str, Any] = {"name": field, "kind": kind, "tags": None}
+        if kind in FIXED_KINDS:
+            tags = np.fromiter((TAG_ABSENT if v is _ABSENT else TAG_NULL if v is None
+                                else TAG_INT if kind == "f8" and isinstance(v, int) else TAG_VALUE for v in values),
+                               dtype=np.uint8, count=len(values))
+            data = np.array([v if v is not None and v is not _ABSENT else 0 for v in values],
+                            dtype=FIXED_KINDS[kind][1])
+            column["offset"] = sections.add(data.tobytes())
+            if tags.any():
+                column["tags"] = sections.add(tags.tobytes())
+        else:
+            ids = column_ids[field] = ids_of(values if kind == "str" else texts[field])
+            column["offset"] = sections.add(ids.tobytes())
+        header["columns"].append(column)
+
+    header["versions"] = sections.add(np.asarray(versions, dtype=np.int64).tobytes())
+
+    encoded = [s.encode("utf-8") for s in table]
+    ends = np.cumsum([len(b) for b in encoded], dtype=np.uint64) if encoded else np.zeros(0, dtype=np.uint64)
+    header["strings"] = {"count": len(table), "ends": sections.add(ends.tobytes()),
+                         "blob": sections.add(b"".join(encoded))}
+
+    for field in (key,) + tuple(f for f in indexes if f != key):
+        if kinds.get(field) != "str":
+            continue
+        ids = column_ids[field]
+        order = np.argsort(ids, kind="stable").astype(np.uint32)
+        header["indexes"][field] = {"ids": sections.add(ids[order].tobytes()), "rows": sections.add(order.tobytes())}
+
+    if timeline is not None and epoch is not None and kinds.get(timeline[0]) == "str":
+        group_field, date_field = timeline
+        included, epochs = [], []
+        for i, row in enumerate(rows):
+            try:
+                epochs.append(epoch(row[date_field]))
+            except (KeyError, TypeError, ValueError):
+                continue
+            included.append(i)
+        included_rows = np.asarray(included, dtype=np.uint32)
+        epoch_array = np.asarray(epochs, dtype=np.int64)
+        groups = column_ids[group_field][included_rows]
+        order = np.lexsort((column_ids[key][included_rows], epoch_array, groups))
+        header["timeline"] = {"group": group_field, "count": len(included),
+                              "groups": sections.add(groups[order].tobytes()),
+                              "epochs": sections.add(epoch_array[order].tobytes()),
+                              "rows": sections.add(included_rows[order].tobytes())}
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        f.write(b"\0" * (_data_start(len(header_bytes)) - f.tell()))
+        for part in sections.parts:
+            f.write(part)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _data_start(header_length: int) -> int:
+    """Where the sections begin; their offsets in the header are relative to it."""
+    start = len(MAGIC) + 8 + header_length
+    return start + -start % 8
+
+
+class MappedSnapshot:
+    """
+    A snapshot file mapped read-only. Rows are decoded on demand, so holding
+    a snapshot costs address space, not memory; decoded rows are new dicts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mapping[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a mapped snapshot")
+        (length,) = struct.unpack_from("<Q", self.mapping, len(MAGIC))
+        header = json.loads(self.mapping[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {header['format']}, expected {FORMAT_VERSION}")
+        self.start = _data_start(length)
+        self.view = memoryview(self.mapping)
+        self.count: int = header["rows"]
+        self.revision: int = header["revision"]
+        self.key: str = header["key"]
+        self.source: Optional[List[int]] = header.get("source")
+        self.source_revision: Optional[int] = header.get("source_revision")
+
+        # (name, kind, values, tags) per column, values as a typed memoryview
+        self.columns = []
+        for column in header["columns"]:
+            kind = column["kind"]
+            code = FIXED_KINDS[kind][0] if kind in FIXED_KINDS else "I"
+            tags = self._view(column["tags"], "B", self.count) if column["tags"] is not None else None
+            self.columns.append((column["name"], kind, self._view(column["offset"], code, self.count), tags))
+        self.versions = self._view(header["versions"], "q", self.count)
+        self.key_ids = next(values for name, _, values, _ in self.columns if name == self.key)
+
+        strings = header["strings"]
+        self.string_count: int = strings["count"]
+        self.string_ends = self._view(strings["ends"], "Q", self.string_count)
+        self.blob = self.start + strings["blob"]
+
+        self.indexes = {field: (self._array(index["ids"], np.uint32, self.count),
+                                self._view(index["rows"], "I", self.count))
+                        for field, index in header["indexes"].items()}
+        self.timeline = None
+        if header["timeline"] is not None:
+            timeline = header["timeline"]
+            size = timeline["count"]
+            self.timeline = (timeline["group"], self._array(timeline["groups"], np.uint32, size),
+                             self._array(timeline["epochs"], np.int64, size), self._view(timeline["rows"], "I", size))
+
+    def _view(self, offset: int, code: str, count: int) -> memoryview:
+        start = self.start + offset
+        return self.view[start:start + count * struct.calcsize(code)].cast(code)
+
+    def _array(self, offset: int, dtype, count: int) -> np.ndarray:
+        return np.frombuffer(self.mapping, dtype=dtype, count=count, offset=self.start + offset)
+
+    # --- Strings ---
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        end = self.string_ends[string_id]
+        begin = self.string_ends[string_id - 1] if string_id else 0
+        return self.mapping[self.blob + begin:self.blob + end]
+
+    def string(self, string_id: int) -> str:
+        return self._string_bytes(string_id).decode("utf-8")
+
+    def string_id(self, value: Any) -> Optional[int]:
+        """The ID of `value` in the string table (NULL_ID for None), or None if it is not there."""
+        if value is None:
+            return NULL_ID
+        if not isinstance(value, str):
+            return None
+        encoded = value.encode("utf-8")
+        # UTF-8 bytes sort like code points, so the table can be bisected on bytes
+        position = bisect_left(range(self.string_count), encoded, key=self._string_bytes)
+        if position < self.string_count and self._string_bytes(position) == encoded:
+            return position
+        return None
+
+    # --- Rows ---
+
+    def row(self, i: int) -> Row:
+        ends, mapping, blob = self.string_ends, self.mapping, self.blob
+        row: Row = {}
+        for name, kind, values, tags in self.columns:
+            if kind == "str" or kind == "json":
+                string_id = values[i]
+                if string_id >= ABSENT_ID:
+                    if string_id == NULL_ID:
+                        row[name] = None
+                    continue
+                # Inlined _string_bytes: decoding strings is most of the cost of a row
+                text = mapping[blob + (ends[string_id - 1] if string_id else 0):blob + ends[string_id]]
+                row[name] = text.decode("utf-8") if kind == "str" else orjson.loads(text)
+            else:
+                tag = tags[i] if tags is not None else TAG_VALUE
+                if tag == TAG_VALUE:
+                    row[name] = values[i]
+                elif tag == TAG_INT:
+                    row[name] = int(values[i])
+                elif tag == TAG_NULL:
+                    row[name] = None
+        return row
+
+    def key_at(self, i: int) -> str:
+        return self.string(self.key_ids[i])
+
+    def version_at(self, i: int) -> int:
+        return self.versions[i]
+
+    def locate(self, key: str) -> Optional[int]:
+        """The row stored under `key`, or None."""
+        ids, rows = self.indexes[self.key]
+        string_id = self.string_id(key)
+        if string_id is None or string_id >= NULL_ID - 1:
+            return None
+        # A value of the array's own type, or numpy converts the whole array to compare
+        string_id = np.uint32(string_id)
+        position = int(np.searchsorted(ids, string_id))
+        if position < self.count and ids[position] == string_id:
+            return rows[position]
+        return None
+
+    def find(self, field: str, value: Any) -> List[int]:
+        """The rows whose `field` equals `value`, in file order."""
+        index = self.indexes.get(field)
+        if index is None:
+            return [i for i in range(self.count) if self.row(i).get(field) == value]
+        string_id = self.string_id(value)
+        if string_id is None:
+            return []
+        ids, rows = index
+        string_id = np.uint32(string_id)
+        lo, hi = np.searchsorted(ids, string_id, "left"), np.searchsorted(ids, string_id, "right")
+        return rows[lo:hi].tolist()
+
+    def timeline_from(self, group: Any, start: Tuple) -> List[Tuple[int, str, int]]:
+        """
+        The (epoch, key, row) entries of `group` in the timeline from `start`,
+        an (epoch,) or (epoch, key) lower bound or () for all, in order.
+        """
+        if self.timeline is None:
+            return []
+        _, groups, epochs, rows = self.timeline
+        string_id = self.string_id(group)
+        if string_id is None:
+            return []
+        string_id = np.uint32(string_id)
+        lo, hi = int(np.searchsorted(groups, string_id, "left")), int(np.searchsorted(groups, string_id, "right"))
+        if start:
+            lo += int(np.searchsorted(epochs[lo:hi], np.int64(start[0]), "left"))
+            if len(start) > 1:
+                while lo < hi and epochs[lo] == start[0] and self.key_at(rows[lo]) < start[1]:
+                    lo += 1
+        return [(epoch, self.key_at(row), row) for epoch, row in zip(epochs[lo:hi].tolist(), rows[lo:hi])]
@@ -0,0 +1,586 @@
+# app/core/mapped_store.py
+
+"""
+Storage backend for several worker processes sharing memory-mapped snapshots.
+
+`MappedStore` is the `DataStore` with each collection's snapshot kept in the
+columnar layout of `core/mapped_snapshot.py` (`db/<file>.col`) instead of
+JSON. Every worker maps the same snapshot read-only, so its rows and indexes
+sit once in the OS page cache however many workers there are; a worker's own
+memory holds only the rows written since the snapshot (its overlay) and the
+views derived from the data.
+
+Writes are journaled as in `DataStore`, but a writer also holds the
+collection's file lock (flock on `db/<file>.journal.lock`) and first replays
+what the other workers appended, so a read-modify-write sees every earlier
+write. Every worker applies the same entries in the same order to the same
+snapshot, which stores its row versions and revision, so versions agree
+between workers and `If-Match` works whichever worker answers.
+
+Compaction, one worker at a time, writes a new snapshot beside the old one
+and renames it into place; the others notice the new file (or the rotated
+journal) and remap. A remap that changes nothing is not reported to
+listeners, so views are only rebuilt for real changes.
+
+Each JSON file is converted once, by `python -m core.mapped_store` before the
+workers start or else by the first worker to start. From then on the
+`.col` files and journals hold the data and the JSON files are not updated;
+if a JSON file is replaced anyway (e.g. by the synthetic data generator), its
+snapshot is converted again and the journal replayed over it, as `DataStore`
+reloads a changed file. That is only done while the snapshot holds no
+compacted writes: those never reach the JSON file, so converting it would
+drop them. Such a snapshot is kept and a warning logged instead, and
+`convert_json` writes its rows back to the JSON file before converting it
+again. POSIX only (flock, mmap).
+"""
+
+import argparse
+import fcntl
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+from collections.abc import MutableMapping
+from contextlib import ExitStack, contextmanager
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.config import DB_DIR, JOURNAL_COMPACT_THRESHOLD, JOURNAL_FSYNC
+from core.journal import Entry, Journal, _read_entries, write_snapshot
+from core.mapped_snapshot import MappedSnapshot, write_mapped_snapshot
+from core.store import Collection, DataStore, Row, date_epoch
+
+# Entries replayed from another worker are reported to listeners one by one
+# up to this many; a longer tail is reported as a reload.
+REPLAY_DELTA_LIMIT = 100
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """A re-entrant lock shared by the threads of this process and, through flock(2), by other processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.depth == 0:
+            try:
+                if self.file is None:
+                    self.file = open(self.path, "ab")
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                self.lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.lock.release()
+
+
+class SharedJournal(Journal):
+    """
+    A journal appended to by several processes, each holding the file lock.
+
+    It remembers which file (inode) its offsets refer to; once compaction has
+    rotated that file away, `size` reports -1 so the reader recovers instead
+    of reading the new file from an old offset. A final line without a
+    newline may be another process's append in progress, so reads leave it
+    alone; a line torn by a crash is cut by the next append.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        super().__init__(path, fsync=fsync)
+        self.inode: Optional[int] = None
+        self.recovered_offset = 0
+        self.create()
+
+    def create(self):
+        """Makes sure the journal file exists, so its identity only changes on rotation."""
+        open(self.path, "ab").close()
+
+    def _current_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def size(self) -> int:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return -1
+        return stat.st_size if stat.st_ino == self.inode else -1
+
+    def read(self, offset: int = 0) -> Tuple[List[Entry], int]:
+        if self._current_inode() != self.inode:
+            # Rotated since it was last read; the next size() sends the reader to recover
+            return [], offset
+        return _read_entries(self.path, offset)
+
+    def recover(self) -> Iterator[Entry]:
+        if os.path.exists(self.rotated_path):
+            entries, _ = _read_entries(self.rotated_path, 0)
+            yield from entries
+        self.inode = self._current_inode()
+        entries, self.recovered_offset = _read_entries(self.path, 0)
+        yield from entries
+
+    def _repair(self):
+        try:
+            with open(self.path, "r+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                if not size:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+
+    def append(self, entry: Entry) -> int:
+        self._repair()
+        size = super().append(entry)
+        self.inode = self._current_inode()
+        return size
+
+    def append_many(self, entries: Iterable[Entry]) -> Tuple[int, int]:
+        self._repair()
+        written = super().append_many(entries)
+        self.inode = self._current_inode()
+        return written
+
+    def rotate(self):
+        super().rotate()
+        self.create()
+        self.inode = self._current_inode()
+
+
+class LayeredRows(MutableMapping):
+    """
+    The rows of a mapped snapshot with the writes since laid over them.
+
+    `overlay` holds rows written since the snapshot and `hidden` the keys of
+    snapshot rows that were deleted or replaced.
+    """
+
+    def __init__(self, snapshot: MappedSnapshot):
+        self.snapshot = snapshot
+        self.overlay: Dict[str, Row] = {}
+        self.hidden: Set[str] = set()
+
+    def position(self, key: str) -> Optional[int]:
+        """The snapshot row stored under `key`, unless it has been hidden."""
+        if key in self.hidden:
+            return None
+        return self.snapshot.locate(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self.overlay.get(key)
+        if row is not None:
+            return row
+        i = self.position(key)
+        return self.snapshot.row(i) if i is not None else default
+
+    def __getitem__(self, key: str) -> Row:
+        row = self.get(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.overlay or (isinstance(key, str) and self.position(key) is not None)
+
+    def __setitem__(self, key: str, row: Row):
+        if key not in self.overlay and self.position(key) is not None:
+            self.hidden.add(key)
+        self.overlay[key] = row
+
+    def __delitem__(self, key: str):
+        found = self.overlay.pop(key, None) is not None
+        if self.position(key) is not None:
+            self.hidden.add(key)
+            found = True
+        if not found:
+            raise KeyError(key)
+
+    def visible(self) -> Iterator[int]:
+        """Positions of the snapshot rows not hidden, in file order."""
+        snapshot = self.snapshot
+        if not self.hidden:
+            return iter(range(snapshot.count))
+        return (i for i in range(snapshot.count) if snapshot.key_at(i) not in self.hidden)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in self.visible():
+            yield self.snapshot.key_at(i)
+        yield from self.overlay
+
+    def __len__(self) -> int:
+        return self.snapshot.count - len(self.hidden) + len(self.overlay)
+
+    def values(self) -> Iterator[Row]:
+        for i in self.visible():
+            yield self.snapshot.row(i)
+        yield from self.overlay.values()
+
+
+class LayeredVersions:
+    """Row versions: those stored in the snapshot, unless the row was written since."""
+
+    def __init__(self, rows: LayeredRows):
+        self.rows = rows
+        self.overlay: Dict[str, int] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        version = self.overlay.get(key)
+        if version is not None:
+            return version
+        i = self.rows.position(key)
+        return self.rows.snapshot.version_at(i) if i is not None else default
+
+    def __getitem__(self, key: str) -> int:
+        version = self.get(key)
+        if version is None:
+            raise KeyError(key)
+        return version
+
+    def __setitem__(self, key: str, version: int):
+        self.overlay[key] = version
+
+    def __delitem__(self, key: str):
+        self.overlay.pop(key, None)
+
+
+class MappedCollection(Collection):
+    """
+    A collection served from a mapped snapshot. The inherited indexes and
+    timelines only hold the overlay's rows; lookups combine them with the
+    snapshot's prebuilt ones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshot: Optional[MappedSnapshot] = None
+
+    def map(self, snapshot: MappedSnapshot):
+        self.snapshot = snapshot
+        self.revision = snapshot.revision
+        self.rows = LayeredRows(snapshot)
+        self.versions = LayeredVersions(self.rows)
+        self.indexes = {field: {} for field in self.index_fields}
+        self.epochs = {}
+        self.timelines = {}
+
+    def find(self, field: str, value: Any) -> List[Row]:
+        snapshot, hidden = self.snapshot, self.rows.hidden
+        rows = [snapshot.row(i) for i in snapshot.find(field, value) if not hidden or snapshot.key_at(i) not in hidden]
+        rows.extend(self.indexes[field].get(value, {}).values())
+        return rows
+
+    def keys_from(self, group: Any, start: Tuple) -> List[Tuple[int, str]]:
+        return [(epoch, key) for epoch, key, _ in self.entries_from(group, start)]
+
+    def entries_from(self, group: Any, start: Tuple) -> List[Tuple[int, str, Optional[int]]]:
+        """
+        The (epoch, key, position) entries of `group` from `start`, in order;
+        the position is the snapshot row, or None for a row of the overlay.
+        """
+        hidden = self.rows.hidden
+        snapshot = [(epoch, key, i) for epoch, key, i in self.snapshot.timeline_from(group, start)
+                    if not hidden or key not in hidden]
+        overlay = [(epoch, key, None) for epoch, key in super().keys_from(group, start)]
+        if not overlay:
+            return snapshot
+        return list(heapq.merge(snapshot, overlay))
+
+
+class MappedStore(DataStore):
+    """
+    The `DataStore` over mapped columnar snapshots, for running several
+    worker processes on one `db/` directory.
+    """
+
+    collection_class = MappedCollection
+
+    def __init__(self, db_dir: str = DB_DIR, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD,
+                 fsync: bool = JOURNAL_FSYNC):
+        super().__init__(db_dir, compact_threshold=compact_threshold, fsync=fsync)
+        self.write_locks: Dict[str, FileLock] = {}
+        self.compact_locks: Dict[str, FileLock] = {}
+        for name, collection in self.collections.items():
+            stem = os.path.join(db_dir, os.path.splitext(collection.file_name)[0])
+            collection.journal = SharedJournal(stem + ".journal", fsync=fsync)
+            self.write_locks[name] = FileLock(stem + ".journal.lock")
+            self.compact_locks[name] = FileLock(stem + ".col.lock")
+        # `instance_id`, dropped whenever a collection is remapped
+        self.series: Optional[str] = None
+        self.remaps = 0
+        self.series_lock = threading.Lock()
+
+    @property
+    def instance_id(self) -> str:
+        # Snapshots converted from the same JSON files start every worker at the
+        # same revisions; a converted-again file starts a new series. Computed
+        # once per remap rather than per read
+        series = self.series
+        if series is None:
+            for name, collection in self.collections.items():
+                if not collection.loaded:
+                    self._collection(name)
+            remaps = self.remaps
+            sources = [collection.snapshot.source for _, collection in sorted(self.collections.items())]
+            series = hashlib.blake2b(json.dumps(sources).encode(), digest_size=8).hexdigest()
+            with self.series_lock:
+                # Not kept if a collection was remapped while the sources were read
+                if self.remaps == remaps:
+                    self.series = series
+        return series
+
+    def _path(self, collection: Collection) -> str:
+        return os.path.join(self.db_dir, os.path.splitext(collection.file_name)[0] + ".col")
+
+    def _source(self, collection: Collection) -> Optional[List[int]]:
+        """Size and mtime of the collection's JSON file, as recorded in snapshots converted from it."""
+        try:
+            stat = os.stat(os.path.join(self.db_dir, collection.file_name))
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def _diverged(snapshot: MappedSnapshot) -> bool:
+        """Whether writes were compacted into the snapshot since it was converted from its JSON file."""
+        return snapshot.revision != snapshot.source_revision
+
+    def _open(self, collection: Collection, source: Optional[List[int]]) -> Optional[MappedSnapshot]:
+        """
+        The collection's snapshot, or None if there is none to keep: none at
+        all, or one converted from an earlier JSON file with no writes since.
+        """
+        try:
+            snapshot = MappedSnapshot(self._path(collection))
+        except FileNotFoundError:
+            return None
+        if snapshot.source == source:
+            return snapshot
+        if self._diverged(snapshot):
+            logger.warning("%s changed on disk, but %s holds writes it lacks; keeping the snapshot. "
+                           "Remove the snapshot to convert the JSON file instead.",
+                           collection.file_name, os.path.basename(snapshot.path))
+            return snapshot
+        return None
+
+    def _map(self, collection: MappedCollection) -> MappedSnapshot:
+        """Maps the collection's snapshot, converting its JSON file first if it is missing or out of date."""
+        source = self._source(collection)
+        snapshot = self._open(collection, source)
+        if snapshot is None:
+            with self.compact_locks[collection.name]:
+                snapshot = self._open(collection, source)
+                if snapshot is None:
+                    self._convert(collection, source)
+                    snapshot = MappedSnapshot(self._path(collection))
+        return snapshot
+
+    def _convert(self, collection: Collection, source: Optional[List[int]]):
+        # Numbered exactly as the JSON store would load them
+        loaded = Collection(collection.file_name, key=collection.key)
+        loaded.load(self._read_file(os.path.join(self.db_dir, collection.file_name)))
+        self._write(collection, list(loaded.rows.values()), [loaded.versions[key] for key in loaded.rows],
+                    loaded.revision, source, loaded.revision)
+
+    def _write(self, collection: Collection, rows: List[Row], versions: List[int], revision: int,
+               source: Optional[List[int]], source_revision: Optional[int]):
+        write_mapped_snapshot(self._path(collection), rows, collection.key, versions, revision,
+                              indexes=collection.index_fields, timeline=collection.timeline_fields,
+                              epoch=date_epoch, source=source, source_revision=source_revision, fsync=self.fsync)
+
+    def _recover(self, collection: MappedCollection):
+        """Maps the current snapshot and replays the journal over it."""
+        revision = collection.revision if collection.loaded else None
+        while True:
+            snapshot = self._map(collection)
+            collection.map(snapshot)
+            entries = 0
+            for entry in collection.journal.recover():
+                collection.apply(entry)
+                entries += 1
+            # Compaction may have swapped the snapshot and dropped the rotated journal meanwhile
+            try:
+                if os.stat(snapshot.path).st_ino == snapshot.inode:
+                    break
+            except FileNotFoundError:
+                break
+        collection.journal_offset = collection.journal.recovered_offset
+        collection.journal_entries = entries
+        collection.loaded = True
+        with self.series_lock:
+            self.remaps += 1
+            self.series = None
+        # The same revision is the same state, so the views built on it still hold
+        if collection.revision != revision:
+            self._notify(collection.name, None, None)
+
+    def _replay(self, collection: Collection, entries: List[Entry]):
+        if len(entries) > REPLAY_DELTA_LIMIT:
+            super()._replay(collection, entries)
+            return
+        for entry in entries:
+            key = entry["row"][collection.key] if entry["op"] == "put" else entry["key"]
+            old = collection.rows.get(key)
+            collection.apply(entry)
+            new = collection.rows.get(key)
+            collection.journal_entries += 1
+            if old is not None or new is not None:
+                self._notify(collection.name, old, new)
+
+    def _maybe_compact(self, name: str):
+        collection = self.collections[name]
+        if collection.journal_entries >= self.compact_threshold and not collection.compacting:
+            collection.compacting = True
+            threading.Thread(target=self.compact, args=(name, self.compact_threshold), daemon=True).start()
+
+    def compact(self, name: str, min_entries: int = 1):
+        """
+        Writes a new snapshot holding the journal, unless (once the other
+        workers' compactions are done) it has fewer than `min_entries` entries.
+        Writers wait only while the journal is rotated, not for the snapshot.
+        """
+        collection = self.collections[name]
+        with self.compact_locks[name], self.compact_lock:
+            try:
+                with self.write_locks[name], collection.lock:
+                    collection = self._collection(name)
+                    rotated = os.path.exists(collection.journal.rotated_path)
+                    if collection.journal_entries < min_entries and not rotated:
+                        return
+                    rows = collection.rows
+                    state = (rows.snapshot, dict(rows.overlay), set(rows.hidden), dict(collection.versions.overlay),
+                             collection.revision)
+                    collection.journal.rotate()
+                    collection.journal_offset = 0
+                    collection.journal_entries = 0
+                snapshot, overlay, hidden, versions, revision = state
+                kept = [i for i in range(snapshot.count) if not hidden or snapshot.key_at(i) not in hidden]
+                self._write(collection, [snapshot.row(i) for i in kept] + list(overlay.values()),
+                            [snapshot.version_at(i) for i in kept] + [versions[key] for key in overlay], revision,
+                            snapshot.source, snapshot.source_revision)
+                with collection.lock:
+                    # Remap on next access, which also releases this worker's overlay
+                    collection.mtime_ns = None
+                    collection.journal.discard_rotated()
+            finally:
+                collection.compacting = False
+
+    def compact_all(self):
+        for name in self.collections:
+            self.compact(name)
+
+    # --- Writes hold the collection's file lock as well ---
+
+    @contextmanager
+    def _exclusive(self, names) -> Iterator[None]:
+        with ExitStack() as stack:
+            for name in sorted(set(names)):
+                stack.enter_context(self.write_locks[name])
+            stack.enter_context(self._locked(names))
+            # Other workers may have written up to the moment the file locks were taken;
+            # replay that first so reads (and derived views) inside the transaction see it
+            self.refresh(*names)
+            yield
+
+    def transaction(self, *names: str) -> ContextManager:
+        return self._exclusive(names)
+
+    def insert(self, name: str, row: Row, expected_version: Optional[int] = None) -> Row:
+        with self.write_locks[name]:
+            return super().insert(name, row, expected_version=expected_version)
+
+    def insert_many(self, name: str, rows: Iterable[Row]) -> int:
+        with self.write_locks[name]:
+            return super().insert_many(name, rows)
+
+    def replace(self, name: str, key: str, row: Row, expected_version: Optional[int] = None) -> Optional[Row]:
+        with self.write_locks[name]:
+            return super().replace(name, key, row, expected_version=expected_version)
+
+    def delete(self, name: str, key: str, expected_version: Optional[int] = None) -> Optional[Row]:
+        with self.write_locks[name]:
+            return super().delete(name, key, expected_version=expected_version)
+
+    # --- Reads ---
+
+    def _dated(self, user_id: str, start: Tuple) -> Iterator[Tuple[int, Row]]:
+        # As in DataStore, but snapshot rows are decoded by position rather than looked up by key
+        transactions = self._collection("transactions")
+        accounts = self.find("accounts", "user_id", user_id)
+        with transactions.lock:
+            slices = [transactions.entries_from(acc["account_id"], start) for acc in accounts]
+            snapshot, overlay = transactions.snapshot, transactions.rows.overlay
+        for epoch, key, position in heapq.merge(*slices):
+            row = snapshot.row(position) if position is not None else overlay.get(key)
+            if row is not None:
+                yield epoch, row
+
+
+def convert_json(db_dir: str = DB_DIR) -> Dict[str, int]:
+    """
+    One-shot conversion of the JSON files (snapshot plus journal) into mapped
+    snapshots, so workers start by mapping them. Journals are first folded
+    into the JSON files; existing snapshots are replaced. Run it while no
+    workers are serving `db_dir`. Returns the number of rows per collection.
+
+    A snapshot holding compacted writes is first written back, with its
+    journal, to its JSON file. If that file has changed since the snapshot
+    was converted from it, neither can be kept without losing the other's
+    rows, and RuntimeError is raised before anything is written.
+    """
+    store = MappedStore(db_dir)
+    diverged = []
+    for name, collection in store.collections.items():
+        try:
+            snapshot = MappedSnapshot(store._path(collection))
+        except FileNotFoundError:
+            continue
+        if not store._diverged(snapshot):
+            continue
+        if snapshot.source != store._source(collection):
+            raise RuntimeError(f"{collection.file_name} changed since {os.path.basename(snapshot.path)} was "
+                               f"converted from it, and the snapshot holds writes it lacks")
+        diverged.append(name)
+    for name in diverged:
+        collection = store._collection(name)
+        with store.compact_locks[name], store.write_locks[name], collection.lock:
+            write_snapshot(os.path.join(db_dir, collection.file_name), list(collection.rows.values()),
+                           indent=collection.indent, fsync=store.fsync)
+            collection.journal.rotate()
+            collection.journal.discard_rotated()
+
+    DataStore(db_dir).compact_all()
+    counts = {}
+    for name, collection in store.collections.items():
+        with store.compact_locks[name]:
+            store._convert(collection, store._source(collection))
+        counts[name] = len(store._collection(name).rows)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the JSON database into mapped snapshots.")
+    parser.add_argument("--db-dir", default=DB_DIR, help="Directory holding the JSON files")
+    args = parser.parse_args()
+
+    for name, count in convert_json(args.db_dir).items():
+        print(f"{name}: {count} rows")
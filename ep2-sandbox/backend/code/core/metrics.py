@@ -0,0 +1,223 @@
+# app/core/metrics.py
+
+"""
+Request metrics in the Prometheus text exposition format.
+
+`Metrics` holds per-route counters and fixed-bucket histograms: request
+latency, request and response body sizes, and the time each request spent in
+each phase. Buckets are cumulative only when rendered; recording a value is a
+bisection and an increment under a lock.
+
+Phases are measured per request with a `RequestTimings` held in a context
+variable, which the threadpool running sync endpoints inherits:
+
+- `storage`: time inside `Store` reads and writes (see `timed_storage`),
+  including the listeners that keep derived views up to date
+- `handler`: the endpoint function, minus its storage time
+- `serialization`: from the endpoint's return to the last body byte, i.e.
+  response model validation, rendering and streaming, minus storage time
+
+Dependencies (such as conditional request checks) and middleware fall
+outside `handler` and `serialization`. The registry is per process: with
+several workers, each one reports its own requests.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds, in seconds, of the latency and phase histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds, in bytes, of the body size histogram buckets
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Route label of requests that matched no route
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestTimings:
+    """Phase timings of the request being handled; see the module docstring."""
+
+    __slots__ = ("storage", "in_storage", "handler_start", "handler_end", "storage_at_start", "storage_at_end")
+
+    def __init__(self):
+        self.storage = 0.0
+        self.in_storage = False
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+        self.storage_at_start = 0.0
+        self.storage_at_end = 0.0
+
+    def phases(self, finished: float) -> Dict[str, float]:
+        """Seconds per phase; `handler` and `serialization` only if the endpoint ran."""
+        phases = {"storage": self.storage}
+        if self.handler_start is not None and self.handler_end is not None:
+            phases["handler"] = max(
+                self.handler_end - self.handler_start - (self.storage_at_end - self.storage_at_start), 0.0)
+            phases["serialization"] = max(finished - self.handler_end - (self.storage - self.storage_at_end), 0.0)
+        return phases
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def timed_storage(method: Callable) -> Callable:
+    """
+    Wraps a store method so its time counts towards the current request's
+    `storage` phase. Nested store calls are counted once; generators are
+    timed per item, since their work happens as they are consumed.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator(*args, **kwargs):
+            iterator = method(*args, **kwargs)
+            while True:
+                timings = current_timings.get()
+                if timings is None or timings.in_storage:
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                else:
+                    timings.in_storage = True
+                    started = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        timings.storage += time.perf_counter() - started
+                        timings.in_storage = False
+                yield item
+
+        return generator
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        timings = current_timings.get()
+        if timings is None or timings.in_storage:
+            return method(*args, **kwargs)
+        timings.in_storage = True
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.storage += time.perf_counter() - started
+            timings.in_storage = False
+
+    return wrapper
+
+
+class Histogram:
+    """Counts per bucket (not cumulative), with the sum and count of all observations."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # The last slot is the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Per-route request metrics of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_progress = 0
+        self.requests: Dict[Labels, int] = {}
+        self.latency: Dict[Labels, Histogram] = {}
+        self.request_size: Dict[Labels, Histogram] = {}
+        self.response_size: Dict[Labels, Histogram] = {}
+        self.phases: Dict[Labels, Histogram] = {}
+
+    def started(self):
+        with self.lock:
+            self.in_progress += 1
+
+    def record(self, method: str, route: str, status: int, seconds: float, request_bytes: int,
+               response_bytes: int, phases: Dict[str, float]):
+        """Records one finished request."""
+        route_labels = (("method", method), ("route", route))
+        with self.lock:
+            self.in_progress -= 1
+            status_labels = route_labels + (("status", str(status)),)
+            self.requests[status_labels] = self.requests.get(status_labels, 0) + 1
+            self._histogram(self.latency, route_labels, LATENCY_BUCKETS).observe(seconds)
+            self._histogram(self.request_size, route_labels, SIZE_BUCKETS).observe(request_bytes)
+            self._histogram(self.response_size, route_labels, SIZE_BUCKETS).observe(response_bytes)
+            for phase, phase_seconds in phases.items():
+                self._histogram(self.phases, route_labels + (("phase", phase),), LATENCY_BUCKETS).observe(phase_seconds)
+
+    @staticmethod
+    def _histogram(family: Dict[Labels, Histogram], labels: Labels, bounds: Sequence[float]) -> Histogram:
+        histogram = family.get(labels)
+        if histogram is None:
+            histogram = family[labels] = Histogram(bounds)
+        return histogram
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self.lock:
+            lines += ["# HELP http_requests_in_progress Requests being handled.",
+                      "# TYPE http_requests_in_progress gauge",
+                      f"http_requests_in_progress {self.in_progress}"]
+            lines += ["# HELP http_requests_total Requests handled, by route and status.",
+                      "# TYPE http_requests_total counter"]
+            for labels, count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(labels)} {count}")
+            families = (
+                ("http_request_duration_seconds", "Request latency, from receipt to the last body byte.", self.latency),
+                ("http_request_size_bytes", "Request body size.", self.request_size),
+                ("http_response_size_bytes", "Response body size.", self.response_size),
+                ("http_request_phase_seconds", "Time per request spent in storage, the handler and serialization.",
+                 self.phases),
+            )
+            for name, help_text, family in families:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for labels, histogram in sorted(family.items()):
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.bounds) + [float("inf")], histogram.counts):
+                        cumulative += count
+                        le = 'le="' + _number(bound) + '"'
+                        lines.append(f"{name}_bucket{_labels(labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of this process, served at /metrics
+METRICS = Metrics()
@@ -0,0 +1,65 @@
+# app/core/networth.py
+
+"""
+Materialized per-user net worth.
+
+Keeps, for every user, the sum of their account balances and the number of
+accounts they hold, so the profile and net worth endpoints read it in O(1)
+instead of summing the user's accounts on every call. The view subscribes to
+the store and applies each account insert, balance change or deletion as a
+delta. Sums are kept as `Decimal` so repeated deltas never drift from a fresh
+sum of the balances. A reload of the accounts file triggers a rebuild.
+"""
+
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from core.store import DerivedView, Row, Store
+
+
+def _amount(balance: float) -> Decimal:
+    return Decimal(repr(balance))
+
+
+class NetWorthView(DerivedView):
+    """Per-user (net worth, account count), kept in sync with a store through its listener hook."""
+
+    collections = ("accounts",)
+
+    def __init__(self, store: Store):
+        self.totals: Dict[str, Tuple[Decimal, int]] = {}
+        super().__init__(store)
+
+    def build(self, store: Store) -> Dict[str, Tuple[Decimal, int]]:
+        totals: Dict[str, Tuple[Decimal, int]] = {}
+        for acc in store.all("accounts"):
+            total, count = totals.get(acc["user_id"], (Decimal(0), 0))
+            totals[acc["user_id"]] = (total + _amount(acc["balance"]), count + 1)
+        return totals
+
+    def publish(self, totals: Dict[str, Tuple[Decimal, int]]):
+        self.totals = totals
+
+    def apply(self, name: str, old: Optional[Row], new: Optional[Row]):
+        if old is not None:
+            self._apply(old["user_id"], -_amount(old["balance"]), -1)
+        if new is not None:
+            self._apply(new["user_id"], _amount(new["balance"]), 1)
+
+    def _apply(self, user_id: str, delta: Decimal, count_delta: int):
+        total, count = self.totals.get(user_id, (Decimal(0), 0))
+        total, count = total + delta, count + count_delta
+        if count:
+            self.totals[user_id] = (total, count)
+        else:
+            self.totals.pop(user_id, None)
+
+    def get(self, user_id: str) -> Tuple[float, int]:
+        """Returns the user's net worth and how many accounts it covers."""
+        self.fresh()
+        with self.lock:
+            total, count = self.totals.get(user_id, (Decimal(0), 0))
+        return float(total), count
+
+
+get_net_worth_view = NetWorthView.attached
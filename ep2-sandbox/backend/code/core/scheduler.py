@@ -0,0 +1,279 @@
+# app/core/scheduler.py
+
+"""
+Background runner that turns due schedule occurrences into transactions.
+
+Each schedule's next occurrence day (computed with `core.forecast`) sits in
+a min-heap, and the runner thread sleeps until the earliest one is due. On
+waking it only touches the schedules at the top of the heap: every due
+occurrence becomes a debit on the source account and a credit on the
+destination account, written through the store together with the matching
+balance changes, after which the schedule's next occurrence is pushed back.
+Schedule writes wake the runner so new or edited schedules are picked up.
+
+Occurrences are dated by day (UTC) and due from the start of their day. Each
+leg's transaction ID is derived from the schedule, the day and the leg, and
+a leg whose transaction already exists is skipped, so running an occurrence
+twice (after a crash, or in two workers on the SQLite backend) books it
+once. Per schedule, the last day materialized is kept in the `sequences`
+collection under `schedule:<schedule_id>`. A schedule seen for the first time
+starts from today.
+
+A schedule whose occurrence cannot be booked is logged and left off the
+heap while the others run; it is retried after RETRY_SECONDS. Any other
+failure of a run is logged too, and the runner rebuilds its heap from the
+store and tries again after the same pause, rather than its thread dying.
+
+After downtime, `catch_up` books every occurrence missed since a schedule's
+last materialized day; without it missed occurrences are skipped and only
+those due today are booked. The runner is off unless `SCHEDULER_ENABLED` is
+set.
+"""
+
+import heapq
+import logging
+import threading
+import weakref
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from core.config import SCHEDULER_CATCH_UP
+from core.forecast import expand_schedules
+from core.store import EPOCH, Row, Store, parse_date
+
+# Merchant ID the data files use for transfers between accounts
+TRANSFER_MERCHANT_ID = "merch_999"
+
+# Longest gap between two occurrences of any frequency, in days; once a
+# schedule has started, its next occurrence (if any) is at most this far off
+MAX_STEP_DAYS = 366
+
+# Upper bound on a sleep, so a changed system clock is noticed eventually
+MAX_SLEEP_SECONDS = 3600.0
+
+# Pause before retrying after a failed run or a schedule that failed to book
+RETRY_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def watermark_key(schedule_id: str) -> str:
+    return f"schedule:{schedule_id}"
+
+
+def leg_transaction_id(schedule_id: str, day: date, leg: str) -> str:
+    """Deterministic ID of one leg ("out" or "in") of a schedule's occurrence on `day`."""
+    return f"txn-{schedule_id}-{day:%Y%m%d}-{leg}"
+
+
+def occurrence_days(schedule: Row, first_day: int, last_day: int) -> List[int]:
+    """Epoch days of the schedule's occurrences with first_day <= day <= last_day."""
+    if last_day < first_day:
+        return []
+    _, days = expand_schedules([schedule], first_day, last_day)
+    return days.tolist()
+
+
+def next_occurrence(schedule: Row, after: int) -> Optional[int]:
+    """Epoch day of the schedule's first occurrence after day `after`, however far off, or None."""
+    try:
+        start_day = (parse_date(schedule["start_date"]).date() - EPOCH).days
+    except (KeyError, TypeError, ValueError):
+        return None
+    first_day = max(after + 1, start_day)
+    upcoming = occurrence_days(schedule, first_day, first_day + MAX_STEP_DAYS)
+    return upcoming[0] if upcoming else None
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ScheduleRunner:
+    """Materializes due schedule occurrences into a store, on a background thread or on demand."""
+
+    def __init__(self, store: Store, catch_up: bool = SCHEDULER_CATCH_UP, clock: Callable[[], datetime] = utc_now):
+        self.store_ref = weakref.ref(store)
+        self.catch_up = catch_up
+        self.clock = clock
+        self.condition = threading.Condition()
+        # (due day, schedule_id); entries whose day no longer matches `due` are stale
+        self.heap: List[Tuple[int, str]] = []
+        self.due: Dict[str, int] = {}
+        self.dirty: Set[str] = set()
+        # Schedules whose booking failed, put back on the heap by the next run
+        self.failed: Set[str] = set()
+        self.stale = True
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        store.subscribe(self.on_change)
+
+    def today(self) -> int:
+        return (self.clock().astimezone(timezone.utc).date() - EPOCH).days
+
+    def on_change(self, name: str, old: Optional[Row], new: Optional[Row]):
+        # Runs under the store's locks: only note what changed and wake the runner
+        if name != "schedules":
+            return
+        with self.condition:
+            if old is None and new is None:
+                self.stale = True
+            else:
+                self.dirty.add((new or old)["schedule_id"])
+            self.condition.notify()
+
+    # --- Heap maintenance ---
+
+    def _watermark(self, schedule_id: str) -> Optional[int]:
+        counter = self.store_ref().get("sequences", watermark_key(schedule_id))
+        return counter["last"] if counter else None
+
+    def _reschedule(self, schedule_id: str, today: int):
+        """Recomputes when the schedule is next due and pushes it onto the heap."""
+        store = self.store_ref()
+        schedule = store.get("schedules", schedule_id)
+        after = self._watermark(schedule_id)
+        if after is None and schedule is not None:
+            # Remember when the schedule was first seen, so downtime before its
+            # first occurrence can still be caught up on. Another runner may
+            # record it first, or book the schedule meanwhile; theirs stands.
+            with store.transaction("sequences"):
+                after = self._watermark(schedule_id)
+                if after is None:
+                    after = today - 1
+                    store.insert("sequences", {"prefix": watermark_key(schedule_id), "last": after})
+        due = next_occurrence(schedule, after) if schedule else None
+        with self.condition:
+            if due is not None:
+                self.due[schedule_id] = due
+                heapq.heappush(self.heap, (due, schedule_id))
+            else:
+                self.due.pop(schedule_id, None)
+
+    def _refresh(self, today: int):
+        """Brings the heap up to date with schedule writes since the last run."""
+        with self.condition:
+            rebuild, self.stale = self.stale, False
+            dirty, self.dirty = self.dirty | self.failed, set()
+            self.failed = set()
+            if rebuild:
+                self.heap, self.due = [], {}
+        if rebuild:
+            dirty = {schedule["schedule_id"] for schedule in self.store_ref().all("schedules")}
+        for schedule_id in dirty:
+            self._reschedule(schedule_id, today)
+
+    def next_due(self) -> Optional[int]:
+        """Epoch day of the earliest pending occurrence, or None if there is none."""
+        with self.condition:
+            while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+                heapq.heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+
+    # --- Materialization ---
+
+    def _book(self, schedule: Row, day: int) -> int:
+        """Writes the legs of one occurrence that are not booked yet. Returns how many were written."""
+        store = self.store_ref()
+        occurred = EPOCH + timedelta(days=day)
+        written = 0
+        legs = (("out", schedule["source_account_id"], -schedule["amount"]),
+                ("in", schedule["destination_account_id"], schedule["amount"]))
+        for leg, account_id, amount in legs:
+            transaction_id = leg_transaction_id(schedule["schedule_id"], occurred, leg)
+            account = store.get("accounts", account_id)
+            # Accounts outside the bank have no balance to update here
+            if account is None or store.get("transactions", transaction_id) is not None:
+                continue
+            store.insert("transactions", {
+                "transaction_id": transaction_id,
+                "account_id": account_id,
+                "merchant_id": TRANSFER_MERCHANT_ID,
+                "date": f"{occurred.isoformat()}T00:00:00Z",
+                "description": schedule["description"],
+                "amount": amount,
+                "category": "Transfers",
+            }, expected_version=0)
+            store.replace("accounts", account_id, {**account, "balance": round(account["balance"] + amount, 2)},
+                          expected_version=store.version("accounts", account_id))
+            written += 1
+        return written
+
+    def _materialize(self, schedule_id: str, today: int) -> int:
+        store = self.store_ref()
+        written = 0
+        with store.transaction("accounts", "schedules", "sequences", "transactions"):
+            schedule = store.get("schedules", schedule_id)
+            if schedule is None:
+                return 0
+            after = self._watermark(schedule_id)
+            if after is None:
+                after = today - 1
+            first_day = after + 1 if self.catch_up else max(after + 1, today)
+            for day in occurrence_days(schedule, first_day, today):
+                written += self._book(schedule, day)
+            store.insert("sequences", {"prefix": watermark_key(schedule_id), "last": today})
+        return written
+
+    def run_due(self) -> int:
+        """Books every occurrence due by today. Returns the number of transactions written."""
+        today = self.today()
+        self._refresh(today)
+        written = 0
+        while True:
+            due = self.next_due()
+            if due is None or due > today:
+                return written
+            with self.condition:
+                _, schedule_id = heapq.heappop(self.heap)
+                del self.due[schedule_id]
+            try:
+                written += self._materialize(schedule_id, today)
+            except Exception:
+                logger.exception("Booking schedule %s failed; retrying in %.0f seconds", schedule_id, RETRY_SECONDS)
+                with self.condition:
+                    self.failed.add(schedule_id)
+                continue
+            self._reschedule(schedule_id, today)
+
+    # --- Background thread ---
+
+    def _seconds_until(self, day: Optional[int]) -> float:
+        if day is None:
+            return MAX_SLEEP_SECONDS
+        wake = datetime.combine(EPOCH + timedelta(days=day), datetime.min.time(), timezone.utc)
+        return min(max((wake - self.clock()).total_seconds(), 0.0), MAX_SLEEP_SECONDS)
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_due()
+                failed = False
+            except Exception:
+                logger.exception("Schedule run failed; retrying in %.0f seconds", RETRY_SECONDS)
+                failed = True
+            with self.condition:
+                if self.stopping:
+                    return
+                if failed:
+                    # The heap may be missing schedules popped before the failure
+                    self.stale = True
+                    self.condition.wait(RETRY_SECONDS)
+                elif not (self.dirty or self.stale):
+                    timeout = self._seconds_until(self.next_due())
+                    if self.failed:
+                        timeout = min(timeout, RETRY_SECONDS)
+                    self.condition.wait(timeout)
+                if self.stopping:
+                    return
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name="schedule-runner", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
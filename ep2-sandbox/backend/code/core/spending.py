@@ -0,0 +1,59 @@
+# app/core/spending.py
+
+"""
+Per-user spending totals by category, merchant and calendar month.
+
+Spending is the outflow of a user's transactions: those with a negative
+amount, counted as positive totals. A query masks the user's transaction
+columns (`core/columnar.py`) to the outflows inside its date range and sums
+them per group with one `np.add.reduceat`, so every group of a result comes
+from the same read of the user's data.
+
+The columns are loaded per user from the store's indexed per-user listing
+and dropped when that user's accounts or transactions change, or when the
+collections are reloaded; nothing is kept for users who are not queried.
+Transactions whose date does not parse, or whose amount is not a number,
+are left out.
+"""
+
+from datetime import date
+from typing import List, Optional, Tuple
+
+from core.columnar import ColumnarIndex, group_sums, month_of
+from core.store import EPOCH
+
+GROUP_BY = ("category", "merchant", "month")
+
+
+def month_label(number: int) -> str:
+    """"YYYY-MM" of a month counted from January 1970."""
+    return f"{1970 + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+class SpendingIndex(ColumnarIndex):
+    """Per-user transaction columns, loaded on demand, answering spending queries."""
+
+    def spending(self, user_id: str, group_by: str, start: Optional[date] = None,
+                 end: Optional[date] = None) -> List[Tuple[str, float, int]]:
+        """
+        The user's spending from `start` (inclusive) to `end` (exclusive) as
+        (group, total, count) per category, merchant or month ("YYYY-MM").
+        Months come in order, other groups largest first.
+        """
+        columns = self.user(user_id)
+        mask = columns.window((start - EPOCH).days if start else None, (end - EPOCH).days if end else None)
+        mask &= columns.amounts < 0
+        spent = -columns.amounts[mask]
+
+        if group_by == "month":
+            months, totals, counts = group_sums(month_of(columns.days[mask]), spent)
+            return [(month_label(int(month)), float(total), int(count))
+                    for month, total, count in zip(months, totals, counts)]
+        codes, names = ((columns.categories, columns.category_names) if group_by == "category"
+                        else (columns.merchants, columns.merchant_names))
+        groups, totals, counts = group_sums(codes[mask], spent)
+        return sorted(((names[code], float(total), int(count)) for code, total, count in zip(groups, totals, counts)),
+                      key=lambda g: (-g[1], g[0]))
+
+
+get_spending_index = SpendingIndex.attached
@@ -0,0 +1,376 @@
+# app/core/sqlite_store.py
+
+"""
+SQLite storage backend.
+
+Serves the same `Store` interface as the JSON-backed `DataStore`, but from a
+local SQLite database, so the routers work unchanged at volumes where holding
+every JSON file in memory is no longer practical. Each collection is a table
+with its primary key, the columns the routers filter on, and the full row as
+JSON in `body`.
+
+Transaction dates are stored normalized to UTC (`YYYY-MM-DDTHH:MM:SSZ`) so
+that the `(account_id, date)` index serves the `history` filter and the
+cash flow windows as range scans. A date that does not parse is stored as
+NULL: the row is kept, but left out of those range scans and of the ordered
+listings, as `DataStore` leaves it out of its timeline.
+
+Every row has a `version` column, set on each write from a per-table counter
+(`row_clock`) so a version is never reused. Writes run in `BEGIN IMMEDIATE`
+transactions, which makes version checks and `transaction()` blocks safe
+across worker processes sharing the database.
+
+Every write, deletes included, advances its table's counter in the same
+transaction, so the counter doubles as the table's revision and all
+processes sharing the database agree on it (and, with the `instance_id`
+stored beside it, on ETags). Each process remembers the counters it last saw;
+`refresh()`, and a write that finds a counter moved, tell the listeners to
+rebuild a table another process wrote to.
+
+Populate the database once from the JSON files with:
+
+    python -m core.sqlite_store --db-dir db --sqlite db/cymbal.sqlite3
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.config import DB_DIR, SQLITE_PATH
+from core.store import DataStore, Row, Store, TransactionPosition, check_version, parse_date
+
+# table -> (primary key, indexed columns)
+TABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "users": ("user_id", ()),
+    "accounts": ("account_id", ("user_id", "category", "type")),
+    "transactions": ("transaction_id", ("account_id", "date")),
+    "life_goals": ("goal_id", ("user_id",)),
+    "schedules": ("schedule_id", ("user_id",)),
+    "meetings": ("meeting_id", ("user_id",)),
+    "advisors": ("advisor_id", ()),
+    "bank_partners": ("partner_id", ()),
+    "sequences": ("prefix", ()),
+}
+
+# Seconds a writer waits for another connection's write lock
+BUSY_TIMEOUT = 30.0
+
+# Rows fetched per query when iterating a user's transactions
+PAGE_BATCH_SIZE = 500
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions(account_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_accounts_user_category_type ON accounts(user_id, category, type)",
+    "CREATE INDEX IF NOT EXISTS idx_schedules_user ON schedules(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_life_goals_user ON life_goals(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_meetings_user ON meetings(user_id)",
+]
+
+
+def normalize_date(value: str) -> str:
+    """Normalizes an ISO 8601 timestamp to a UTC string that sorts chronologically."""
+    return format_date(parse_date(value))
+
+
+def format_date(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SQLiteStore(Store):
+    """`Store` implementation over a SQLite database, with one connection per thread."""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        super().__init__()
+        self.path = path
+        self.local = threading.local()
+        self.create_schema()
+        # The row_clock value of each table as of this process's last read or write of it
+        self.seen: Dict[str, int] = dict(self.conn.execute("SELECT name, value FROM row_clock"))
+        (self._instance_id,) = self.conn.execute("SELECT value FROM meta WHERE name = 'instance_id'").fetchone()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def create_schema(self):
+        with self.conn as conn:
+            # Next row version per table; starts above the default of migrated rows
+            conn.execute("CREATE TABLE IF NOT EXISTS row_clock (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # Drawn once per database, so every process using it shares the same revision series
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('instance_id', ?)", (os.urandom(8).hex(),))
+            for table, (key, columns) in TABLES.items():
+                column_defs = "".join(f", {column} TEXT" for column in columns)
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ({key} TEXT PRIMARY KEY{column_defs}, body TEXT NOT NULL, "
+                    "version INTEGER NOT NULL DEFAULT 1)"
+                )
+                if "version" not in {info[1] for info in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                conn.execute("INSERT OR IGNORE INTO row_clock (name, value) VALUES (?, 1)", (table,))
+            for statement in INDEXES:
+                conn.execute(statement)
+
+    def _params(self, name: str, row: Row, version: int) -> List[Any]:
+        key, columns = TABLES[name]
+        values = [row[key]]
+        for column in columns:
+            value = row.get(column)
+            if name == "transactions" and column == "date" and value is not None:
+                try:
+                    value = normalize_date(value)
+                except (TypeError, ValueError):
+                    value = None
+            values.append(value)
+        values.append(json.dumps(row, default=str))
+        values.append(version)
+        return values
+
+    def _upsert_sql(self, name: str) -> str:
+        key, columns = TABLES[name]
+        names = ", ".join((key,) + columns + ("body", "version"))
+        placeholders = ", ".join("?" for _ in range(len(columns) + 3))
+        return f"INSERT OR REPLACE INTO {name} ({names}) VALUES ({placeholders})"
+
+    def _rows(self, sql: str, params: Tuple = ()) -> List[Row]:
+        return [json.loads(body) for (body,) in self.conn.execute(sql, params)]
+
+    # --- Reads ---
+
+    def all(self, name: str) -> List[Row]:
+        return self._rows(f"SELECT body FROM {name} ORDER BY rowid")
+
+    def get(self, name: str, key: str) -> Optional[Row]:
+        rows = self._rows(f"SELECT body FROM {name} WHERE {TABLES[name][0]} = ?", (key,))
+        return rows[0] if rows else None
+
+    def find(self, name: str, field: str, value: Any) -> List[Row]:
+        if field not in TABLES[name][1]:
+            return [row for row in self.all(name) if row.get(field) == value]
+        return self._rows(f"SELECT body FROM {name} WHERE {field} = ? ORDER BY rowid", (value,))
+
+    def revision(self, name: str) -> int:
+        (value,) = self.conn.execute("SELECT value FROM row_clock WHERE name = ?", (name,)).fetchone()
+        return value
+
+    def refresh(self, *names: str):
+        if not names:
+            return
+        placeholders = ", ".join("?" for _ in names)
+        for name, value in self.conn.execute(f"SELECT name, value FROM row_clock WHERE name IN ({placeholders})",
+                                             names).fetchall():
+            if self.seen.get(name) != value:
+                self.seen[name] = value
+                self._notify(name, None, None)
+
+    def transactions_for_user(self, user_id: str, since: Optional[datetime] = None) -> List[Row]:
+        sql = (
+            "SELECT t.body FROM accounts a "
+            "JOIN transactions t ON t.account_id = a.account_id "
+            "WHERE a.user_id = ?"
+        )
+        params: Tuple = (user_id,)
+        if since is not None:
+            sql += " AND t.date >= ?"
+            params += (format_date(since),)
+        return self._rows(sql + " ORDER BY a.rowid, t.date", params)
+
+    def iter_transactions_for_user(self, user_id: str, since: Optional[datetime] = None,
+                                   after: Optional[TransactionPosition] = None) -> Iterator[Row]:
+        for _, row in self._dated(user_id, since, after):
+            yield row
+
+    def iter_dated_transactions_for_user(self, user_id: str) -> Iterator[Tuple[int, Row]]:
+        yield from self._dated(user_id)
+
+    def _dated(self, user_id: str, since: Optional[datetime] = None,
+               after: Optional[TransactionPosition] = None) -> Iterator[Tuple[int, Row]]:
+        """(epoch, row) of the user's transactions, as listed by `iter_transactions_for_user`."""
+        # Fetched in keyset batches, each on the calling thread's connection, so a
+        # streaming response may resume the generator from any worker thread.
+        position = (format_date(after[0]), after[1]) if after is not None else None
+        while True:
+            sql = (
+                "SELECT t.date, t.transaction_id, CAST(strftime('%s', t.date) AS INTEGER), t.body "
+                "FROM accounts a JOIN transactions t ON t.account_id = a.account_id "
+                "WHERE a.user_id = ? AND t.date IS NOT NULL"
+            )
+            params: Tuple = (user_id,)
+            if since is not None:
+                sql += " AND t.date >= ?"
+                params += (format_date(since),)
+            if position is not None:
+                sql += " AND (t.date, t.transaction_id) > (?, ?)"
+                params += position
+            batch = self.conn.execute(sql + " ORDER BY t.date, t.transaction_id LIMIT ?",
+                                      params + (PAGE_BATCH_SIZE,)).fetchall()
+            for _, _, epoch, body in batch:
+                yield epoch, json.loads(body)
+            if len(batch) < PAGE_BATCH_SIZE:
+                return
+            position = batch[-1][:2]
+
+    # --- Writes ---
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """
+        Runs the enclosed statements in one IMMEDIATE transaction, which takes the
+        database write lock up front so version checks and writes are atomic
+        across threads and processes. Nested in `transaction()` it joins it.
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self.local.pending = []
+        # Counters as seen before this transaction moved them, restored if it rolls back
+        self.local.seen = {}
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            self.seen.update(self.local.seen)
+            self.local.seen = self.local.pending = None
+            raise
+        conn.commit()
+        self.local.seen = None
+        pending, self.local.pending = self.local.pending, None
+        # Listeners only hear about committed writes
+        for change in pending:
+            self._notify(*change)
+
+    def _changed(self, name: str, old: Optional[Row], new: Optional[Row]):
+        pending = getattr(self.local, "pending", None)
+        if pending is None:
+            self._notify(name, old, new)
+        else:
+            pending.append((name, old, new))
+
+    def _current(self, name: str, key: str) -> Tuple[int, Optional[Row]]:
+        found = self.conn.execute(
+            f"SELECT version, body FROM {name} WHERE {TABLES[name][0]} = ?", (key,)
+        ).fetchone()
+        return (found[0], json.loads(found[1])) if found else (0, None)
+
+    def _next_version(self, name: str) -> int:
+        """Advances the table's counter; called under the write lock by every write."""
+        (version,) = self.conn.execute(
+            "UPDATE row_clock SET value = value + 1 WHERE name = ? RETURNING value", (name,)
+        ).fetchone()
+        seen = self.seen.get(name)
+        if getattr(self.local, "seen", None) is not None:
+            self.local.seen.setdefault(name, seen)
+        if seen != version - 1:
+            # Another process wrote to the table since this one last looked
+            self._changed(name, None, None)
+        self.seen[name] = version
+        return version
+
+    def insert(self, name: str, row: Row, expected_version: Optional[int] = None) -> Row:
+        with self._write() as conn:
+            version, old = self._current(name, row[TABLES[name][0]])
+            check_version(name, row[TABLES[name][0]], expected_version, version)
+            conn.execute(self._upsert_sql(name), self._params(name, row, self._next_version(name)))
+            self._changed(name, old, row)
+        return row
+
+    def insert_many(self, name: str, rows: Iterable[Row]) -> int:
+        count = 0
+
+        def params() -> Iterator[Tuple]:
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield self._params(name, row, version)
+
+        with self._write() as conn:
+            version = self._next_version(name)
+            conn.executemany(self._upsert_sql(name), params())
+            self._changed(name, None, None)
+        return count
+
+    def replace(self, name: str, key: str, row: Row, expected_version: Optional[int] = None) -> Optional[Row]:
+        with self._write() as conn:
+            version, old = self._current(name, key)
+            if old is None:
+                return None
+            check_version(name, key, expected_version, version)
+            conn.execute(f"DELETE FROM {name} WHERE {TABLES[name][0]} = ?", (key,))
+            conn.execute(self._upsert_sql(name), self._params(name, row, self._next_version(name)))
+            self._changed(name, old, row)
+        return row
+
+    def delete(self, name: str, key: str, expected_version: Optional[int] = None) -> Optional[Row]:
+        with self._write() as conn:
+            version, row = self._current(name, key)
+            if row is None:
+                return None
+            check_version(name, key, expected_version, version)
+            conn.execute(f"DELETE FROM {name} WHERE {TABLES[name][0]} = ?", (key,))
+            self._next_version(name)
+            self._changed(name, row, None)
+        return row
+
+    def transaction(self, *names: str) -> ContextManager:
+        # SQLite locks the whole database for writing, whichever tables are named
+        return self._write()
+
+    def version(self, name: str, key: str) -> int:
+        return self._current(name, key)[0]
+
+    def compact_all(self):
+        self.conn.execute("PRAGMA optimize")
+
+    @contextmanager
+    def consistent_read(self) -> Iterator[None]:
+        # In WAL mode every read in one transaction sees the same snapshot
+        conn = self.conn
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conn.execute("COMMIT")
+
+
+def import_json(db_dir: str = DB_DIR, path: str = SQLITE_PATH) -> Dict[str, int]:
+    """
+    One-shot import of the JSON files (snapshot plus journal) into a SQLite database.
+
+    Existing rows with the same primary key are overwritten. Returns the number
+    of rows imported per collection.
+    """
+    source = DataStore(db_dir)
+    target = SQLiteStore(path)
+    counts = {}
+    for name in TABLES:
+        rows = source.all(name)
+        target.insert_many(name, rows)
+        counts[name] = len(rows)
+    target.conn.execute("ANALYZE")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the JSON database into SQLite.")
+    parser.add_argument("--db-dir", default=DB_DIR, help="Directory holding the JSON files")
+    parser.add_argument("--sqlite", default=SQLITE_PATH, help="Path of the SQLite database to create")
+    args = parser.parse_args()
+
+    for table, count in import_json(args.db_dir, args.sqlite).items():
+        print(f"{table}: {count} rows")
@@ -0,0 +1,799 @@
+# app/core/store.py
+
+"""
+Shared in-memory data store for the JSON files in `db/`.
+
+Every collection is parsed once and kept in memory together with a hash
+index on its primary key and on the fields the routers filter by. Before a
+collection is read, the store compares the file's modification time with the
+one it loaded and transparently reloads it if the file changed on disk.
+
+Writes are appended to a per-collection journal (see `core/journal.py`) and
+periodically compacted into the JSON file, which acts as the snapshot.
+
+Rows are kept as plain dicts exactly as they appear in the JSON files. They are
+shared between requests, so callers must copy a row before modifying it.
+
+Every row also carries a version number, kept outside the row, that changes on
+each write and never returns to an earlier value. Writes may state the version
+they expect (0 for "must not exist yet") and fail with `ConflictError` if the
+row changed in between. Read-modify-write cycles run inside `transaction()`,
+which holds the locks of the collections involved.
+
+Transaction dates are parsed once, when a row is loaded or written, into UTC
+epoch seconds kept beside the row. Each account's transactions are also kept
+sorted by (epoch, transaction_id), so the date filters of the user listings
+are bisections over integers rather than a parse of every row per request.
+
+`Store` is the interface the routers program against. `DataStore` is the
+default JSON-backed implementation; `core/sqlite_store.py` provides a SQLite
+one, selected with the `STORAGE_BACKEND` setting.
+"""
+
+import json
+import os
+import threading
+import heapq
+import weakref
+from bisect import bisect_left, bisect_right, insort
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import date, datetime, timezone
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.config import DB_DIR, JOURNAL_COMPACT_THRESHOLD, JOURNAL_FSYNC, STORAGE_BACKEND
+from core.journal import Entry, Journal, write_snapshot
+from core.metrics import timed_storage
+
+Row = Dict[str, Any]
+
+# Called as listener(collection, old_row, new_row) after every write. An insert
+# has no old row, a delete has no new row, and (None, None) means the whole
+# collection was reloaded and anything derived from it must be rebuilt.
+Listener = Callable[[str, Optional[Row], Optional[Row]], None]
+
+
+class ConflictError(Exception):
+    """A write expected a different version of the row than the stored one; re-read and retry."""
+
+    def __init__(self, name: str, key: str, expected: int, actual: int):
+        super().__init__(f"{name} '{key}' is at version {actual}, not {expected}")
+        self.name = name
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+
+def check_version(name: str, key: str, expected: Optional[int], actual: int):
+    if expected is not None and expected != actual:
+        raise ConflictError(name, key, expected, actual)
+
+
+def parse_date(value: str) -> datetime:
+    """Parses an ISO 8601 timestamp from the data files into an aware UTC datetime."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def date_epoch(value: str) -> int:
+    """UTC epoch seconds of an ISO 8601 timestamp from the data files."""
+    return epoch_seconds(parse_date(value))
+
+
+def epoch_seconds(value: datetime) -> int:
+    # Naive datetimes are taken as UTC, as in the data files
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+EPOCH = date(1970, 1, 1)
+
+
+def epoch_day(value: datetime) -> int:
+    """Days since the Unix epoch of a datetime, taken in UTC."""
+    return (value.astimezone(timezone.utc).date() - EPOCH).days
+
+
+# Sort key of a transaction in user listings: (date, transaction_id)
+TransactionPosition = Tuple[datetime, str]
+
+
+def transaction_position(row: Row) -> TransactionPosition:
+    return parse_date(row["date"]), row["transaction_id"]
+
+
+class Collection:
+    """
+    A single JSON file held in memory with a primary key and secondary indexes.
+
+    With `timeline=(group_field, date_field)` the collection also keeps, per
+    value of `group_field`, its rows' (epoch, key) pairs in sorted order, the
+    epoch being `date_field` parsed once on the way in. Rows whose date does
+    not parse stay in the collection but out of the timeline.
+    """
+
+    def __init__(self, file_name: str, key: str, indexes: Tuple[str, ...] = (), indent: int = 4,
+                 timeline: Optional[Tuple[str, str]] = None):
+        self.name: Optional[str] = None
+        self.file_name = file_name
+        self.key = key
+        self.index_fields = indexes
+        self.indent = indent
+        self.rows: Dict[str, Row] = {}
+        self.indexes: Dict[str, Dict[Any, Dict[str, Row]]] = {field: {} for field in indexes}
+        # Row version = the collection revision of the row's last write
+        self.versions: Dict[str, int] = {}
+        self.timeline_fields = timeline
+        self.epochs: Dict[str, int] = {}
+        self.timelines: Dict[Any, List[Tuple[int, str]]] = {}
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.revision = 0
+        self.mtime_ns: Optional[int] = None
+        self.journal: Optional[Journal] = None
+        self.journal_offset = 0
+        self.journal_entries = 0
+        self.compacting = False
+
+    def load(self, rows: List[Row]):
+        self.revision += 1
+        self.rows = {}
+        self.versions = {}
+        self.indexes = {field: {} for field in self.index_fields}
+        self.epochs = {}
+        self.timelines = {}
+        for row in rows:
+            self.add(row, sort=False)
+        # Sorting each timeline once beats inserting every row in order
+        for timeline in self.timelines.values():
+            timeline.sort()
+
+    def add(self, row: Row, sort: bool = True):
+        key = row[self.key]
+        if key in self.rows:
+            self.remove(key)
+        self.revision += 1
+        self.rows[key] = row
+        self.versions[key] = self.revision
+        for field in self.index_fields:
+            self.indexes[field].setdefault(row.get(field), {})[key] = row
+        if self.timeline_fields is not None:
+            group_field, date_field = self.timeline_fields
+            try:
+                epoch = date_epoch(row[date_field])
+            except (KeyError, TypeError, ValueError):
+                return
+            self.epochs[key] = epoch
+            timeline = self.timelines.setdefault(row.get(group_field), [])
+            if sort:
+                insort(timeline, (epoch, key))
+            else:
+                timeline.append((epoch, key))
+
+    def remove(self, key: str) -> Optional[Row]:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return None
+        del self.versions[key]
+        self.revision += 1
+        for field in self.index_fields:
+            bucket = self.indexes[field].get(row.get(field))
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.indexes[field][row.get(field)]
+        epoch = self.epochs.pop(key, None)
+        if epoch is not None:
+            group = row.get(self.timeline_fields[0])
+            timeline = self.timelines[group]
+            del timeline[bisect_left(timeline, (epoch, key))]
+            if not timeline:
+                del self.timelines[group]
+        return row
+
+    def find(self, field: str, value: Any) -> List[Row]:
+        return list(self.indexes[field].get(value, {}).values())
+
+    def keys_from(self, group: Any, start: Tuple) -> List[Tuple[int, str]]:
+        """The (epoch, key) pairs of `group` from `start` onwards, in order."""
+        timeline = self.timelines.get(group, ())
+        return timeline[bisect_left(timeline, start):]
+
+    def apply(self, entry: Entry):
+        """Applies one journal entry."""
+        if entry["op"] == "put":
+            self.add(entry["row"])
+        elif entry["op"] == "delete":
+            self.remove(entry["key"])
+
+
+class Store:
+    """
+    Storage interface shared by all backends.
+
+    Collections are addressed by name ("users", "accounts", "transactions",
+    "life_goals", "schedules", "meetings", "advisors", "bank_partners",
+    "sequences") and rows are plain dicts in the shape of the JSON files.
+
+    Derived structures (aggregates, materialized views) stay up to date by
+    registering a listener with `subscribe`.
+    """
+
+    # Reads and writes whose time is reported as the `storage` phase of /metrics
+    TIMED_METHODS = ("all", "get", "find", "revision", "version", "transactions_for_user",
+                     "iter_transactions_for_user", "iter_dated_transactions_for_user", "insert", "insert_many",
+                     "replace", "delete", "next_sequence")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.TIMED_METHODS:
+            if name in cls.__dict__:
+                setattr(cls, name, timed_storage(cls.__dict__[name]))
+
+    def __init__(self):
+        self.listeners: List[Listener] = []
+        self._instance_id = os.urandom(8).hex()
+
+    @property
+    def instance_id(self) -> str:
+        """
+        Names the series `revision()` counts in: stores with the same ID give
+        the same revision to the same state. Revision counters restart with the
+        process by default, so each instance has its own.
+        """
+        return self._instance_id
+
+    def subscribe(self, listener: Listener):
+        """Registers a callback invoked after every change to any collection."""
+        self.listeners.append(listener)
+
+    def _notify(self, name: str, old: Optional[Row], new: Optional[Row]):
+        for listener in self.listeners:
+            listener(name, old, new)
+
+    def refresh(self, *names: str):
+        """
+        Brings the named collections, and the listeners derived from them, up
+        to date with writes made by other processes sharing the storage.
+        """
+
+    def load_all(self):
+        """Prepares the backend before the first request."""
+
+    def compact_all(self):
+        """Flushes any buffered state before shutdown."""
+
+    def consistent_read(self) -> ContextManager:
+        """
+        Context manager under which a series of reads all see the same state,
+        with no write landing in between.
+        """
+        return nullcontext()
+
+    def transaction(self, *names: str) -> ContextManager:
+        """
+        Context manager for a read-modify-write cycle on the named collections.
+
+        No other writer can change those collections until it exits, so what
+        is read inside is still current when it is written back.
+        """
+        return nullcontext()
+
+    def all(self, name: str) -> List[Row]:
+        raise NotImplementedError
+
+    def get(self, name: str, key: str) -> Optional[Row]:
+        raise NotImplementedError
+
+    def find(self, name: str, field: str, value: Any) -> List[Row]:
+        raise NotImplementedError
+
+    def revision(self, name: str) -> int:
+        """A counter that changes whenever the collection changes, for cache invalidation."""
+        raise NotImplementedError
+
+    def version(self, name: str, key: str) -> int:
+        """Current version of the row stored under `key`, or 0 if there is none."""
+        raise NotImplementedError
+
+    def transactions_for_user(self, user_id: str, since: Optional[datetime] = None) -> List[Row]:
+        """All transactions on any of the user's accounts, optionally only those at or after `since`."""
+        raise NotImplementedError
+
+    def iter_transactions_for_user(self, user_id: str, since: Optional[datetime] = None,
+                                   after: Optional[TransactionPosition] = None) -> Iterator[Row]:
+        """
+        The user's transactions in (date, transaction_id) order.
+
+        Only transactions at or after `since` and strictly after the `after`
+        position are yielded, so a page can be resumed from the last row of
+        the previous one.
+        """
+        rows = sorted(self.transactions_for_user(user_id, since=since), key=transaction_position)
+        start = bisect_right(rows, after, key=transaction_position) if after is not None else 0
+        for i in range(start, len(rows)):
+            yield rows[i]
+
+    def iter_dated_transactions_for_user(self, user_id: str) -> Iterator[Tuple[int, Row]]:
+        """
+        The user's transactions in (date, transaction_id) order, each with the
+        UTC epoch seconds of its date as the store keeps it, so callers need
+        not parse the dates again. Transactions whose date does not parse are
+        left out.
+        """
+        for row in self.transactions_for_user(user_id):
+            try:
+                epoch = date_epoch(row["date"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            yield epoch, row
+
+    def insert(self, name: str, row: Row, expected_version: Optional[int] = None) -> Row:
+        """
+        Stores `row`, replacing any row with the same key. With `expected_version`
+        (0 to require that the key is new), raises `ConflictError` on a mismatch.
+        """
+        raise NotImplementedError
+
+    def insert_many(self, name: str, rows: Iterable[Row]) -> int:
+        """
+        Stores every row of `rows`, replacing rows with the same key, as one
+        batch: listeners hear about it once, as a reload (None, None), rather
+        than per row. `rows` may be a generator; it is consumed once. Returns
+        the number of rows stored.
+        """
+        count = 0
+        with self.transaction(name):
+            for row in rows:
+                self.insert(name, row)
+                count += 1
+        return count
+
+    def replace(self, name: str, key: str, row: Row, expected_version: Optional[int] = None) -> Optional[Row]:
+        """Replaces the row stored under `key`. Returns None if it does not exist."""
+        raise NotImplementedError
+
+    def delete(self, name: str, key: str, expected_version: Optional[int] = None) -> Optional[Row]:
+        """Deletes the row stored under `key`. Returns the removed row, or None."""
+        raise NotImplementedError
+
+    def next_sequence(self, prefix: str, start: Callable[[], int]) -> int:
+        """
+        Atomically advances the persistent counter named `prefix` and returns its
+        new value. A counter that does not exist yet continues from `start()`.
+        """
+        with self.transaction("sequences"):
+            counter = self.get("sequences", prefix)
+            value = (counter["last"] if counter else start()) + 1
+            self.insert("sequences", {"prefix": prefix, "last": value})
+        return value
+
+
+class DerivedView:
+    """
+    Base of the structures derived from a store's collections (net worth,
+    cash flow, calendars, ...) and kept in sync with it through its listener
+    hook.
+
+    A subclass names the `collections` it is derived from, computes its state
+    from the store in `build`, installs it in `publish` and applies single
+    row writes in `apply`. A reload of any of those collections marks the
+    view stale, and readers call `fresh()` first, which rebuilds it. The
+    store is read outside the view's lock, so a rebuild is only published if
+    no write landed meanwhile; after `rebuild_attempts` tries that writes
+    kept overtaking, it is built once more inside `store.transaction` over
+    its collections, which holds writers off until it is published.
+
+    One view of each class is attached to a store: `View.attached(store)`.
+    """
+
+    collections: Tuple[str, ...] = ()
+    rebuild_attempts = 3
+
+    def __init__(self, store: "Store"):
+        self.store_ref = weakref.ref(store)
+        self.lock = threading.Lock()
+        self.stale = True
+        self.generation = 0
+        store.subscribe(self.on_change)
+
+    @classmethod
+    def attached(cls, store: "Store"):
+        """Returns the view of this class attached to `store`, creating it on first use."""
+        views = _views.get(store)
+        view = views.get(cls) if views is not None else None
+        if view is None:
+            with _views_lock:
+                views = _views.setdefault(store, {})
+                view = views.get(cls)
+                if view is None:
+                    view = views[cls] = cls(store)
+        return view
+
+    def build(self, store: "Store") -> Any:
+        """Computes the view's state from the store; runs without the lock."""
+        raise NotImplementedError
+
+    def publish(self, state: Any):
+        """Installs a state returned by `build`; runs under the lock."""
+        raise NotImplementedError
+
+    def apply(self, name: str, old: Optional[Row], new: Optional[Row]):
+        """Applies one row write under the lock. By default the view is rebuilt on the next read."""
+        self.stale = True
+
+    def on_change(self, name: str, old: Optional[Row], new: Optional[Row]):
+        if name not in self.collections:
+            return
+        with self.lock:
+            self.generation += 1
+            if self.stale:
+                return
+            if old is None and new is None:
+                self.stale = True
+            else:
+                self.apply(name, old, new)
+
+    def rebuild(self):
+        store = self.store_ref()
+        for _ in range(self.rebuild_attempts):
+            with self.lock:
+                generation = self.generation
+            state = self.build(store)
+            with self.lock:
+                # Only publish if no write landed while the store was being read
+                if self.generation == generation:
+                    self.publish(state)
+                    self.stale = False
+                    return
+        # Under a steady stream of writes that may never happen; build with the writers held off
+        with store.transaction(*self.collections):
+            state = self.build(store)
+            with self.lock:
+                self.publish(state)
+                self.stale = False
+
+    def fresh(self):
+        """Brings the view up to date, including writes other processes made, before it is read."""
+        self.store_ref().refresh(*self.collections)
+        if self.stale:
+            self.rebuild()
+
+
+_views: "weakref.WeakKeyDictionary[Store, Dict[type, DerivedView]]" = weakref.WeakKeyDictionary()
+_views_lock = threading.Lock()
+
+
+class DataStore(Store):
+    """
+    Loads the `db/*.json` files once and serves indexed lookups from memory.
+
+    Writes go through `insert`, `replace` and `delete`, which update the
+    in-memory indexes and append the mutation to the collection's journal.
+    Once a journal holds `compact_threshold` entries it is compacted into the
+    JSON snapshot on a background thread.
+
+    Each collection has its own lock, so writes to different collections do
+    not wait on each other. Locks are always taken in collection name order.
+    Row versions are only comparable within one process, so a given set of
+    files should have a single writing process; several workers can share
+    them through `MappedStore` (`core/mapped_store.py`) or the SQLite backend.
+    """
+
+    collection_class = Collection
+
+    def __init__(self, db_dir: str = DB_DIR, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD,
+                 fsync: bool = JOURNAL_FSYNC):
+        super().__init__()
+        self.db_dir = db_dir
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.compact_lock = threading.Lock()
+        self.collections: Dict[str, Collection] = {
+            "users": self.collection_class("users.json", key="user_id"),
+            "accounts": self.collection_class("accounts.json", key="account_id", indexes=("user_id",)),
+            "transactions": self.collection_class("transactions.json", key="transaction_id",
+                                                  indexes=("account_id",), timeline=("account_id", "date")),
+            "life_goals": self.collection_class("life_goals.json", key="goal_id", indexes=("user_id",), indent=2),
+            "schedules": self.collection_class("schedule.json", key="schedule_id", indexes=("user_id",)),
+            "meetings": self.collection_class("meetings.json", key="meeting_id", indexes=("user_id",), indent=2),
+            "advisors": self.collection_class("advisors.json", key="advisor_id", indent=2),
+            "bank_partners": self.collection_class("bank_partners.json", key="partner_id", indent=2),
+            "sequences": self.collection_class("sequences.json", key="prefix", indent=2),
+        }
+        for name, collection in self.collections.items():
+            collection.name = name
+            journal_name = os.path.splitext(collection.file_name)[0] + ".journal"
+            collection.journal = Journal(os.path.join(db_dir, journal_name), fsync=fsync)
+
+    def _path(self, collection: Collection) -> str:
+        return os.path.join(self.db_dir, collection.file_name)
+
+    def _collection(self, name: str) -> Collection:
+        """
+        Returns a collection, bringing it up to date with the files on disk first.
+
+        A changed snapshot triggers a full reload (snapshot plus journal), and a
+        journal that grew, e.g. through another process, has its new tail replayed.
+        """
+        collection = self.collections[name]
+        mtime_ns = self._mtime(collection)
+        if not collection.loaded or collection.mtime_ns != mtime_ns:
+            with collection.lock:
+                mtime_ns = self._mtime(collection)
+                if not collection.loaded or collection.mtime_ns != mtime_ns:
+                    self._recover(collection)
+                    collection.mtime_ns = mtime_ns
+        elif collection.journal.size() != collection.journal_offset:
+            with collection.lock:
+                journal_size = collection.journal.size()
+                if journal_size < collection.journal_offset:
+                    self._recover(collection)
+                elif journal_size > collection.journal_offset:
+                    entries, collection.journal_offset = collection.journal.read(collection.journal_offset)
+                    self._replay(collection, entries)
+        return collection
+
+    def refresh(self, *names: str):
+        for name in names:
+            self._collection(name)
+
+    def _replay(self, collection: Collection, entries: List[Entry]):
+        """Applies journal entries another process appended."""
+        for entry in entries:
+            collection.apply(entry)
+        collection.journal_entries += len(entries)
+        self._notify(collection.name, None, None)
+
+    def _mtime(self, collection: Collection) -> Optional[int]:
+        try:
+            return os.stat(self._path(collection)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _recover(self, collection: Collection):
+        """Rebuilds a collection from its snapshot plus every journaled mutation since."""
+        collection.load(self._read_file(self._path(collection)))
+        entries = 0
+        for entry in collection.journal.recover():
+            collection.apply(entry)
+            entries += 1
+        collection.journal_offset = collection.journal.size()
+        collection.journal_entries = entries
+        collection.loaded = True
+        self._notify(collection.name, None, None)
+
+    @staticmethod
+    def _read_file(path: str) -> List[Row]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _log(self, name: str, entry: Entry):
+        """Appends a mutation to the collection's journal, compacting it when it grows too long."""
+        collection = self.collections[name]
+        collection.journal_offset += collection.journal.append(entry)
+        collection.journal_entries += 1
+        self._maybe_compact(name)
+
+    def _maybe_compact(self, name: str):
+        collection = self.collections[name]
+        if collection.journal_entries >= self.compact_threshold and not collection.compacting:
+            collection.compacting = True
+            threading.Thread(target=self.compact, args=(name,), daemon=True).start()
+
+    def compact(self, name: str):
+        """
+        Folds a collection's journal into a fresh JSON snapshot.
+
+        The journal is rotated under the write lock, but the snapshot itself is
+        written outside it so writers are never blocked by the O(dataset) dump.
+        """
+        collection = self.collections[name]
+        with self.compact_lock:
+            try:
+                with collection.lock:
+                    collection = self._collection(name)
+                    rows = list(collection.rows.values())
+                    collection.journal.rotate()
+                    collection.journal_offset = 0
+                    collection.journal_entries = 0
+                path = self._path(collection)
+                write_snapshot(path, rows, indent=collection.indent, fsync=self.fsync)
+                with collection.lock:
+                    collection.mtime_ns = self._mtime(collection)
+                    collection.journal.discard_rotated()
+            finally:
+                # A failed compaction leaves the rotated journal for the next one (or recovery) to fold in
+                collection.compacting = False
+
+    def compact_all(self):
+        """Compacts every collection that has journaled writes (used at shutdown)."""
+        for name, collection in self.collections.items():
+            if collection.journal.size() or os.path.exists(collection.journal.rotated_path):
+                self.compact(name)
+
+    def load_all(self):
+        """Loads every collection up front so the first request does not pay for parsing."""
+        for name in self.collections:
+            self._collection(name)
+
+    @contextmanager
+    def _locked(self, names) -> Iterator[None]:
+        with ExitStack() as stack:
+            for name in sorted(set(names)):
+                stack.enter_context(self.collections[name].lock)
+            yield
+
+    def consistent_read(self) -> ContextManager:
+        # Writers (and the listeners they notify) run under the collection locks
+        return self._locked(self.collections)
+
+    def transaction(self, *names: str) -> ContextManager:
+        # Writes are applied as they are made; an exception does not roll them back
+        return self._locked(names)
+
+    # --- Reads ---
+
+    def all(self, name: str) -> List[Row]:
+        return list(self._collection(name).rows.values())
+
+    def get(self, name: str, key: str) -> Optional[Row]:
+        return self._collection(name).rows.get(key)
+
+    def find(self, name: str, field: str, value: Any) -> List[Row]:
+        return self._collection(name).find(field, value)
+
+    def revision(self, name: str) -> int:
+        return self._collection(name).revision
+
+    def version(self, name: str, key: str) -> int:
+        return self._collection(name).versions.get(key, 0)
+
+    def transactions_for_user(self, user_id: str, since: Optional[datetime] = None) -> List[Row]:
+        transactions = self._collection("transactions")
+        rows: List[Row] = []
+        for account in self.find("accounts", "user_id", user_id):
+            if since is None:
+                rows.extend(transactions.find("account_id", account["account_id"]))
+            else:
+                with transactions.lock:
+                    keys = transactions.keys_from(account["account_id"], (epoch_seconds(since),))
+                    rows.extend(transactions.rows[key] for _, key in keys)
+        return rows
+
+    def iter_transactions_for_user(self, user_id: str, since: Optional[datetime] = None,
+                                   after: Optional[TransactionPosition] = None) -> Iterator[Row]:
+        # `since` is inclusive and `after` exclusive; the larger bound wins
+        start: Tuple = (epoch_seconds(since),) if since is not None else ()
+        if after is not None:
+            # The smallest pair sorting after (epoch, id) is (epoch, id + "\0")
+            start = max(start, (epoch_seconds(after[0]), after[1] + "\0"))
+        for _, row in self._dated(user_id, start):
+            yield row
+
+    def iter_dated_transactions_for_user(self, user_id: str) -> Iterator[Tuple[int, Row]]:
+        yield from self._dated(user_id, ())
+
+    def _dated(self, user_id: str, start: Tuple) -> Iterator[Tuple[int, Row]]:
+        """(epoch, row) of the user's transactions from the timeline position `start` on, in order."""
+        transactions = self._collection("transactions")
+        accounts = self.find("accounts", "user_id", user_id)
+        with transactions.lock:
+            # Copies of the key slices, so concurrent writes do not shift them
+            slices = [transactions.keys_from(acc["account_id"], start) for acc in accounts]
+        for epoch, key in heapq.merge(*slices):
+            row = transactions.rows.get(key)
+            if row is not None:
+                yield epoch, row
+
+    # --- Writes ---
+
+    def insert(self, name: str, row: Row, expected_version: Optional[int] = None) -> Row:
+        collection = self.collections[name]
+        with collection.lock:
+            collection = self._collection(name)
+            key = row[collection.key]
+            check_version(name, key, expected_version, collection.versions.get(key, 0))
+            old = collection.rows.get(key)
+            collection.add(row)
+            self._log(name, {"op": "put", "row": row})
+            self._notify(name, old, row)
+        return row
+
+    def insert_many(self, name: str, rows: Iterable[Row]) -> int:
+        # The collection stays locked for the whole batch; readers see all of it or none
+        collection = self.collections[name]
+        with collection.lock:
+            collection = self._collection(name)
+            unsorted: Set[Any] = set()
+
+            def added() -> Iterator[Entry]:
+                for row in rows:
+                    if unsorted and row[collection.key] in collection.rows:
+                        # Replacing a row bisects its timeline, which must be in order
+                        self._sort_timelines(collection, unsorted)
+                    collection.add(row, sort=False)
+                    if collection.timeline_fields is not None:
+                        unsorted.add(row.get(collection.timeline_fields[0]))
+                    yield {"op": "put", "row": row}
+
+            try:
+                size, count = collection.journal.append_many(added())
+            finally:
+                self._sort_timelines(collection, unsorted)
+                self._notify(name, None, None)
+            collection.journal_offset += size
+            collection.journal_entries += count
+            self._maybe_compact(name)
+        return count
+
+    @staticmethod
+    def _sort_timelines(collection: Collection, groups: Set[Any]):
+        for group in groups:
+            timeline = collection.timelines.get(group)
+            if timeline is not None:
+                timeline.sort()
+        groups.clear()
+
+    def replace(self, name: str, key: str, row: Row, expected_version: Optional[int] = None) -> Optional[Row]:
+        collection = self.collections[name]
+        with collection.lock:
+            collection = self._collection(name)
+            if key not in collection.rows:
+                return None
+            check_version(name, key, expected_version, collection.versions[key])
+            old = collection.remove(key)
+            collection.add(row)
+            self._log(name, {"op": "put", "row": row})
+            self._notify(name, old, row)
+        return row
+
+    def delete(self, name: str, key: str, expected_version: Optional[int] = None) -> Optional[Row]:
+        collection = self.collections[name]
+        with collection.lock:
+            collection = self._collection(name)
+            if key in collection.rows:
+                check_version(name, key, expected_version, collection.versions[key])
+            row = collection.remove(key)
+            if row is not None:
+                self._log(name, {"op": "delete", "key": key})
+                self._notify(name, row, None)
+        return row
+
+
+_store: Optional[Store] = None
+_store_lock = threading.Lock()
+
+
+def create_store(backend: str = STORAGE_BACKEND) -> Store:
+    """Builds the storage backend named by `backend` ("json", "mmap" or "sqlite")."""
+    if backend == "json":
+        return DataStore()
+    if backend == "mmap":
+        from core.mapped_store import MappedStore
+        return MappedStore()
+    if backend == "sqlite":
+        from core.sqlite_store import SQLiteStore
+        return SQLiteStore()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def get_store() -> Store:
+    """Returns the process-wide data store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
+
+
+def set_store(store: Optional[Store]):
+    """Replaces the process-wide data store (used by tests and tooling)."""
+    global _store
+    _store = store
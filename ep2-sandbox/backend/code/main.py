@@ -1,16 +1,49 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from api.endpoints import users, accounts, goals, transactions, financials, partners, schedule, meeting
-from core.config import API_PREFIX
+from fastapi.responses import ORJSONResponse
+from api.endpoints import users, accounts, goals, transactions, financials, partners, schedule, meeting, summary, events
+from api.metrics import MetricsMiddleware, TimedRoute
+from api.metrics import router as metrics_router
+from core.config import API_PREFIX, SCHEDULER_ENABLED
+from core.scheduler import ScheduleRunner
+from core.store import ConflictError, get_store
+from contextlib import asynccontextmanager
 import requests
 import os
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Parse the JSON database once at startup instead of on every request,
+    and fold any journaled writes back into the JSON files on shutdown.
+    With SCHEDULER_ENABLED, due scheduled transfers are booked in the background.
+    """
+    get_store().load_all()
+    runner = ScheduleRunner(get_store()) if SCHEDULER_ENABLED else None
+    if runner:
+        runner.start()
+    yield
+    if runner:
+        runner.stop()
+    get_store().compact_all()
+
+
 app = FastAPI(
     title="Cymbal Bank API",
     description="API for the Cymbal Bank, providing access to financial data.",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
+# Routes declared here are labelled in /metrics like the routers' ones
+app.router.route_class = TimedRoute
+
+@app.exception_handler(ConflictError)
+def conflict_handler(request: Request, exc: ConflictError):
+    """A concurrent write changed the row first; the client can re-read and retry."""
+    return ORJSONResponse(status_code=409, content={"detail": str(exc)}, headers={"Retry-After": "0"})
 
 # CORS Middleware
 app.add_middleware(
@@ -19,8 +52,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # Pagination cursor and row versions for If-Match
 )
 
+# Per-route latency, sizes, status codes and phase timings, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(users.router, prefix=API_PREFIX, tags=["Users"])
 app.include_router(accounts.router, prefix=API_PREFIX, tags=["Accounts"])
@@ -30,6 +67,9 @@ app.include_router(financials.router, prefix=API_PREFIX, tags=["Financials"])
 app.include_router(partners.router, prefix=API_PREFIX, tags=["Partners"])
 app.include_router(schedule.router, prefix=API_PREFIX, tags=["Schedule"])
 app.include_router(meeting.router, prefix=API_PREFIX, tags=["Meeting"])
+app.include_router(summary.router, prefix=API_PREFIX, tags=["Summary"])
+app.include_router(events.router, prefix=API_PREFIX, tags=["Events"])
+app.include_router(metrics_router)
 
 @app.get("/", tags=["Root"])
 def read_root():
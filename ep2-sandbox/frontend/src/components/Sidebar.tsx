@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import type { User as FirebaseUser } from "firebase/auth";
-import { fetchInvestments, fetchDebts, fetchUser } from "@/services/api";
+import { fetchUserSummary } from "@/services/api";
 import { Card, CardContent } from "@/components/ui/card";
 import { Avatar, AvatarFallback, AvatarImage } from "@/components/ui/avatar";
 
@@ -43,14 +43,10 @@ const Sidebar: React.FC<SidebarProps> = ({ firebaseUser, mockUserId }) => {
     if (mockUserId) {
       const loadData = async () => {
         try {
-          const [investmentsData, debtsData, userData] = await Promise.all([
-            fetchInvestments(mockUserId),
-            fetchDebts(mockUserId),
-            fetchUser(mockUserId),
-          ]);
-          setInvestments(investmentsData);
-          setDebts(debtsData);
-          setUser(userData);
+          const summary = await fetchUserSummary(mockUserId);
+          setInvestments(summary.investments);
+          setDebts(summary.debts);
+          setUser(summary.profile);
         } catch (err) {
           setError("Failed to load sidebar data.");
         } finally {
@@ -57,6 +57,14 @@ export const fetchInvestments = async (userId: string) => {
   return response.json();
 };
 
+export const fetchUserSummary = async (userId: string) => {
+  const response = await fetch(`${API_URL}/users/${userId}/summary`);
+  if (!response.ok) {
+    throw new Error('Could not fetch user summary');
+  }
+  return response.json();
+};
+
 export const fetchNetWorth = async (userId: string) => {
   const response = await fetch(`${API_URL}/users/${userId}/networth`);
   if (!response.ok) {
@@ -0,0 +1,49 @@
+# tests/conftest.py
+
+import os
+import shutil
+import sys
+
+import pytest
+
+# Adjust the path to import the backend modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'code')))
+
+from core.sqlite_store import SQLiteStore
+from core.store import DataStore, set_store
+
+SOURCE_DB_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend', 'code', 'db')
+
+
+@pytest.fixture
+def db_dir(tmp_path):
+    """A scratch copy of the mock database so tests can write to it freely."""
+    target = tmp_path / "db"
+    shutil.copytree(SOURCE_DB_DIR, target)
+    return str(target)
+
+
+@pytest.fixture
+def backend():
+    """The backend `store` runs on; modules covering both override it with params=["json", "sqlite"]."""
+    return "json"
+
+
+@pytest.fixture
+def sqlite_collections():
+    """The collections copied from `db_dir` into the SQLite store."""
+    return ("users", "accounts", "transactions")
+
+
+@pytest.fixture
+def store(request, backend, db_dir, tmp_path):
+    """The store over `db_dir`, installed as the app's store for the test."""
+    data_store = DataStore(db_dir, fsync=False)
+    if backend == "sqlite":
+        sqlite_store = SQLiteStore(str(tmp_path / "cymbal.sqlite3"))
+        for name in request.getfixturevalue("sqlite_collections"):
+            sqlite_store.insert_many(name, data_store.all(name))
+        data_store = sqlite_store
+    set_store(data_store)
+    yield data_store
+    set_store(None)
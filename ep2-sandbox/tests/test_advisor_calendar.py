@@ -0,0 +1,103 @@
+# tests/test_advisor_calendar.py
+
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.advisor_calendar import Bookings, get_advisor_calendar
+from main import app
+
+# A Monday; Alice Johnson (adv-mortgage-001) is available Mondays 10:00-12:00
+MONDAY = date(2030, 1, 7)
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(app)
+
+
+def book(client, time, minutes=60, **fields):
+    meeting = {"user_id": "user-001", "advisor_name": "Alice Johnson", "advisor_type": "Mortgage",
+               "meeting_time": f"{MONDAY.isoformat()}T{time}:00Z", "duration_minutes": minutes, **fields}
+    return client.post("/api/meetings", json=meeting)
+
+
+def test_bookings_conflicts():
+    bookings = Bookings()
+    bookings.add((100, 200), "a")
+    bookings.add((300, 400), "b")
+    assert bookings.conflict((200, 300)) is None
+    assert bookings.conflict((0, 100)) is None
+    assert bookings.conflict((150, 160)) == "a"
+    assert bookings.conflict((250, 301)) == "b"
+    assert bookings.conflict((50, 500)) == "a"
+    assert bookings.busy((150, 350)) == [(100, 200), (300, 400)]
+    bookings.remove((100, 200), "a")
+    assert bookings.conflict((150, 160)) is None
+
+
+def test_bookings_with_overlapping_rows():
+    # Rows written before the conflict check may overlap: (100, 500) contains (200, 250)
+    bookings = Bookings()
+    bookings.add((100, 500), "long")
+    bookings.add((200, 250), "short")
+    bookings.add((600, 700), "later")
+    assert bookings.conflict((300, 400)) == "long"
+    assert bookings.conflict((500, 600)) is None
+    assert bookings.busy((300, 400)) == [(100, 500)]
+    assert bookings.busy((260, 650)) == [(100, 500), (600, 700)]
+    bookings.remove((100, 500), "long")
+    assert bookings.conflict((300, 400)) is None
+    assert bookings.busy((0, 1000)) == [(200, 250), (600, 700)]
+
+
+def test_double_booking_is_rejected(client, store):
+    first = book(client, "10:00")
+    assert first.status_code == 201
+    assert first.json()["advisor_id"] == "adv-mortgage-001"
+
+    # Overlapping the first meeting, whether the advisor is named or given by ID
+    assert book(client, "10:30").status_code == 409
+    assert book(client, "09:30", advisor_id="adv-mortgage-001").status_code == 409
+    # Back to back is fine, and other advisors are unaffected
+    assert book(client, "11:00", minutes=30).status_code == 201
+    assert book(client, "10:00", advisor_name="Diana Miller", advisor_type="Retirement Planning").status_code == 201
+    assert book(client, "10:00", advisor_id="adv-missing").status_code == 404
+
+    # Cancelling frees the slot again
+    client.delete(f"/api/meetings/{first.json()['meeting_id']}")
+    assert book(client, "10:15", minutes=15).status_code == 201
+    assert len(client.get("/api/meetings/user-001").json()) == 3
+
+
+def test_free_slots_exclude_bookings(client):
+    params = {"start": MONDAY.isoformat(), "days": 7, "min_minutes": 30}
+    before = client.get("/api/advisors/adv-mortgage-001/free_slots", params=params)
+    assert before.status_code == 200
+    assert before.json() == [
+        {"start": "2030-01-07T10:00:00Z", "end": "2030-01-07T12:00:00Z"},
+        {"start": "2030-01-09T14:00:00Z", "end": "2030-01-09T16:00:00Z"},
+    ]
+
+    book(client, "10:30", minutes=60)
+    after = client.get("/api/advisors/adv-mortgage-001/free_slots", params=params)
+    assert after.json()[:2] == [
+        {"start": "2030-01-07T10:00:00Z", "end": "2030-01-07T10:30:00Z"},
+        {"start": "2030-01-07T11:30:00Z", "end": "2030-01-07T12:00:00Z"},
+    ]
+    # Gaps shorter than min_minutes are dropped
+    longer = client.get("/api/advisors/adv-mortgage-001/free_slots", params={**params, "min_minutes": 60})
+    assert [slot["start"] for slot in longer.json()] == ["2030-01-09T14:00:00Z"]
+
+    assert client.get("/api/advisors/adv-missing/free_slots").status_code == 404
+
+
+def test_calendar_rebuilds_after_reload(store):
+    calendar = get_advisor_calendar(store)
+    store.insert("meetings", {"meeting_id": "meet-legacy", "user_id": "user-002", "advisor_name": "Alice Johnson",
+                              "advisor_type": "Mortgage", "meeting_time": "2030-01-07T10:00:00"})
+    probe = {"advisor_name": "Alice Johnson", "meeting_time": "2030-01-07T10:59:00+00:00"}
+    assert calendar.conflict(probe) == "meet-legacy"
+    calendar.stale = True
+    assert calendar.conflict({**probe, "advisor_id": "adv-mortgage-001"}) == "meet-legacy"
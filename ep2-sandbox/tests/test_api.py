@@ -11,6 +11,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from backend.main import app
+from backend.core.store import DataStore
 
 client = TestClient(app)
 
@@ -232,15 +233,13 @@ def test_get_user_average_cash_flow_success(db_data):
     assert isinstance(response.json()["average_monthly_cash_flow"], float)
 
 # --- Data Integrity and Error Handling Tests ---
-@patch('backend.api.endpoints.financials.load_data')
-def test_financials_endpoint_file_not_found(mock_load_data):
-    """Test that a 404 is raised if a data file is not found."""
-    mock_load_data.side_effect = FileNotFoundError
-    response = client.get("/api/users/user-001/debts")
+def test_financials_endpoint_file_not_found(tmp_path):
+    """Test that a 404 is raised if the accounts data file is not found."""
+    with patch('backend.api.endpoints.financials.get_store', return_value=DataStore(str(tmp_path))):
+        response = client.get("/api/users/user-001/debts")
     assert response.status_code == 404
 
-@patch('backend.api.endpoints.financials.load_data')
-def test_get_debts_with_malformed_data_key_error(mock_load_data):
+def test_get_debts_with_malformed_data_key_error(tmp_path):
     """Test that the endpoint handles malformed account data with a KeyError."""
     malformed_account = {
         "account_id": "acc-malformed-001",
@@ -248,8 +247,10 @@ def test_get_debts_with_malformed_data_key_error(mock_load_data):
         # Missing 'category', which will cause a KeyError during filtering
         "balance": 100.00
     }
-    mock_load_data.return_value = [malformed_account]
-    
-    response = client.get("/api/users/user-001/debts")
+    with open(tmp_path / "accounts.json", "w") as f:
+        json.dump([malformed_account], f)
+
+    with patch('backend.api.endpoints.financials.get_store', return_value=DataStore(str(tmp_path))):
+        response = client.get("/api/users/user-001/debts")
     # A KeyError on the server should result in a 500 Internal Server Error
     assert response.status_code == 500
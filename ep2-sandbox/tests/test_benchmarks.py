@@ -0,0 +1,45 @@
+# tests/test_benchmarks.py
+
+import asyncio
+import os
+import sys
+from argparse import Namespace
+
+# Adjust the path to import the benchmarks
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'benchmarks')))
+
+from core.store import set_store
+from endpoints import build_store, regressions, run_size, scaling_exponent, summarize
+
+
+def run(transactions, p50s, scale="user"):
+    return [{"transactions": n, "results": [{"router": "r", "scenario": "s", "scale": scale, "p50_ms": p50}]}
+            for n, p50 in zip(transactions, p50s)]
+
+
+def test_exponent_separates_constant_from_linear():
+    assert abs(scaling_exponent([(1000, 2.0), (10000, 2.1), (100000, 1.9)])) < 0.1
+    assert abs(scaling_exponent([(1000, 1.0), (10000, 10.0), (100000, 100.0)]) - 1.0) < 0.01
+
+
+def test_regressions_flag_per_user_scenarios_that_scale():
+    flat = summarize(run([1000, 10000], [1.0, 1.1]))
+    linear = summarize(run([1000, 10000], [1.0, 10.0]))
+    assert regressions(flat, None) == []
+    assert len(regressions(linear, None)) == 1
+    # Global scenarios may grow, but not faster than in the baseline
+    assert regressions(summarize(run([1000, 10000], [1.0, 10.0], scale="global")), None) == []
+    assert regressions(summarize(run([1000, 10000], [1.0, 10.0], scale="global")),
+                       summarize(run([1000, 10000], [1.0, 1.0], scale="global")))
+
+
+def test_every_scenario_answers(tmp_path):
+    store = build_store("json", str(tmp_path), users=20, per_user=20, seed=0)
+    args = Namespace(only=None, requests=3, warmup=1, concurrency=2, seed=0)
+    try:
+        results = asyncio.run(run_size(store, args))
+    finally:
+        set_store(None)
+    for result in results:
+        assert sum(result["statuses"].values()) == 3
+        assert all(int(code) < 500 for code in result["statuses"]), result
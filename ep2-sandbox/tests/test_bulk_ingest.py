@@ -0,0 +1,164 @@
+# tests/test_bulk_ingest.py
+
+import os
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from core.cashflow import get_cashflow_index
+from core.ingest import TransactionValidator
+from core.store import DataStore
+from main import app
+
+HISTORY_CSV = os.path.join(os.path.dirname(__file__), '..', '..', 'transaction_history.csv')
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+def chunks(body, size=7):
+    """The body in small pieces, so records and UTF-8 characters straddle chunk boundaries."""
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def bulk(client, body, media_type, **params):
+    return client.post("/api/transactions:bulk", params=params, content=chunks(body),
+                       headers={"Content-Type": media_type})
+
+
+def test_history_csv_loads_into_default_account(store):
+    client = TestClient(app)
+    with open(HISTORY_CSV, "rb") as f:
+        body = f.read()
+    before = get_cashflow_index(store).total("user-001")
+
+    response = bulk(client, body, "text/csv", account_id="acc-mw-c-001")
+    assert response.status_code == 200
+    result = response.json()
+    assert result["received"] == result["inserted"] == body.count(b"\n") - 1
+    row = store.get("transactions", "TXN-001")
+    assert row == {"transaction_id": "TXN-001", "account_id": "acc-mw-c-001", "merchant_id": "Whole Foods Market",
+                   "date": "2024-01-01T00:00:00Z", "description": "Groceries - Weekly Shopping",
+                   "amount": -45.67, "category": "Food & Dining"}
+    # Derived views see the whole batch
+    total = sum(float(line.split(b",")[2]) for line in body.splitlines()[1:])
+    assert get_cashflow_index(store).total("user-001") == pytest.approx(before + total)
+
+    # Loading the same file again only reports errors
+    again = bulk(client, body, "text/csv", account_id="acc-mw-c-001").json()
+    assert again["inserted"] == 0 and again["rejected"] == result["received"]
+    assert again["errors"][0] == {"line": 2, "transaction_id": "TXN-001", "error": "Transaction already exists"}
+
+
+def test_errors_are_reported_per_line(store):
+    client = TestClient(app)
+    good = {"transaction_id": "bulk-1", "account_id": "acc-mw-c-001", "merchant_id": "merch_101",
+            "date": "2026-03-01", "description": "Café", "amount": -4.5, "category": "Dining"}
+    lines = [
+        orjson.dumps(good),
+        b"{not json",
+        orjson.dumps({**good, "transaction_id": "bulk-2", "account_id": "acc-missing"}),
+        b"",
+        orjson.dumps({**good, "transaction_id": "bulk-3", "amount": "lots"}),
+        orjson.dumps(good),
+        orjson.dumps({**good, "transaction_id": "bulk-4", "category": None}),
+    ]
+    result = bulk(client, b"\n".join(lines), "application/x-ndjson").json()
+
+    assert result["received"] == 6 and result["inserted"] == 1 and result["rejected"] == 5
+    assert [(e["line"], e["transaction_id"]) for e in result["errors"]] == \
+        [(2, None), (3, "bulk-2"), (5, "bulk-3"), (6, "bulk-1"), (7, "bulk-4")]
+    assert result["errors"][3]["error"] == "Duplicate transaction_id in this upload"
+    assert store.get("transactions", "bulk-1")["date"] == "2026-03-01T00:00:00Z"
+    assert store.get("transactions", "bulk-1")["description"] == "Café"
+
+
+def test_non_finite_amounts_are_rejected(store):
+    client = TestClient(app)
+    body = (b'transaction_id,account_id,merchant_id,date,description,amount,category\n'
+            b'nf-1,acc-mw-c-001,merch_101,2026-03-01,Coffee,NaN,Dining\n'
+            b'nf-2,acc-mw-c-001,merch_101,2026-03-01,Coffee,-inf,Dining\n'
+            b'nf-3,acc-mw-c-001,merch_101,2026-03-01,Coffee,1e400,Dining\n'
+            b'nf-4,acc-mw-c-001,merch_101,2026-03-01,Coffee,-4.5,Dining\n')
+    result = bulk(client, body, "text/csv").json()
+
+    assert result["inserted"] == 1 and result["rejected"] == 3
+    assert result["errors"] == [
+        {"line": 2, "transaction_id": "nf-1", "error": "Invalid amount: 'NaN'"},
+        {"line": 3, "transaction_id": "nf-2", "error": "Invalid amount: '-inf'"},
+        {"line": 4, "transaction_id": "nf-3", "error": "Invalid amount: '1e400'"},
+    ]
+    assert store.get("transactions", "nf-1") is None
+    assert client.get("/api/users/user-001/cashflow").status_code == 200
+
+
+def test_quoted_csv_fields_may_span_lines(store):
+    client = TestClient(app)
+    body = (b'transaction_id,account_id,merchant_id,date,description,amount,category\r\n'
+            b'q-1,acc-mw-c-001,merch_101,2026-03-01T10:30:00Z,"Coffee, ""large""\r\nand cake",-7.25,Dining\r\n'
+            b'q-2,acc-mw-c-001,merch_101,2026-03-02,short row\r\n')
+    result = bulk(client, body, "text/csv").json()
+    assert result["inserted"] == 1
+    assert result["errors"] == [{"line": 4, "transaction_id": None, "error": "Expected 7 columns, got 5"}]
+    assert store.get("transactions", "q-1")["description"] == 'Coffee, "large"\nand cake'
+
+
+def test_rows_stored_meanwhile_are_not_overwritten(store):
+    validator = TransactionValidator(store)
+    row = {"transaction_id": "bulk-race", "account_id": "acc-mw-c-001", "merchant_id": "merch_101",
+           "date": "2025-01-01T00:00:00Z", "description": "Coffee", "amount": -4.5, "category": "Dining"}
+    accepted, errors = validator.validate([(2, row, None), (3, {**row, "transaction_id": "bulk-ok"}, None)])
+    assert [line for line, _ in accepted] == [2, 3] and errors == []
+
+    # Another writer stores the same ID while the rest of the upload arrives
+    store.insert("transactions", {**row, "description": "Stored first"})
+    with store.transaction("accounts", "transactions"):
+        assert store.insert_many("transactions", validator.confirm(accepted)) == 1
+    assert validator.late_errors == [{"line": 2, "transaction_id": "bulk-race", "error": "Transaction already exists"}]
+    assert store.get("transactions", "bulk-race")["description"] == "Stored first"
+    assert store.get("transactions", "bulk-ok") is not None
+
+
+def test_only_the_pending_chunk_is_remembered(store):
+    validator = TransactionValidator(store)
+    row = {"transaction_id": "chunk-1", "account_id": "acc-mw-c-001", "merchant_id": "merch_101",
+           "date": "2026-03-01", "description": "Coffee", "amount": -4.5, "category": "Dining"}
+
+    def ingest(lines, ids):
+        rows, errors = validator.validate([(line, {**row, "transaction_id": transaction_id}, None)
+                                           for line, transaction_id in zip(lines, ids)])
+        with store.transaction("accounts", "transactions"):
+            store.insert_many("transactions", validator.confirm(rows))
+        return errors
+
+    assert ingest([1, 2, 3], ["chunk-1", "chunk-2", "chunk-2"]) == \
+        [{"line": 3, "transaction_id": "chunk-2", "error": "Duplicate transaction_id in this upload"}]
+    assert validator.accepted == set()
+    # A repeat from a chunk already stored is found in the store
+    assert ingest([4, 5], ["chunk-1", "chunk-3"]) == \
+        [{"line": 4, "transaction_id": "chunk-1", "error": "Transaction already exists"}]
+    assert store.get("transactions", "chunk-3") is not None
+
+
+def test_unsupported_media_type(store):
+    client = TestClient(app)
+    assert bulk(client, b"[]", "application/json").status_code == 415
+
+
+def test_batch_survives_restart(db_dir):
+    data_store = DataStore(db_dir, fsync=False)
+    rows = [{"transaction_id": f"r-{i}", "account_id": "acc-mw-c-001", "merchant_id": "m", "date": "2026-01-01T00:00:00Z",
+             "description": "d", "amount": 1.0, "category": "Food"} for i in range(50)]
+    assert data_store.insert_many("transactions", iter(rows)) == 50
+    # Replacing a row of the batch keeps the account's timeline in order
+    data_store.insert_many("transactions", [{**rows[0], "date": "2025-01-01T00:00:00Z"}, rows[1]])
+
+    reopened = DataStore(db_dir, fsync=False)
+    assert reopened.get("transactions", "r-49") == rows[49]
+    assert reopened.get("transactions", "r-0")["date"] == "2025-01-01T00:00:00Z"
+    listed = list(reopened.iter_transactions_for_user("user-001"))
+    assert [row["transaction_id"] for row in listed if row["transaction_id"].startswith("r-")][0] == "r-0"
@@ -0,0 +1,153 @@
+# tests/test_cashflow.py
+
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from core.cashflow import CashflowIndex, DailySeries, get_cashflow_index
+from core.sqlite_store import SQLiteStore, import_json
+from core.store import epoch_day, parse_date
+from main import app
+
+
+def brute_force(store, user_id, start_day=None, end_day=None):
+    total = 0.0
+    for t in store.transactions_for_user(user_id):
+        day = epoch_day(parse_date(t["date"]))
+        if (start_day is None or day >= start_day) and (end_day is None or day < end_day):
+            total += t["amount"]
+    return total
+
+
+def test_daily_series_matches_brute_force():
+    rng = random.Random(3)
+    flows = [(rng.randint(0, 200), rng.uniform(-100, 100)) for _ in range(500)]
+    series = DailySeries.of(np.array([day for day, _ in flows]), np.array([amount for _, amount in flows]))
+
+    assert list(series.days) == sorted({day for day, _ in flows})
+    for _ in range(200):
+        start, end = sorted(rng.sample(range(-10, 220), 2))
+        expected = sum(amount for day, amount in flows if start <= day < end)
+        assert series.total(start, end) == pytest.approx(expected)
+    assert series.total() == pytest.approx(sum(amount for _, amount in flows))
+
+    # Adding on a day already in the series, and on a new one, leaves the original as it was
+    for extra in (flows[0][0], 250, -5):
+        revised = series.plus(extra, 12.5)
+        rebuilt = DailySeries.of(np.array([day for day, _ in flows] + [extra]),
+                                 np.array([amount for _, amount in flows] + [12.5]))
+        assert list(revised.days) == list(rebuilt.days) and list(revised.prefix) == list(rebuilt.prefix)
+    assert series.total() == pytest.approx(sum(amount for _, amount in flows))
+
+
+def test_incremental_updates_match_rebuild(store):
+    index = get_cashflow_index(store)
+    assert index.total("user-001") == pytest.approx(brute_force(store, "user-001"))
+
+    store.insert("transactions", {"transaction_id": "t-late", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                  "date": "2026-03-01T00:00:00Z", "description": "Bonus", "amount": 500,
+                                  "category": "Income"})
+    store.insert("transactions", {"transaction_id": "t-early", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                  "date": "2023-01-01T00:00:00Z", "description": "Old", "amount": -20,
+                                  "category": "Food"})
+    moved = {**store.get("transactions", "t-late"), "date": "2024-06-01T00:00:00Z", "amount": 250}
+    store.replace("transactions", "t-late", moved)
+    some_tx = store.transactions_for_user("user-001")[0]
+    store.delete("transactions", some_tx["transaction_id"])
+    assert not index.stale
+    # The writes were applied to the kept series, not answered by reading the user again
+    assert "user-001" in index.users
+
+    windows = [(None, None), (epoch_day(parse_date("2024-01-01")), epoch_day(parse_date("2024-07-01"))),
+               (epoch_day(parse_date("2024-06-01")), None)]
+    for user_id in ("user-001", "user-002", "user-003"):
+        for start, end in windows:
+            expected = brute_force(store, user_id, start, end)
+            assert index.total(user_id, start, end) == pytest.approx(expected)
+            assert CashflowIndex(store).total(user_id, start, end) == pytest.approx(expected)
+
+
+def test_totals_do_not_drift(store):
+    index = get_cashflow_index(store)
+    before = index.total("user-001")
+    cents = {"transaction_id": "t-cents", "account_id": "acc-mw-c-001", "merchant_id": "m",
+             "date": "2023-01-01T00:00:00Z", "description": "Round-up", "category": "Savings"}
+    rng = random.Random(7)
+    for i in range(200):
+        store.insert("transactions", {**cents, "transaction_id": f"t-cents-{i}",
+                                      "amount": round(rng.uniform(-500, 500), 2)})
+    assert index.total("user-001") == CashflowIndex(store).total("user-001")
+    for i in range(200):
+        store.delete("transactions", f"t-cents-{i}")
+    assert not index.stale
+    # Exactly back where it started, as a rebuild would be
+    assert index.total("user-001") == before == CashflowIndex(store).total("user-001")
+
+
+def test_malformed_dates_are_skipped(store):
+    index = get_cashflow_index(store)
+    before = index.total("user-001")
+    bad = {"transaction_id": "t-bad", "account_id": "acc-mw-c-001", "merchant_id": "m",
+           "date": "yesterday", "description": "Typo", "amount": 10, "category": "Food"}
+    store.insert("transactions", bad)
+    store.replace("transactions", "t-bad", {**bad, "date": "2025-01-01T00:00:00Z"})
+    assert index.total("user-001") == pytest.approx(before + 10)
+    store.replace("transactions", "t-bad", bad)
+    assert index.total("user-001") == CashflowIndex(store).total("user-001") == pytest.approx(before)
+
+
+def test_non_numeric_amounts_are_skipped(store):
+    index = get_cashflow_index(store)
+    before = index.total("user-001")
+    bad = {"transaction_id": "t-null", "account_id": "acc-mw-c-001", "merchant_id": "m",
+           "date": "2025-01-01T00:00:00Z", "description": "Hand edited", "amount": None, "category": "Food"}
+    store.insert("transactions", bad)
+    store.insert("transactions", {**bad, "transaction_id": "t-text", "amount": "12.50"})
+    store.replace("transactions", "t-null", {**bad, "amount": 10})
+    assert index.total("user-001") == pytest.approx(before + 10)
+    store.replace("transactions", "t-null", bad)
+    assert index.total("user-001") == CashflowIndex(store).total("user-001") == pytest.approx(before)
+    assert TestClient(app).get("/api/users/user-001/cashflow").status_code == 200
+
+
+def test_new_account_transactions_are_counted(store):
+    index = get_cashflow_index(store)
+    index.total("user-001")
+    store.insert("accounts", {**store.get("accounts", "acc-mw-c-001"), "account_id": "acc-mw-c-099"})
+    store.insert("transactions", {"transaction_id": "t-new", "account_id": "acc-mw-c-099", "merchant_id": "m",
+                                  "date": "2025-01-01T00:00:00Z", "description": "Deposit", "amount": 75,
+                                  "category": "Income"})
+    assert index.total("user-001") == pytest.approx(brute_force(store, "user-001"))
+
+
+def test_range_endpoint(store):
+    client = TestClient(app)
+    response = client.get("/api/users/user-001/cashflow/range", params={"start": "2024-01-01", "end": "2024-07-01"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["start"] == "2024-01-01" and body["end"] == "2024-07-01"
+    expected = brute_force(store, "user-001", epoch_day(parse_date("2024-01-01")), epoch_day(parse_date("2024-07-01")))
+    assert body["cash_flow"] == pytest.approx(expected)
+
+    everything = client.get("/api/users/user_001/cashflow/range").json()
+    assert everything["cash_flow"] == pytest.approx(brute_force(store, "user-001"))
+
+
+def test_other_workers_writes_reload_only_the_user_read(db_dir, tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.sqlite3")
+    import_json(db_dir, path)
+    worker, other = SQLiteStore(path), SQLiteStore(path)
+    index = CashflowIndex(worker)
+    before = index.total("user-001")
+
+    other.insert("transactions", {"transaction_id": "t-remote", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                  "date": "2025-01-01T00:00:00Z", "description": "Deposit", "amount": 75,
+                                  "category": "Income"})
+
+    def full_scan(name):
+        raise AssertionError(f"read every row of {name}")
+
+    monkeypatch.setattr(worker, "all", full_scan)
+    assert index.total("user-001") == pytest.approx(before + 75)
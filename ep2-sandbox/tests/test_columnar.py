@@ -0,0 +1,125 @@
+# tests/test_columnar.py
+
+import random
+
+import numpy as np
+import pytest
+
+from core.columnar import ColumnarIndex, TransactionColumns, group_sums
+from core.store import date_epoch, epoch_day, parse_date
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+def brute_force(store, user_id, start_day=None, end_day=None):
+    flows = {}
+    for t in store.transactions_for_user(user_id):
+        day = epoch_day(parse_date(t["date"]))
+        if (start_day is None or day >= start_day) and (end_day is None or day < end_day):
+            total, count = flows.get(t["category"], (0.0, 0))
+            flows[t["category"]] = (total + t["amount"], count + 1)
+    return flows
+
+
+def test_group_sums():
+    rng = random.Random(11)
+    codes = np.array([rng.randint(0, 9) for _ in range(300)], dtype=np.int32)
+    values = np.array([rng.uniform(-50, 50) for _ in range(300)])
+    groups, sums, counts = group_sums(codes, values)
+    assert list(groups) == sorted(set(codes.tolist()))
+    for code, total, count in zip(groups, sums, counts):
+        assert total == pytest.approx(values[codes == code].sum())
+        assert count == (codes == code).sum()
+    assert [len(part) for part in group_sums(codes[:0], values[:0])] == [0, 0, 0]
+
+
+def test_columns_match_brute_force(store):
+    columns = TransactionColumns(store.iter_dated_transactions_for_user("user-001"))
+    assert len(columns) == len(store.transactions_for_user("user-001"))
+    # Sorted by (account, day)
+    assert np.all(np.diff(columns.accounts) >= 0)
+    for account in np.unique(columns.accounts):
+        assert np.all(np.diff(columns.days[columns.accounts == account]) >= 0)
+
+    days = sorted(columns.days.tolist())
+    for start, end in [(None, None), (days[len(days) // 3], None), (days[1], days[-2])]:
+        expected = brute_force(store, "user-001", start, end)
+        assert columns.net_flow(start, end) == pytest.approx(sum(total for total, _ in expected.values()))
+        totals = columns.totals(columns.categories, columns.window(start, end), columns.category_names)
+        assert {name: count for name, _, count in totals} == {name: count for name, (_, count) in expected.items()}
+        for name, total, _ in totals:
+            assert total == pytest.approx(expected[name][0])
+
+
+def test_unusable_rows_are_left_out(store):
+    rows = [{"transaction_id": "a", "account_id": "acc", "date": "2025-01-01T00:00:00Z", "amount": 5.0},
+            {"transaction_id": "c", "account_id": "acc", "date": "2025-01-02T00:00:00Z", "amount": None},
+            {"transaction_id": "d", "account_id": "acc", "date": "2025-01-02T00:00:00Z", "amount": float("nan")}]
+    columns = TransactionColumns((date_epoch(row["date"]), row) for row in rows)
+    assert len(columns) == 1 and columns.net_flow() == 5.0
+    assert columns.days.tolist() == [epoch_day(parse_date("2025-01-01"))]
+
+    # Dates that do not parse are left out of the store's dated listing
+    store.insert("transactions", {"transaction_id": "t-bad", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                  "date": "yesterday", "description": "Deposit", "amount": 1, "category": "Income"})
+    assert "t-bad" not in [row["transaction_id"] for _, row in store.iter_dated_transactions_for_user("user-001")]
+
+
+def test_dates_come_from_the_store(store, monkeypatch):
+    listed = list(store.iter_transactions_for_user("user-001"))
+    dated = list(store.iter_dated_transactions_for_user("user-001"))
+    assert dated == [(date_epoch(row["date"]), row) for row in listed]
+
+    def parse(value):
+        raise AssertionError(f"parsed {value}")
+
+    # Building the columns parses no date
+    monkeypatch.setattr("core.store.parse_date", parse)
+    columns = ColumnarIndex(store).user("user-001")
+    assert sorted(columns.days.tolist()) == sorted(epoch // 86400 for epoch, _ in dated)
+
+
+def test_writes_drop_only_the_user_they_touch(store):
+    index = ColumnarIndex(store)
+    before = index.user("user-001").net_flow()
+    index.user("user-002")
+
+    store.insert("transactions", {"transaction_id": "t-new", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                  "date": "2025-01-01T00:00:00Z", "description": "Deposit", "amount": 75,
+                                  "category": "Income"})
+    assert list(index.users) == ["user-002"]
+    assert index.user("user-001").net_flow() == pytest.approx(before + 75)
+
+    # A new account's transactions are counted once the account exists
+    store.insert("accounts", {**store.get("accounts", "acc-mw-c-001"), "account_id": "acc-mw-c-099"})
+    assert "user-001" not in index.users
+    index.user("user-001")
+    store.insert("transactions", {**store.get("transactions", "t-new"), "transaction_id": "t-other",
+                                  "account_id": "acc-mw-c-099"})
+    assert index.user("user-001").net_flow() == pytest.approx(before + 150)
+
+
+def test_reload_reads_users_again_without_a_full_scan(store, monkeypatch):
+    index = ColumnarIndex(store)
+    index.user("user-001")
+    store.insert_many("transactions", [{"transaction_id": "t-bulk", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                        "date": "2025-01-01T00:00:00Z", "description": "Deposit", "amount": 1,
+                                        "category": "Income"}])
+
+    def full_scan(name):
+        raise AssertionError(f"read every row of {name}")
+
+    monkeypatch.setattr(store, "all", full_scan)
+    expected = sum(t["amount"] for t in store.transactions_for_user("user-001"))
+    assert index.user("user-001").net_flow() == pytest.approx(expected)
+
+
+def test_keeps_at_most_max_users(store):
+    index = ColumnarIndex(store, max_users=2)
+    for user_id in ("user-001", "user-002", "user-001", "user-003"):
+        index.user(user_id)
+    assert list(index.users) == ["user-001", "user-003"]
+    assert set(index.user_accounts) == {"user-001", "user-003"}
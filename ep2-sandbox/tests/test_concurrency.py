@@ -0,0 +1,138 @@
+# tests/test_concurrency.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.store import ConflictError
+from main import app
+
+THREADS = 8
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def sqlite_collections():
+    return ("users", "accounts", "life_goals", "schedules")
+
+
+def test_concurrent_account_creation_allocates_unique_ids(store):
+    per_thread = 15
+    payload = {"account_id": "ignored", "user_id": "ignored", "category": "asset", "type": "savings",
+               "sub_type": "savings", "description": "Stress", "balance": 1.0}
+
+    def create_accounts(_):
+        client = TestClient(app)
+        return [client.post("/api/users/user-001/accounts", json=payload) for _ in range(per_thread)]
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        responses = [r for batch in pool.map(create_accounts, range(THREADS)) for r in batch]
+
+    assert all(r.status_code == 201 for r in responses)
+    created = [r.json()["account_id"] for r in responses]
+    assert len(set(created)) == THREADS * per_thread
+    stored = {acc["account_id"] for acc in store.find("accounts", "user_id", "user-001")}
+    assert set(created) <= stored
+
+
+def test_optimistic_updates_lose_nothing(store):
+    store.insert("life_goals", {"goal_id": "goal-counter", "user_id": "user-001", "current_amount_saved": 0})
+    increments = 40
+
+    def add_one():
+        conflicts = 0
+        while True:
+            version = store.version("life_goals", "goal-counter")
+            goal = store.get("life_goals", "goal-counter")
+            updated = {**goal, "current_amount_saved": goal["current_amount_saved"] + 1}
+            try:
+                store.replace("life_goals", "goal-counter", updated, expected_version=version)
+                return conflicts
+            except ConflictError:
+                conflicts += 1
+
+    def worker(_):
+        return sum(add_one() for _ in range(increments))
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(worker, range(THREADS)))
+
+    assert store.get("life_goals", "goal-counter")["current_amount_saved"] == THREADS * increments
+
+
+def test_transaction_serializes_read_modify_write(store):
+    store.insert("life_goals", {"goal_id": "goal-counter", "user_id": "user-001", "current_amount_saved": 0})
+
+    def worker(_):
+        for _ in range(25):
+            with store.transaction("life_goals"):
+                goal = store.get("life_goals", "goal-counter")
+                store.replace("life_goals", "goal-counter",
+                              {**goal, "current_amount_saved": goal["current_amount_saved"] + 1})
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(worker, range(THREADS)))
+
+    assert store.get("life_goals", "goal-counter")["current_amount_saved"] == THREADS * 25
+
+
+def test_versions_never_repeat(store):
+    seen = set()
+    row = {"goal_id": "goal-v", "user_id": "user-001"}
+    for _ in range(3):
+        assert store.version("life_goals", "goal-v") == 0
+        store.insert("life_goals", row, expected_version=0)
+        seen.add(store.version("life_goals", "goal-v"))
+        store.replace("life_goals", "goal-v", row)
+        seen.add(store.version("life_goals", "goal-v"))
+        store.delete("life_goals", "goal-v")
+    assert len(seen) == 6
+    with pytest.raises(ConflictError):
+        store.insert("life_goals", {**row, "goal_id": "goal-001x"}, expected_version=3)
+
+
+def test_stale_if_match_fails_the_precondition(store):
+    client = TestClient(app)
+    goal = {"user_id": "user-001", "description": "Emergency fund", "target_amount": 10000,
+            "target_date": "2026-12-31", "current_amount_saved": 100}
+    created = client.post("/api/goals", json=goal)
+    assert created.status_code == 201
+    goal_id, first_etag = created.json()["goal_id"], created.headers["ETag"]
+
+    updated = client.put(f"/api/goals/{goal_id}", json={**goal, "current_amount_saved": 200},
+                         headers={"If-Match": first_etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] != first_etag
+
+    stale = client.put(f"/api/goals/{goal_id}", json={**goal, "current_amount_saved": 300},
+                       headers={"If-Match": first_etag})
+    assert stale.status_code == 412
+    assert store.get("life_goals", goal_id)["current_amount_saved"] == 200
+
+    # A tag that is not a row version matches no row
+    for tag in ('"not-a-version"', '"1", "2"'):
+        malformed = client.put(f"/api/goals/{goal_id}", json=goal, headers={"If-Match": tag})
+        assert malformed.status_code == 412
+    assert store.get("life_goals", goal_id)["current_amount_saved"] == 200
+
+    assert client.delete(f"/api/goals/{goal_id}", headers={"If-Match": first_etag}).status_code == 412
+    assert client.delete(f"/api/goals/{goal_id}", headers={"If-Match": updated.headers["ETag"]}).status_code == 204
+
+
+def test_stale_if_match_on_a_schedule_fails_the_precondition(store):
+    client = TestClient(app)
+    schedule = client.get("/api/users/user-002/schedules").json()[0]
+    schedule_id = schedule["schedule_id"]
+    version = f'"{store.version("schedules", schedule_id)}"'
+    assert client.put(f"/api/schedules/{schedule_id}", json={**schedule, "amount": 5},
+                      headers={"If-Match": '"999"'}).status_code == 412
+    updated = client.put(f"/api/schedules/{schedule_id}", json={**schedule, "amount": 5}, headers={"If-Match": version})
+    assert updated.status_code == 200
+    assert client.delete(f"/api/schedules/{schedule_id}", headers={"If-Match": version}).status_code == 412
+    assert client.delete(f"/api/schedules/{schedule_id}", headers={"If-Match": "W/junk"}).status_code == 412
+    assert client.delete(f"/api/schedules/{schedule_id}", headers={"If-Match": updated.headers["ETag"]}).status_code == 204
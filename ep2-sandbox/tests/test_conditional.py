@@ -0,0 +1,95 @@
+# tests/test_conditional.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.conditional import etag_matches
+from main import app
+
+READ_PATHS = [
+    "/api/users",
+    "/api/users/user-001",
+    "/api/users/user-001/accounts",
+    "/api/users/user-001/transactions",
+    "/api/users/user-001/debts",
+    "/api/users/user-001/investments",
+    "/api/users/user-001/networth",
+    "/api/users/user-001/cashflow",
+    "/api/users/user-001/average_cashflow",
+    "/api/partners",
+    "/api/partners/user/user-001",
+    "/api/advisors",
+    "/api/users/user-001/schedules",
+    "/api/goals/user-001",
+    "/api/meetings/user-001",
+]
+
+
+@pytest.mark.parametrize("path", READ_PATHS)
+def test_matching_etag_returns_304(store, path):
+    client = TestClient(app)
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    second = client.get(path, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+
+def test_write_changes_etag(store):
+    client = TestClient(app)
+    etag = client.get("/api/users/user-001/accounts").headers["ETag"]
+    account = store.get("accounts", "acc-mw-c-001")
+    store.replace("accounts", "acc-mw-c-001", {**account, "balance": account["balance"] + 1})
+
+    response = client.get("/api/users/user-001/accounts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    # Unrelated collections keep their stamp
+    advisors_etag = client.get("/api/advisors").headers["ETag"]
+    store.insert("life_goals", {"goal_id": "goal-x", "user_id": "user-001"})
+    assert client.get("/api/advisors", headers={"If-None-Match": advisors_etag}).status_code == 304
+
+
+def test_representations_have_distinct_etags(store):
+    client = TestClient(app)
+    json_etag = client.get("/api/users/user-001/transactions").headers["ETag"]
+    ndjson = client.get("/api/users/user-001/transactions", headers={"Accept": "application/x-ndjson"})
+    assert ndjson.headers["ETag"] != json_etag
+
+
+def test_history_window_moves_by_whole_days(store):
+    client = TestClient(app)
+    today = datetime.now(timezone.utc).date()
+    account = store.find("accounts", "user_id", "user-001")[0]["account_id"]
+    row = {"account_id": account, "merchant_id": "m", "description": "Edge", "amount": -1.0, "category": "Food"}
+    # The whole of the day 3 days ago is in, however late in today the request comes, and the day before is not
+    store.insert("transactions", {**row, "transaction_id": "t-first",
+                                  "date": f"{(today - timedelta(days=3)).isoformat()}T00:00:00Z"})
+    store.insert("transactions", {**row, "transaction_id": "t-before",
+                                  "date": f"{(today - timedelta(days=4)).isoformat()}T23:59:59Z"})
+    ids = [t["transaction_id"] for t in client.get("/api/users/user-001/transactions", params={"history": 3}).json()]
+    assert "t-first" in ids and "t-before" not in ids
+
+
+def test_missing_resource_is_never_not_modified(store):
+    client = TestClient(app)
+    etag = client.get("/api/users/user-001").headers["ETag"]
+    for if_none_match in ("*", etag):
+        response = client.get("/api/users/user-999", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 404
+    # The tag of one URL does not match another's
+    assert client.get("/api/users/user-002", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_etag_matches():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('W/"x", W/"abc"', 'W/"abc"')
+    assert not etag_matches("*", 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
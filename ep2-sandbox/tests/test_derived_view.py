@@ -0,0 +1,91 @@
+# tests/test_derived_view.py
+
+import pytest
+
+from core.store import DataStore, DerivedView
+
+
+class AccountCount(DerivedView):
+    """Accounts per user, counting the rebuilds it goes through."""
+
+    collections = ("accounts",)
+
+    def __init__(self, store):
+        self.counts = {}
+        self.builds = 0
+        super().__init__(store)
+
+    def build(self, store):
+        self.builds += 1
+        counts = {}
+        for acc in store.all("accounts"):
+            counts[acc["user_id"]] = counts.get(acc["user_id"], 0) + 1
+        return counts
+
+    def publish(self, counts):
+        self.counts = counts
+
+    def apply(self, name, old, new):
+        if old is not None:
+            self.counts[old["user_id"]] -= 1
+        if new is not None:
+            self.counts[new["user_id"]] = self.counts.get(new["user_id"], 0) + 1
+
+    def get(self, user_id):
+        self.fresh()
+        with self.lock:
+            return self.counts.get(user_id, 0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    data_store = DataStore(str(tmp_path), fsync=False)
+    data_store.load_all()
+    return data_store
+
+
+def account(account_id, user_id):
+    return {"account_id": account_id, "user_id": user_id}
+
+
+def test_one_view_per_store(store, tmp_path):
+    assert AccountCount.attached(store) is AccountCount.attached(store)
+    assert AccountCount.attached(store) is not AccountCount.attached(DataStore(str(tmp_path), fsync=False))
+
+
+def test_applies_writes_without_rebuilding(store):
+    store.insert("accounts", account("a-1", "u-1"))
+    view = AccountCount.attached(store)
+    assert view.get("u-1") == 1
+
+    store.insert("accounts", account("a-2", "u-1"))
+    store.replace("accounts", "a-1", account("a-1", "u-2"))
+    store.delete("accounts", "a-2")
+    store.insert("transactions", {"transaction_id": "t-1", "account_id": "a-1", "date": "2025-01-01T00:00:00Z"})
+    assert (view.get("u-1"), view.get("u-2")) == (0, 1)
+    assert view.builds == 1
+
+
+def test_reload_rebuilds_on_next_read(store):
+    view = AccountCount.attached(store)
+    assert view.get("u-1") == 0
+    store.insert_many("accounts", [account("a-1", "u-1"), account("a-2", "u-1")])
+    assert view.stale
+    assert view.get("u-1") == 2
+    assert view.builds == 2
+
+
+def test_write_during_build_is_not_lost(store):
+    view = AccountCount.attached(store)
+    build = view.build
+
+    def racing_build(s):
+        counts = build(s)
+        if view.builds == 1:
+            # Lands after the store was read; that state must not be published
+            store.insert("accounts", account("a-1", "u-1"))
+        return counts
+
+    view.build = racing_build
+    assert view.get("u-1") == 1
+    assert view.builds == 2
@@ -0,0 +1,56 @@
+# tests/test_eligibility.py
+
+from fastapi.testclient import TestClient
+
+from core.eligibility import get_partner_index, minimum_credit_score
+from main import app
+
+
+def scanned(store, credit_score):
+    """Eligibility by checking every partner, as the endpoint used to."""
+    ids = set()
+    for partner in store.all("bank_partners"):
+        minimum = minimum_credit_score(partner)
+        if minimum is None or (credit_score and credit_score >= minimum):
+            ids.add(partner["partner_id"])
+    return ids
+
+
+def test_matches_linear_scan(store):
+    index = get_partner_index(store)
+    minimums = sorted({minimum_credit_score(p) for p in store.all("bank_partners")} - {None})
+    for score in [None, 0, 300, 850] + minimums + [m - 1 for m in minimums]:
+        eligible = index.eligible(score)
+        assert {p["partner_id"] for p in eligible} == scanned(store, score)
+        gated = [minimum_credit_score(p) for p in eligible if minimum_credit_score(p) is not None]
+        assert gated == sorted(gated)
+
+
+def test_follows_partner_writes(store):
+    index = get_partner_index(store)
+    assert index.eligible(None)
+    partner = store.all("bank_partners")[0]
+    store.insert("bank_partners", {**partner, "partner_id": "partner-strict",
+                                   "eligibility_criteria": {"minimum_credit_score": 1000}})
+    assert "partner-strict" not in {p["partner_id"] for p in index.eligible(999)}
+    assert index.eligible(1000)[-1]["partner_id"] == "partner-strict"
+
+
+def test_batch_endpoint(store):
+    client = TestClient(app)
+    users = store.all("users")
+    requested = [users[0]["user_id"], users[-1]["user_id"], "user-missing", users[0]["user_id"]]
+
+    response = client.post("/api/partners/eligibility", json={"user_ids": requested})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["not_found"] == ["user-missing"]
+    assert list(body["eligible"]) == [users[0]["user_id"], users[-1]["user_id"]]
+    partner_ids = {p["partner_id"] for p in body["partners"]}
+    for user_id, eligible in body["eligible"].items():
+        single = client.get(f"/api/partners/user/{user_id}").json()
+        assert eligible == [p["partner_id"] for p in single]
+        assert set(eligible) <= partner_ids
+
+    everyone = client.post("/api/partners/eligibility", json={}).json()
+    assert set(everyone["eligible"]) == {user["user_id"] for user in users}
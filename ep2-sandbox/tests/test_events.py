@@ -0,0 +1,143 @@
+# tests/test_events.py
+
+import asyncio
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from core import events as events_module
+from core.events import get_event_feed
+from main import app
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def sqlite_collections():
+    return ("users", "accounts", "transactions", "life_goals")
+
+
+@pytest.fixture
+def store(store):
+    # As at startup, so first loads are not reported as changes
+    store.load_all()
+    return store
+
+
+def transaction(transaction_id, account_id="acc-mw-c-001", amount=-5.0):
+    return {"transaction_id": transaction_id, "account_id": account_id, "merchant_id": "merch_101",
+            "date": "2026-03-01T00:00:00Z", "description": "Coffee", "amount": amount, "category": "Dining"}
+
+
+def goal(goal_id, user_id="user-001"):
+    return {"goal_id": goal_id, "user_id": user_id, "description": "Boat", "target_amount": 100.0,
+            "target_date": "2030-01-01", "current_amount_saved": 0.0}
+
+
+def test_events_are_filed_by_owner(store):
+    feed = get_event_feed(store)
+    start = feed.current()
+    other_account = next(a for a in store.all("accounts") if a["user_id"] != "user-001")
+
+    store.insert("transactions", transaction("ev-1"))
+    store.insert("transactions", transaction("ev-2", other_account["account_id"]))
+    store.insert("life_goals", goal("goal-ev"))
+    store.delete("life_goals", "goal-ev")
+
+    events = feed.read("user-001", start)
+    assert [(e.collection, e.op, e.key) for e in events] == [
+        ("transactions", "put", "ev-1"), ("life_goals", "put", "goal-ev"), ("life_goals", "delete", "goal-ev")]
+    assert events[0].row["amount"] == -5.0 and events[2].row is None
+    assert [e.seq for e in events] == sorted(e.seq for e in events)
+    assert [e.key for e in feed.read(other_account["user_id"], start)] == ["ev-2"]
+    # Resuming from an event returns only what followed it
+    assert [e.key for e in feed.read("user-001", events[1].seq)] == ["goal-ev"]
+
+
+def test_reloads_reach_everyone_and_resolve_owners(store):
+    feed = get_event_feed(store)
+    feed.read("user-001", feed.current())
+    start = feed.current()
+
+    store.insert_many("accounts", [{**store.get("accounts", "acc-mw-c-001")}])
+    # Filed once the account map is rebuilt on the next read
+    store.insert("transactions", transaction("ev-3"))
+
+    events = feed.read("user-001", start)
+    assert [(e.collection, e.op) for e in events] == [("accounts", "reload"), ("transactions", "put")]
+    assert [(e.collection, e.op) for e in feed.read("user-002", start)] == [("accounts", "reload")]
+
+
+def test_positions_out_of_the_buffer_must_refetch(store, monkeypatch):
+    monkeypatch.setattr(events_module, "EVENTS_PER_USER", 3)
+    feed = events_module.EventFeed(store)
+    start = feed.current()
+    for i in range(5):
+        store.insert("transactions", transaction(f"ev-{i}"))
+    feed.read("user-001", start)
+    assert feed.read("user-001", start) is None
+    assert [e.key for e in feed.read("user-001", feed.current() - 3)] == ["ev-2", "ev-3", "ev-4"]
+    assert feed.read("user-001", feed.current() + 1) is None
+
+
+async def stream(path, headers=(), count=1, during=None):
+    """The first `count` SSE events of a GET, as (event, id, data); `during` runs once the stream is open."""
+    received, disconnected = [], asyncio.Event()
+    body, opened = bytearray(), asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received.append(message)
+            return
+        body.extend(message.get("body", b""))
+        opened.set()
+        if body.count(b"\n\n") >= count + 1:
+            disconnected.set()
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"test")] + [(k.encode(), v.encode()) for k, v in headers],
+             "client": ("test", 1), "server": ("test", 80)}
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(opened.wait(), 5)
+    if during:
+        during()
+    await asyncio.wait_for(task, 5)
+
+    assert received[0]["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in received[0]["headers"]
+    parsed = []
+    for block in bytes(body).split(b"\n\n")[1:count + 1]:
+        fields = dict(line.split(b": ", 1) for line in block.split(b"\n"))
+        parsed.append((fields[b"event"].decode(), fields[b"id"].decode(), orjson.loads(fields[b"data"])))
+    return parsed
+
+
+def test_stream_delivers_and_resumes(store):
+    def write():
+        store.insert("transactions", transaction("ev-live"))
+        store.insert("life_goals", goal("goal-live"))
+
+    (ready, ready_id, _), put, goal_put = asyncio.run(stream("/api/users/user_001/events", count=3, during=write))
+    assert ready == "ready"
+    assert put[0] == "put" and put[2]["key"] == "ev-live" and put[2]["row"]["amount"] == -5.0
+    assert goal_put[2]["collection"] == "life_goals"
+
+    # Reconnecting after the first change replays the second
+    resumed = asyncio.run(stream("/api/users/user-001/events", headers=[("last-event-id", put[1])]))
+    assert resumed == [goal_put]
+    # An ID from another process cannot be resumed
+    (reset, _, _), = asyncio.run(stream("/api/users/user-001/events", headers=[("last-event-id", "0123-5")]))
+    assert reset == "reset"
+
+
+def test_stream_unknown_user(store):
+    assert TestClient(app).get("/api/users/user-999/events").status_code == 404
@@ -0,0 +1,140 @@
+# tests/test_forecast.py
+
+import calendar
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from core.forecast import FREQUENCIES, ScheduleForecast, expand_schedules, get_forecast_view
+from core.store import EPOCH
+from main import app
+
+
+def occurrences(schedule, first, last):
+    """Dates of a schedule's occurrences in [first, last], stepping one at a time."""
+    unit, step = FREQUENCIES[schedule["frequency"]]
+    start = date.fromisoformat(schedule["start_date"][:10])
+    end = min(date.fromisoformat(schedule["end_date"][:10]), last)
+    found, k = [], 0
+    while True:
+        if unit == "D":
+            day = start + timedelta(days=k * step)
+        else:
+            months = start.month - 1 + k * step
+            year, month = start.year + months // 12, months % 12 + 1
+            day = date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+        if day > end:
+            return found
+        if day >= first:
+            found.append(day)
+        k += 1
+
+
+def test_expansion_matches_stepping():
+    rng = random.Random(7)
+    schedules = []
+    for _ in range(200):
+        start = date(2023, 1, 1) + timedelta(days=rng.randrange(900))
+        schedules.append({
+            "frequency": rng.choice(list(FREQUENCIES)),
+            "start_date": f"{start.isoformat()}T00:00:00Z",
+            "end_date": f"{(start + timedelta(days=rng.randrange(1, 1200))).isoformat()}T00:00:00Z",
+        })
+    schedules.append({"frequency": "hourly", "start_date": "2024-01-01T00:00:00Z", "end_date": "2025-01-01T00:00:00Z"})
+    first, last = date(2024, 3, 15), date(2025, 8, 31)
+
+    owner, days = expand_schedules(schedules, (first - EPOCH).days, (last - EPOCH).days)
+    got = {}
+    for i, day in zip(owner.tolist(), days.tolist()):
+        got.setdefault(i, []).append(EPOCH + timedelta(days=day))
+    for i, schedule in enumerate(schedules[:-1]):
+        assert got.get(i, []) == occurrences(schedule, first, last)
+    assert len(schedules) - 1 not in got
+
+
+def test_transfers_move_between_accounts():
+    schedules = [{"frequency": "monthly", "start_date": "2024-01-31T00:00:00Z", "end_date": "2024-12-31T00:00:00Z",
+                  "amount": 10.0, "source_account_id": "a", "destination_account_id": "b"},
+                 {"frequency": "weekly", "start_date": "2024-01-01T00:00:00Z", "end_date": "2024-12-31T00:00:00Z",
+                  "amount": 1.0, "source_account_id": "a", "destination_account_id": "external"}]
+    accounts = [{"account_id": "a", "user_id": "u", "balance": 100.0},
+                {"account_id": "b", "user_id": "u", "balance": 0.0}]
+    forecast = ScheduleForecast(schedules, accounts, date(2024, 1, 15), months=3).for_user("u", 3)
+
+    assert forecast["months"] == ["2024-01", "2024-02", "2024-03"]
+    a, b = forecast["accounts"]
+    # January: the 22nd and 29th weekly transfers plus the monthly one on the 31st
+    assert a["changes"] == [-12.0, -14.0, -14.0]
+    assert a["projected_balances"] == [88.0, 74.0, 60.0]
+    assert b["changes"] == [10.0, 10.0, 10.0]
+    assert forecast["net_change"] == [-2.0, -4.0, -4.0]
+
+
+def test_view_rebuilds_on_writes_and_new_days(store):
+    view = get_forecast_view(store)
+    today = date(2030, 1, 15)
+    first = view.forecast(today)
+    assert view.forecast(today) is first
+    store.insert("schedules", {
+        "user_id": "user-001", "schedule_id": "schedule-view", "source_account_id": "acc-mw-c-001",
+        "destination_account_id": "acc-mw-s-002", "description": "Savings", "frequency": "monthly",
+        "start_date": "2030-01-20T00:00:00Z", "end_date": "2099-01-01T00:00:00Z", "amount": 50.0,
+    })
+    second = view.forecast(today)
+    assert second is not first
+    code = second.account_codes["acc-mw-s-002"]
+    assert second.changes[code, 0] - first.changes[code, 0] == 50.0
+    # A new day moves the window even though no data changed
+    later = view.forecast(date(2030, 1, 25))
+    expected = ScheduleForecast(store.all("schedules"), store.all("accounts"), date(2030, 1, 25))
+    assert later.today == date(2030, 1, 25)
+    assert (later.changes == expected.changes).all()
+
+
+def test_balance_updates_do_not_rebuild(store):
+    view = get_forecast_view(store)
+    today = date(2030, 1, 15)
+    first = view.forecast(today)
+    balances = first.balances
+    account = store.get("accounts", "acc-mw-c-001")
+    store.replace("accounts", "acc-mw-c-001", {**account, "balance": account["balance"] + 25})
+    assert not view.stale
+    forecast = view.forecast(today)
+    assert forecast is first
+    # The vector a concurrent reader may hold is left as it was
+    assert balances[forecast.account_codes["acc-mw-c-001"]] == account["balance"]
+    assert forecast.balances[forecast.account_codes["acc-mw-c-001"]] == account["balance"] + 25
+    by_user = forecast.for_user("user-001", 12)
+    expected = ScheduleForecast(store.all("schedules"), store.all("accounts"), today).for_user("user-001", 12)
+    assert by_user["net_change"] == expected["net_change"]
+    assert sorted(by_user["accounts"], key=lambda acc: acc["account_id"]) == \
+        sorted(expected["accounts"], key=lambda acc: acc["account_id"])
+
+    # A new account changes the matrix's rows
+    store.insert("accounts", {**account, "account_id": "acc-mw-c-098"})
+    assert view.stale
+    assert "acc-mw-c-098" in view.forecast(today).account_codes
+
+
+def test_forecast_endpoint(store):
+    client = TestClient(app)
+    today = datetime.now(timezone.utc).date()
+    store.insert("schedules", {
+        "user_id": "user-001", "schedule_id": "schedule-forecast", "source_account_id": "acc-mw-c-001",
+        "destination_account_id": "acc-mw-s-002", "description": "Savings", "frequency": "monthly",
+        "start_date": f"{today.isoformat()}T00:00:00Z", "end_date": "2099-01-01T00:00:00Z", "amount": 50.0,
+    })
+
+    response = client.get("/api/users/user-001/forecast", params={"months": 6})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["months"]) == 6
+    accounts = {acc["account_id"]: acc for acc in body["accounts"]}
+    # The first occurrence is today, which is not in the future; one a month follows
+    assert accounts["acc-mw-s-002"]["changes"][1:] == [50.0] * 5
+    assert accounts["acc-mw-c-001"]["projected_balances"][-1] == \
+        store.get("accounts", "acc-mw-c-001")["balance"] + sum(accounts["acc-mw-c-001"]["changes"])
+
+    assert client.get("/api/users/user-missing/forecast").status_code == 404
+    assert client.get("/api/users/user-001/forecast", params={"months": 0}).status_code == 422
@@ -0,0 +1,43 @@
+# tests/test_generate_data.py
+
+import filecmp
+import os
+import sys
+from datetime import date
+
+# Adjust the path to import the generator
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'benchmarks')))
+
+from core.identifiers import next_account_number
+from core.store import DataStore
+from generate_data import DEFAULT_CSV, DEFAULT_SOURCE, JsonSink, Templates, generate
+
+
+def build(target, seed=3):
+    return generate(JsonSink(str(target)), Templates(DEFAULT_SOURCE, DEFAULT_CSV), users=40, transactions=4000,
+                    seed=seed, end=date(2026, 6, 30))
+
+
+def test_seeded_output_is_reproducible(tmp_path):
+    counts = build(tmp_path / "a")
+    build(tmp_path / "b")
+    names = sorted(os.listdir(tmp_path / "a"))
+    _, mismatch, errors = filecmp.cmpfiles(tmp_path / "a", tmp_path / "b", names, shallow=False)
+    assert not mismatch and not errors
+    assert counts["users"] == 40 and counts["transactions"] == 4000
+
+
+def test_output_loads_and_continues_id_sequences(tmp_path):
+    build(tmp_path)
+    store = DataStore(str(tmp_path), fsync=False)
+
+    accounts = store.all("accounts")
+    assert len({acc["account_id"] for acc in accounts}) == len(accounts)
+    owned = {acc["account_id"] for acc in accounts}
+    assert all(t["account_id"] in owned for t in store.all("transactions"))
+    assert sum(len(store.transactions_for_user(u["user_id"], None)) for u in store.all("users")) == 4000
+
+    # The next account number continues after the generated ones
+    prefix = accounts[0]["account_id"].rsplit("-", 1)[0] + "-"
+    highest = max(int(acc["account_id"][len(prefix):]) for acc in accounts if acc["account_id"].startswith(prefix))
+    assert next_account_number(store, prefix, prefix.split("-")[1]) == highest + 1
@@ -0,0 +1,62 @@
+# tests/test_identifiers.py
+
+from fastapi.testclient import TestClient
+
+from core.identifiers import InitialsIndex, get_initials_index, initials_of
+from core.store import DataStore, set_store
+from main import app
+
+NEW_CHECKING = {"account_id": "ignored", "user_id": "ignored", "category": "asset", "type": "checking",
+                "sub_type": "checking", "description": "Everyday", "balance": 10.0}
+
+
+def test_initials_index_follows_users(store):
+    index = get_initials_index(store)
+    assert index.initials("user-001") == initials_of(store.get("users", "user-001")["name"]) == "mw"
+    assert index.users_with("mw") == {"user-001"}
+
+    store.insert("users", {**store.get("users", "user-001"), "user_id": "user-009", "name": "Maya Woods"})
+    store.replace("users", "user-001", {**store.get("users", "user-001"), "name": "Marcus Young"})
+    assert index.users_with("mw") == {"user-009"}
+    assert index.initials("user-001") == "my"
+    fresh = InitialsIndex(store)
+    assert {user_id: fresh.initials(user_id) for user_id in index.by_user} == index.by_user
+    assert index.initials("user-404") is None
+
+
+def test_counter_continues_after_existing_ids_and_persists(store, db_dir):
+    client = TestClient(app)
+    first = client.post("/api/users/user-003/accounts", json=NEW_CHECKING)
+    assert first.json()["account_id"] == "acc-ak-c-002"
+    assert store.get("sequences", "acc-ak-c-")["last"] == 2
+
+    # A fresh store replays the counter from the journal instead of rescanning
+    reopened = DataStore(db_dir, fsync=False)
+    set_store(reopened)
+    second = client.post("/api/users/user-003/accounts", json=NEW_CHECKING)
+    assert second.json()["account_id"] == "acc-ak-c-003"
+
+
+def test_allocation_does_not_scan_all_accounts(store, monkeypatch):
+    get_initials_index(store).initials("user-001")
+    all_rows = store.all
+
+    def no_full_scans(name):
+        assert name != "accounts", "account creation scanned every account"
+        return all_rows(name)
+
+    monkeypatch.setattr(store, "all", no_full_scans)
+    response = TestClient(app).post("/api/users/user_001/accounts", json=NEW_CHECKING)
+    assert response.status_code == 201
+    assert response.json()["account_id"] == "acc-mw-c-002"
+
+
+def test_skips_ids_taken_outside_the_counter(store):
+    client = TestClient(app)
+    assert client.post("/api/users/user-001/accounts", json=NEW_CHECKING).json()["account_id"] == "acc-mw-c-002"
+    store.insert("accounts", {**store.get("accounts", "acc-mw-c-001"), "account_id": "acc-mw-c-003"})
+    assert client.post("/api/users/user-001/accounts", json=NEW_CHECKING).json()["account_id"] == "acc-mw-c-004"
+
+
+def test_unknown_user(store):
+    assert TestClient(app).post("/api/users/user-404/accounts", json=NEW_CHECKING).status_code == 404
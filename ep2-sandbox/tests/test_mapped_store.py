@@ -0,0 +1,214 @@
+# tests/test_mapped_store.py
+
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+from core.mapped_snapshot import MappedSnapshot, write_mapped_snapshot
+from core.advisor_calendar import get_advisor_calendar
+from core.mapped_store import MappedStore, convert_json
+from core.store import ConflictError, DataStore, date_epoch
+
+# Put on the path of the worker processes
+CODE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'code'))
+
+
+def transaction(transaction_id, account_id="acc-mw-c-001", date="2026-03-01T00:00:00Z"):
+    return {"transaction_id": transaction_id, "account_id": account_id, "merchant_id": "merch_101",
+            "date": date, "description": "Coffee", "amount": -5.0, "category": "Dining"}
+
+
+def test_snapshot_round_trips_rows(tmp_path):
+    rows = [
+        {"id": "b", "group": "g1", "date": "2024-01-02T00:00:00Z", "amount": 1, "rate": 0.5, "flag": True,
+         "tags": ["x", {"y": 1}], "note": "café ☕"},
+        {"id": "a", "group": "g1", "date": "2024-01-01T00:00:00Z", "amount": 2, "rate": 3, "flag": False,
+         "tags": None, "note": None},
+        {"id": "c", "group": "g2", "date": "not a date", "amount": 3, "flag": True, "extra": 1.5},
+    ]
+    path = str(tmp_path / "rows.col")
+    write_mapped_snapshot(path, rows, "id", [7, 8, 9], 42, indexes=("group",), timeline=("group", "date"),
+                          epoch=date_epoch, fsync=False)
+    snapshot = MappedSnapshot(path)
+
+    assert [snapshot.row(i) for i in range(3)] == rows
+    assert isinstance(snapshot.row(1)["rate"], int) and isinstance(snapshot.row(0)["rate"], float)
+    assert "rate" not in snapshot.row(2) and "extra" not in snapshot.row(0)
+    assert snapshot.revision == 42 and [snapshot.version_at(i) for i in range(3)] == [7, 8, 9]
+    assert [snapshot.locate(key) for key in ("a", "b", "c", "d")] == [1, 0, 2, None]
+    assert snapshot.find("group", "g1") == [0, 1] and snapshot.find("group", "g3") == []
+    # Rows whose date does not parse are left out of the timeline
+    assert snapshot.timeline_from("g1", ()) == [(1704067200, "a", 1), (1704153600, "b", 0)]
+    assert snapshot.timeline_from("g1", (1704067200, "a\0")) == [(1704153600, "b", 0)]
+    assert snapshot.timeline_from("g2", ()) == []
+
+
+def test_reads_match_the_json_store(db_dir):
+    json_store = DataStore(db_dir, fsync=False)
+    mapped = MappedStore(db_dir, fsync=False)
+
+    for name, collection in json_store.collections.items():
+        by_key = {row[collection.key]: row for row in json_store.all(name)}
+        assert {row[collection.key]: row for row in mapped.all(name)} == by_key
+        assert all(mapped.get(name, key) == row and mapped.version(name, key) == json_store.version(name, key)
+                   for key, row in by_key.items())
+    assert mapped.find("accounts", "user_id", "user-001") == json_store.find("accounts", "user_id", "user-001")
+    since = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    for user_id in ("user-001", "user-002", "user-003"):
+        listed = list(json_store.iter_transactions_for_user(user_id))
+        assert list(mapped.iter_transactions_for_user(user_id)) == listed
+        assert list(mapped.iter_transactions_for_user(user_id, since=since)) == \
+            list(json_store.iter_transactions_for_user(user_id, since=since))
+        position = (datetime.fromisoformat(listed[5]["date"].replace("Z", "+00:00")), listed[5]["transaction_id"])
+        assert list(mapped.iter_transactions_for_user(user_id, after=position)) == listed[6:]
+        assert list(mapped.iter_dated_transactions_for_user(user_id)) == \
+            list(json_store.iter_dated_transactions_for_user(user_id))
+
+
+def test_workers_share_writes_and_versions(db_dir):
+    first, second = MappedStore(db_dir, fsync=False), MappedStore(db_dir, fsync=False)
+    first.load_all()
+    second.load_all()
+    count = len(first.all("transactions"))
+    changes = []
+    second.subscribe(lambda name, old, new: changes.append((name, old is not None, new is not None)))
+
+    first.insert("transactions", transaction("shared-1"), expected_version=0)
+    updated = {**second.get("transactions", "txn_id_001"), "amount": 12.5}
+    second.replace("transactions", "txn_id_001", updated, expected_version=first.version("transactions", "txn_id_001"))
+    first.delete("transactions", "txn_id_002")
+
+    assert second.get("transactions", "shared-1") == transaction("shared-1")
+    assert first.get("transactions", "txn_id_001") == updated
+    assert second.get("transactions", "txn_id_002") is None
+    assert ("transactions", False, True) in changes and ("transactions", True, False) in changes
+    for key in ("shared-1", "txn_id_001", "txn_id_003"):
+        assert first.version("transactions", key) == second.version("transactions", key)
+    # A version read from one worker is checked by the other
+    with pytest.raises(ConflictError):
+        first.replace("transactions", "txn_id_001", updated, expected_version=1)
+
+    # After a compaction the other worker remaps; nothing changed, so its views are not told to reload
+    changes.clear()
+    first.compact("transactions")
+    assert second.get("transactions", "shared-1") == transaction("shared-1")
+    assert second.revision("transactions") == first.revision("transactions")
+    assert second.version("transactions", "txn_id_001") == first.version("transactions", "txn_id_001")
+    assert changes == []
+    # Revisions count alike in both workers, so their ETags may be shared
+    assert second.instance_id == first.instance_id
+
+    reopened = MappedStore(db_dir, fsync=False)
+    assert reopened.get("transactions", "txn_id_001") == updated and reopened.get("transactions", "txn_id_002") is None
+    # One row inserted and one deleted
+    assert len(reopened.all("transactions")) == count
+    assert [row["transaction_id"] for row in reopened.iter_transactions_for_user("user-001")] == \
+        [row["transaction_id"] for row in first.iter_transactions_for_user("user-001")]
+
+
+def test_conversion_follows_the_json_files(db_dir):
+    writer = DataStore(db_dir, fsync=False)
+    writer.insert("transactions", transaction("journaled-1"))
+    counts = convert_json(db_dir)
+    assert counts["transactions"] == len(writer.all("transactions"))
+
+    # The journal was folded into the JSON file before converting, so it is not applied twice
+    mapped = MappedStore(db_dir, fsync=False)
+    assert mapped.get("transactions", "journaled-1") == transaction("journaled-1")
+    reloaded = DataStore(db_dir, fsync=False)
+    assert mapped.version("transactions", "txn_id_001") == reloaded.version("transactions", "txn_id_001")
+    mapped.insert("transactions", transaction("journaled-2"))
+    series = mapped.instance_id
+
+    # Replacing the JSON file makes the next worker convert it again, then replay the journal
+    path = os.path.join(db_dir, "users.json")
+    with open(path) as f:
+        users = f.read()
+    with open(path, "w") as f:
+        f.write(users.replace("user-001", "user-101"))
+    reopened = MappedStore(db_dir, fsync=False)
+    assert reopened.instance_id != series
+    assert reopened.get("users", "user-101") is not None and reopened.get("users", "user-001") is None
+    assert reopened.get("transactions", "journaled-2") == transaction("journaled-2")
+
+
+def test_compacted_writes_are_not_converted_away(db_dir):
+    convert_json(db_dir)
+    mapped = MappedStore(db_dir, fsync=False)
+    mapped.insert("transactions", transaction("compacted-1"))
+    mapped.compact("transactions")
+    mapped.insert("transactions", transaction("journaled-1"))
+
+    # Converting again writes both back to the JSON file first
+    convert_json(db_dir)
+    assert DataStore(db_dir, fsync=False).get("transactions", "compacted-1") == transaction("compacted-1")
+    reopened = MappedStore(db_dir, fsync=False)
+    assert reopened.get("transactions", "compacted-1") == transaction("compacted-1")
+    assert reopened.get("transactions", "journaled-1") == transaction("journaled-1")
+
+    # Once the JSON file is replaced as well, the snapshot is kept, and conversion refuses
+    reopened.insert("transactions", transaction("compacted-2"))
+    reopened.compact("transactions")
+    path = os.path.join(db_dir, "transactions.json")
+    with open(path) as f:
+        rows = f.read()
+    with open(path, "w") as f:
+        f.write(rows.replace("Coffee", "Tea"))
+    assert MappedStore(db_dir, fsync=False).get("transactions", "compacted-2") == transaction("compacted-2")
+    with pytest.raises(RuntimeError):
+        convert_json(db_dir)
+    assert MappedStore(db_dir, fsync=False).get("transactions", "compacted-2") == transaction("compacted-2")
+
+
+def test_instance_id_is_kept_until_a_remap(db_dir, monkeypatch):
+    first = MappedStore(db_dir, fsync=False)
+    second = MappedStore(db_dir, fsync=False)
+    series = first.instance_id
+
+    # Not derived from the snapshots again on every read
+    with monkeypatch.context() as m:
+        m.setattr(first.collections["users"], "snapshot", None)
+        assert first.instance_id == series
+
+    second.insert("transactions", transaction("shared-1"))
+    second.compact("transactions")
+    assert first.get("transactions", "shared-1") == transaction("shared-1")
+    assert first.series is None
+    assert first.instance_id == series == second.instance_id
+
+
+def test_transactions_see_other_workers_writes(db_dir):
+    first, second = MappedStore(db_dir, fsync=False), MappedStore(db_dir, fsync=False)
+    meeting = {"meeting_id": "meet-1", "user_id": "user-001", "advisor_id": "adv-mortgage-001",
+               "advisor_name": "Alice Johnson", "advisor_type": "Mortgage", "meeting_time": "2030-01-07T10:00:00Z"}
+    calendars = [get_advisor_calendar(first), get_advisor_calendar(second)]
+    overlapping = {**meeting, "meeting_id": "meet-2", "meeting_time": "2030-01-07T10:30:00Z"}
+    assert [calendar.conflict(overlapping) for calendar in calendars] == [None, None]
+
+    with first.transaction("advisors", "meetings"):
+        assert calendars[0].conflict(meeting) is None
+        first.insert("meetings", meeting, expected_version=0)
+
+    # The second worker's calendar was built before the booking and hears of it once it takes the locks
+    with second.transaction("advisors", "meetings"):
+        assert calendars[1].conflict(overlapping) == "meet-1"
+        assert second.version("meetings", "meet-1") == first.version("meetings", "meet-1")
+    # Reads outside a transaction catch up as well
+    first.delete("meetings", "meet-1")
+    assert calendars[1].conflict(overlapping) is None
+
+
+def test_processes_serialize_read_modify_writes(db_dir):
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from core.mapped_store import MappedStore\n"
+        "store = MappedStore(sys.argv[2], compact_threshold=25, fsync=False)\n"
+        "for _ in range(40):\n"
+        "    store.next_sequence('counter', lambda: 0)\n"
+    )
+    workers = [subprocess.Popen([sys.executable, "-c", script, CODE_DIR, db_dir]) for _ in range(4)]
+    assert [worker.wait(timeout=60) for worker in workers] == [0, 0, 0, 0]
+    assert MappedStore(db_dir, fsync=False).get("sequences", "counter") == {"prefix": "counter", "last": 160}
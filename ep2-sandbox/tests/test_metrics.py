@@ -0,0 +1,82 @@
+# tests/test_metrics.py
+
+import re
+
+from fastapi.testclient import TestClient
+
+from core.metrics import LATENCY_BUCKETS, Metrics, RequestTimings, current_timings
+from main import app
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{.*\})? (\S+)$')
+
+
+def scrape(client):
+    """Samples of /metrics as {(name, labels): value}."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[(name, labels or "")] = float(value)
+    return samples
+
+
+def test_routes_are_labelled_by_template(store):
+    client = TestClient(app)
+    route = '{method="GET",route="/api/users/{user_id}/transactions"'
+    before = scrape(client)
+    for user_id in ("user-001", "user-002"):
+        client.get(f"/api/users/{user_id}/transactions", params={"history": 3650})
+    client.get("/api/users/user-001/transactions", headers={"Accept": "application/x-ndjson"})
+    client.get("/no/such/route")
+    after = scrape(client)
+
+    def delta(name, labels):
+        return after.get((name, labels), 0) - before.get((name, labels), 0)
+
+    assert delta("http_requests_total", route + ',status="200"}') == 3
+    assert delta("http_requests_total", '{method="GET",route="unmatched",status="404"}') == 1
+    assert delta("http_request_duration_seconds_count", route + "}") == 3
+    assert delta("http_response_size_bytes_sum", route + "}") > 0
+    for phase in ("storage", "handler", "serialization"):
+        assert delta("http_request_phase_seconds_count", route + f',phase="{phase}"}}') == 3
+    assert delta("http_request_phase_seconds_sum", route + ',phase="storage"}') > 0
+
+
+def test_request_sizes_count_bodies(store):
+    client = TestClient(app)
+    route = '{method="POST",route="/api/goals"}'
+    before = scrape(client).get(("http_request_size_bytes_sum", route), 0)
+    body = b'{"user_id": "user-001", "description": "Boat", "target_amount": 100.0, ' \
+           b'"target_date": "2030-01-01", "current_amount_saved": 0.0}'
+    assert client.post("/api/goals", content=body, headers={"Content-Type": "application/json"}).status_code == 201
+    assert scrape(client)[("http_request_size_bytes_sum", route)] - before == len(body)
+
+
+def test_storage_time_is_counted_once(store):
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        rows = list(store.iter_transactions_for_user("user-001"))
+        store.next_sequence("test:", lambda: 0)
+    finally:
+        current_timings.reset(token)
+    assert rows and timings.storage > 0 and not timings.in_storage
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    metrics.started()
+    metrics.record("GET", '/a"b', 200, 0.003, 0, 10, {"storage": 0.001})
+    metrics.started()
+    metrics.record("GET", '/a"b', 500, 20.0, 0, 10, {})
+    lines = metrics.render().splitlines()
+    buckets = [line for line in lines if line.startswith("http_request_duration_seconds_bucket")]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 2 and counts[0] == 0
+    assert buckets[-1].startswith('http_request_duration_seconds_bucket{method="GET",route="/a\\"b",le="+Inf"}')
+    assert "http_requests_in_progress 0" in lines
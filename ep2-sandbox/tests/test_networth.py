@@ -0,0 +1,70 @@
+# tests/test_networth.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.networth import NetWorthView, get_net_worth_view
+from main import app
+
+
+def summed(store, user_id):
+    return sum(acc["balance"] for acc in store.find("accounts", "user_id", user_id))
+
+
+def test_matches_sum_of_balances(store):
+    view = get_net_worth_view(store)
+    for user in store.all("users"):
+        net_worth, count = view.get(user["user_id"])
+        assert net_worth == summed(store, user["user_id"])
+        assert count == len(store.find("accounts", "user_id", user["user_id"]))
+    assert view.get("user-missing") == (0.0, 0)
+
+
+def test_follows_account_writes(store):
+    view = get_net_worth_view(store)
+    view.get("user-001")
+
+    account = store.get("accounts", "acc-mw-c-001")
+    store.replace("accounts", "acc-mw-c-001", {**account, "balance": account["balance"] + 0.1})
+    store.insert("accounts", {**account, "account_id": "acc-mw-c-002", "balance": 0.2})
+    store.replace("accounts", "acc-mw-c-002", {**account, "account_id": "acc-mw-c-002", "user_id": "user-002",
+                                               "balance": 0.3})
+    store.delete("accounts", "acc-mw-d-006")
+    assert not view.stale
+
+    for user_id in ("user-001", "user-002"):
+        assert view.get(user_id)[0] == pytest.approx(summed(store, user_id))
+        assert view.get(user_id) == NetWorthView(store).get(user_id)
+
+
+def test_rebuild_finishes_under_steady_writes(store):
+    class Overtaken(NetWorthView):
+        builds = 0
+
+        def build(self, store):
+            state = super().build(store)
+            self.builds += 1
+            if self.builds <= self.rebuild_attempts:
+                # A write lands after every read of the store
+                account = store.get("accounts", "acc-mw-c-001")
+                store.replace("accounts", "acc-mw-c-001", {**account, "balance": account["balance"] + 1})
+            return state
+
+    view = Overtaken(store)
+    net_worth, _ = view.get("user-001")
+    assert view.builds == view.rebuild_attempts + 1 and not view.stale
+    assert net_worth == pytest.approx(summed(store, "user-001"))
+
+
+def test_endpoints_read_the_view(store):
+    client = TestClient(app)
+    response = client.post("/api/users/user-001/accounts", json={
+        "account_id": "ignored", "user_id": "ignored", "category": "asset", "type": "savings",
+        "sub_type": "savings", "description": "New savings", "balance": 2500.0,
+    })
+    assert response.status_code == 201
+
+    expected = summed(store, "user-001")
+    assert client.get("/api/users/user-001").json()["net_worth"] == expected
+    assert client.get("/api/users/user-001/networth").json() == {"net_worth": expected}
+    assert client.get("/api/users/user-404/networth").status_code == 404
@@ -0,0 +1,26 @@
+# tests/test_responses.py
+
+from fastapi.testclient import TestClient
+
+from api.models import Transaction
+from core.store import transaction_position
+from main import app
+
+
+def test_fast_path_matches_response_model(store):
+    client = TestClient(app)
+    response = client.get("/api/users/user-002/transactions", params={"history": 100000})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "ETag" in response.headers
+
+    rows = sorted(store.transactions_for_user("user-002"), key=transaction_position)
+    assert response.json() == [Transaction(**t).model_dump(mode="json") for t in rows]
+
+
+def test_fast_path_keeps_pagination_headers(store):
+    client = TestClient(app)
+    response = client.get("/api/users/user-002/transactions", params={"history": 100000, "limit": 2})
+    assert len(response.json()) == 2
+    assert response.headers["X-Next-Cursor"]
+    assert response.headers["ETag"]
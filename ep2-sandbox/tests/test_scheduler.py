@@ -0,0 +1,134 @@
+# tests/test_scheduler.py
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.scheduler import ScheduleRunner, leg_transaction_id
+
+SCHEDULE = {
+    "user_id": "user-001", "schedule_id": "schedule-test", "source_account_id": "acc-mw-c-001",
+    "destination_account_id": "acc-mw-s-002", "description": "Savings", "frequency": "weekly",
+    "start_date": "2030-01-07T00:00:00Z", "end_date": "2030-12-31T00:00:00Z", "amount": 25.0,
+}
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def store(store):
+    # Only the test schedule, so counts are exact
+    for schedule in store.all("schedules"):
+        store.delete("schedules", schedule["schedule_id"])
+    return store
+
+
+def balances(store):
+    return store.get("accounts", "acc-mw-c-001")["balance"], store.get("accounts", "acc-mw-s-002")["balance"]
+
+
+def test_books_due_occurrences_once(store):
+    clock = Clock(datetime(2030, 1, 6, 12, tzinfo=timezone.utc))
+    runner = ScheduleRunner(store, clock=clock)
+    store.insert("schedules", SCHEDULE)
+    checking, savings = balances(store)
+
+    assert runner.run_due() == 0
+    assert runner.next_due() is not None
+
+    clock.now = datetime(2030, 1, 7, 0, 1, tzinfo=timezone.utc)
+    assert runner.run_due() == 2
+    assert runner.run_due() == 0
+    out = store.get("transactions", leg_transaction_id("schedule-test", clock.now.date(), "out"))
+    assert out["amount"] == -25.0 and out["date"] == "2030-01-07T00:00:00Z"
+    assert balances(store) == (checking - 25.0, savings + 25.0)
+
+    # A second runner (e.g. after a restart) does not book it again
+    assert ScheduleRunner(store, clock=clock).run_due() == 0
+    assert balances(store) == (checking - 25.0, savings + 25.0)
+
+
+def test_catch_up_after_downtime(store):
+    clock = Clock(datetime(2030, 1, 1, tzinfo=timezone.utc))
+    store.insert("schedules", SCHEDULE)
+    ScheduleRunner(store, clock=clock).run_due()
+    checking, _ = balances(store)
+
+    # Without catch-up, the Mondays missed while down (7th, 14th, 21st, 28th) are
+    # skipped and only an occurrence due today is booked
+    clock.now = datetime(2030, 1, 22, tzinfo=timezone.utc)
+    assert ScheduleRunner(store, catch_up=False, clock=clock).run_due() == 0
+    clock.now = datetime(2030, 2, 4, tzinfo=timezone.utc)
+    assert ScheduleRunner(store, catch_up=False, clock=clock).run_due() == 2
+    assert balances(store)[0] == checking - 25.0
+
+    # With catch-up, every occurrence since the last run is booked: the 11th, 18th and 25th
+    clock.now = datetime(2030, 2, 26, tzinfo=timezone.utc)
+    assert ScheduleRunner(store, clock=clock).run_due() == 6
+    assert balances(store)[0] == checking - 100.0
+
+
+def test_schedule_changes_reschedule(store):
+    clock = Clock(datetime(2030, 1, 7, tzinfo=timezone.utc))
+    runner = ScheduleRunner(store, clock=clock)
+    store.insert("schedules", {**SCHEDULE, "start_date": "2030-01-08T00:00:00Z"})
+    assert runner.run_due() == 0
+    store.replace("schedules", "schedule-test", SCHEDULE)
+    assert runner.run_due() == 2
+    store.delete("schedules", "schedule-test")
+    clock.now += timedelta(days=7)
+    assert runner.run_due() == 0
+    assert runner.next_due() is None
+
+
+def test_schedules_starting_years_ahead(store):
+    clock = Clock(datetime(2027, 3, 1, tzinfo=timezone.utc))
+    runner = ScheduleRunner(store, clock=clock)
+    store.insert("schedules", {**SCHEDULE, "frequency": "yearly"})
+    assert runner.run_due() == 0
+    assert runner.next_due() == (datetime(2030, 1, 7).date() - datetime(1970, 1, 1).date()).days
+
+    clock.now = datetime(2030, 1, 7, 8, tzinfo=timezone.utc)
+    assert runner.run_due() == 2
+    # The next yearly occurrence would fall after the end date
+    assert runner.next_due() is None
+
+
+def test_a_failing_schedule_does_not_stop_the_others(store):
+    clock = Clock(datetime(2030, 1, 7, tzinfo=timezone.utc))
+    runner = ScheduleRunner(store, clock=clock)
+    store.insert("schedules", {**SCHEDULE, "schedule_id": "schedule-broken", "amount": None})
+    store.insert("schedules", SCHEDULE)
+    assert runner.run_due() == 2
+    assert runner.failed == {"schedule-broken"}
+
+    # Fixed, it is booked on the next run
+    store.replace("schedules", "schedule-broken", {**SCHEDULE, "schedule_id": "schedule-broken"})
+    assert runner.run_due() == 2
+    assert not runner.failed
+
+
+def test_background_thread_wakes_on_new_schedule(store):
+    clock = Clock(datetime(2030, 1, 7, 9, tzinfo=timezone.utc))
+    runner = ScheduleRunner(store, clock=clock)
+    runner.start()
+    try:
+        store.insert("schedules", SCHEDULE)
+        deadline = time.monotonic() + 5
+        while store.get("transactions", leg_transaction_id("schedule-test", clock.now.date(), "in")) is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        runner.stop()
@@ -0,0 +1,153 @@
+# tests/test_spending.py
+
+import random
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.spending import SpendingIndex, get_spending_index
+from core.sqlite_store import SQLiteStore, import_json
+from core.store import parse_date
+from main import app
+
+
+def brute_force(store, user_id, group_by, start=None, end=None):
+    groups = {}
+    for t in store.transactions_for_user(user_id):
+        day = parse_date(t["date"]).date()
+        if t["amount"] >= 0 or (start is not None and day < start) or (end is not None and day >= end):
+            continue
+        key = {"category": t["category"], "merchant": t["merchant_id"], "month": day.strftime("%Y-%m")}[group_by]
+        total, count = groups.get(key, (0.0, 0))
+        groups[key] = (total - t["amount"], count + 1)
+    return groups
+
+
+def assert_matches(index, store, user_id, group_by, start=None, end=None):
+    expected = brute_force(store, user_id, group_by, start, end)
+    result = index.spending(user_id, group_by, start=start, end=end)
+    assert {key: count for key, _, count in result} == {key: count for key, (_, count) in expected.items()}
+    for key, total, _ in result:
+        assert total == pytest.approx(expected[key][0])
+
+
+def test_ranges_match_brute_force(store):
+    rng = random.Random(5)
+    index = get_spending_index(store)
+    days = sorted(parse_date(t["date"]).date() for t in store.transactions_for_user("user-001"))
+    for group_by in ("category", "merchant", "month"):
+        assert_matches(index, store, "user-001", group_by)
+        for _ in range(30):
+            # Bounds on and off month starts, within one month and across several
+            start = days[0] + timedelta(days=rng.randint(-40, (days[-1] - days[0]).days))
+            end = start + timedelta(days=rng.choice([0, 3, 30, 75, 400]))
+            if rng.random() < 0.3:
+                start = start.replace(day=1)
+            assert_matches(index, store, "user-001", group_by, start, end)
+            assert_matches(index, store, "user-001", group_by, start=start)
+            assert_matches(index, store, "user-001", group_by, end=end)
+
+
+def test_incremental_updates_match_rebuild(store):
+    index = get_spending_index(store)
+    index.spending("user-001", "category")
+    accounts = store.find("accounts", "user_id", "user-001")
+    spending = {"transaction_id": "sp-1", "account_id": accounts[0]["account_id"], "merchant_id": "merch_777",
+                "date": "2025-02-14T12:00:00Z", "description": "Flowers", "amount": -40.0, "category": "Gifts"}
+    store.insert("transactions", spending)
+    store.insert("transactions", {**spending, "transaction_id": "sp-2", "amount": 25.0})
+    store.replace("transactions", "sp-1", {**spending, "amount": -60.0})
+    existing = next(t for t in store.transactions_for_user("user-001") if t["amount"] < 0)
+    store.delete("transactions", existing["transaction_id"])
+
+    for group_by in ("category", "merchant", "month"):
+        assert index.spending("user-001", group_by) == SpendingIndex(store).spending("user-001", group_by)
+    assert ("Gifts", 60.0, 1) in index.spending("user-001", "category", start=date(2025, 2, 1), end=date(2025, 3, 1))
+    # Emptied groups disappear rather than staying at zero
+    store.delete("transactions", "sp-1")
+    assert "merch_777" not in [key for key, _, _ in index.spending("user-001", "merchant")]
+
+
+def test_totals_do_not_drift(store):
+    index = get_spending_index(store)
+    before = index.spending("user-001", "category")
+    cents = {"transaction_id": "sp-cents", "account_id": "acc-mw-c-001", "merchant_id": "m",
+             "date": "2023-01-01T00:00:00Z", "description": "Round-up", "category": "Savings"}
+    rng = random.Random(7)
+    for i in range(200):
+        store.insert("transactions", {**cents, "transaction_id": f"sp-cents-{i}",
+                                      "amount": -round(rng.uniform(0.01, 500), 2)})
+    for group_by in ("category", "merchant", "month"):
+        assert index.spending("user-001", group_by) == SpendingIndex(store).spending("user-001", group_by)
+    for i in range(200):
+        store.delete("transactions", f"sp-cents-{i}")
+    assert not index.stale
+    # Exactly back where it started, as a rebuild would be
+    assert index.spending("user-001", "category") == before == SpendingIndex(store).spending("user-001", "category")
+
+
+def test_malformed_dates_are_skipped(store):
+    index = get_spending_index(store)
+    before = index.spending("user-001", "month")
+    bad = {"transaction_id": "sp-bad", "account_id": "acc-mw-c-001", "merchant_id": "m",
+           "date": "yesterday", "description": "Typo", "amount": -10.0, "category": "Food"}
+    store.insert("transactions", bad)
+    assert index.spending("user-001", "month") == before
+    store.replace("transactions", "sp-bad", {**bad, "date": "2031-06-01T00:00:00Z"})
+    assert index.spending("user-001", "month", start=date(2031, 6, 1)) == [("2031-06", 10.0, 1)]
+    store.replace("transactions", "sp-bad", bad)
+    assert index.spending("user-001", "month") == SpendingIndex(store).spending("user-001", "month") == before
+    # A rebuild with the row still stored skips it too
+    assert TestClient(app).get("/api/users/user-001/spending").status_code == 200
+
+
+def test_null_amounts_are_skipped(store):
+    index = get_spending_index(store)
+    before = index.spending("user-001", "category")
+    bad = {"transaction_id": "sp-null", "account_id": "acc-mw-c-001", "merchant_id": "m",
+           "date": "2031-06-15T00:00:00Z", "description": "Hand edited", "amount": None, "category": "Food"}
+    store.insert("transactions", bad)
+    store.insert("transactions", {**bad, "transaction_id": "sp-text", "amount": "-12.50"})
+    assert index.spending("user-001", "category") == before
+    # A range starting mid-month, whose edge used to be read apart from the rest
+    assert index.spending("user-001", "month", start=date(2031, 6, 10)) == []
+    store.replace("transactions", "sp-null", {**bad, "amount": -10.0})
+    assert index.spending("user-001", "month", start=date(2031, 6, 1)) == [("2031-06", 10.0, 1)]
+    store.replace("transactions", "sp-null", bad)
+    assert index.spending("user-001", "category") == SpendingIndex(store).spending("user-001", "category") == before
+    assert TestClient(app).get("/api/users/user-001/spending").status_code == 200
+
+
+def test_spending_endpoint(store):
+    client = TestClient(app)
+    response = client.get("/api/users/user_001/spending", params={"group_by": "month", "start": "2024-03-15"})
+    assert response.status_code == 200
+    body = response.json()
+    expected = brute_force(store, "user-001", "month", start=date(2024, 3, 15))
+    assert [group["key"] for group in body["groups"]] == sorted(expected)
+    assert body["total"] == pytest.approx(sum(total for total, _ in expected.values()))
+    assert body["start"] == "2024-03-15" and body["end"] is None
+
+    by_category = client.get("/api/users/user-001/spending").json()["groups"]
+    assert [g["total"] for g in by_category] == sorted((g["total"] for g in by_category), reverse=True)
+    assert client.get("/api/users/user-001/spending", params={"group_by": "day"}).status_code == 422
+    assert client.get("/api/users/user-999/spending").status_code == 404
+
+
+def test_other_workers_writes_reload_only_the_user_read(db_dir, tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.sqlite3")
+    import_json(db_dir, path)
+    worker, other = SQLiteStore(path), SQLiteStore(path)
+    index = SpendingIndex(worker)
+    index.spending("user-001", "category")
+
+    other.insert("transactions", {"transaction_id": "sp-remote", "account_id": "acc-mw-c-001", "merchant_id": "m",
+                                  "date": "2031-06-15T00:00:00Z", "description": "Flowers", "amount": -40.0,
+                                  "category": "Gifts"})
+
+    def full_scan(name):
+        raise AssertionError(f"read every row of {name}")
+
+    monkeypatch.setattr(worker, "all", full_scan)
+    assert index.spending("user-001", "month", start=date(2031, 6, 10)) == [("2031-06", 40.0, 1)]
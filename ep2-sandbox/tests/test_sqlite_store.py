@@ -0,0 +1,141 @@
+# tests/test_sqlite_store.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.networth import get_net_worth_view
+from core.sqlite_store import SQLiteStore, import_json
+from core.store import DataStore, set_store
+from main import app
+
+READ_ENDPOINTS = [
+    "/api/users",
+    "/api/users/user-001",
+    "/api/users/user-002/accounts",
+    "/api/users/user-001/transactions?history=100000",
+    "/api/users/user-003/transactions?history=400",
+    "/api/users/user-001/debts",
+    "/api/users/user-002/investments",
+    "/api/users/user-003/networth",
+    "/api/users/user-001/cashflow",
+    "/api/users/user-001/average_cashflow",
+    "/api/users/user-003/schedules",
+    "/api/partners",
+    "/api/partners/user/user-002",
+    "/api/advisors",
+]
+
+
+@pytest.fixture
+def sqlite_path(db_dir, tmp_path):
+    path = str(tmp_path / "cymbal.sqlite3")
+    import_json(db_dir, path)
+    return path
+
+
+def responses_for(store):
+    set_store(store)
+    try:
+        client = TestClient(app)
+        return {url: (r.status_code, r.json()) for url in READ_ENDPOINTS for r in [client.get(url)]}
+    finally:
+        set_store(None)
+
+
+def test_import_copies_every_row(db_dir, sqlite_path):
+    """The importer loads every collection from the JSON files."""
+    source = DataStore(db_dir)
+    target = SQLiteStore(sqlite_path)
+    for name in source.collections:
+        assert len(target.all(name)) == len(source.all(name))
+
+
+def test_routers_match_json_backend(db_dir, sqlite_path):
+    """Every read endpoint returns the same data from either backend."""
+    json_responses = responses_for(DataStore(db_dir))
+    sqlite_responses = responses_for(SQLiteStore(sqlite_path))
+
+    for url in READ_ENDPOINTS:
+        status, body = json_responses[url]
+        assert sqlite_responses[url][0] == status, url
+        if isinstance(body, list) and "transactions" in url:
+            key = lambda t: t["transaction_id"]
+            assert sorted(sqlite_responses[url][1], key=key) == sorted(body, key=key), url
+        else:
+            assert sqlite_responses[url][1] == body, url
+
+
+def test_date_window_uses_index(sqlite_path):
+    """The history window is answered by a range scan on transactions(account_id, date)."""
+    store = SQLiteStore(sqlite_path)
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = store.transactions_for_user("user-001", since=since)
+    assert rows and all(row["date"] >= "2025-01-01" for row in rows)
+
+    plan = store.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT t.body FROM accounts a JOIN transactions t ON t.account_id = a.account_id "
+        "WHERE a.user_id = ? AND t.date >= ?", ("user-001", "2025-01-01T00:00:00Z")
+    ).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert "idx_transactions_account_date" in details
+    assert "idx_accounts_user_category_type" in details
+
+
+def test_writes(sqlite_path):
+    """Insert, replace and delete behave like the JSON backend."""
+    store = SQLiteStore(sqlite_path)
+    schedule = {"schedule_id": "s-1", "user_id": "user-001", "amount": 10.0}
+    store.insert("schedules", schedule)
+    assert store.find("schedules", "user_id", "user-001") == [schedule]
+
+    assert store.replace("schedules", "missing", schedule) is None
+    updated = {**schedule, "amount": 20.0}
+    store.replace("schedules", "s-1", updated)
+    assert store.get("schedules", "s-1") == updated
+
+    assert store.delete("schedules", "s-1") == updated
+    assert store.delete("schedules", "s-1") is None
+
+    later = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    store.insert("transactions", {"transaction_id": "t-new", "account_id": "acc-mw-c-001", "date": later,
+                                  "merchant_id": "m", "description": "d", "amount": 1, "category": "Food"})
+    recent = store.transactions_for_user("user-001", since=datetime.now(timezone.utc))
+    assert [t["transaction_id"] for t in recent] == ["t-new"]
+
+
+def test_unparseable_dates_import_like_json(db_dir, tmp_path):
+    """A transaction whose date does not parse is kept, but out of the date-ordered reads, on both backends."""
+    bad = {"transaction_id": "t-bad", "account_id": "acc-mw-c-001", "date": "yesterday",
+           "merchant_id": "m", "description": "d", "amount": 1, "category": "Food"}
+    DataStore(db_dir, fsync=False).insert("transactions", bad)
+    path = str(tmp_path / "bad.sqlite3")
+    import_json(db_dir, path)
+
+    since = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    for store in (DataStore(db_dir, fsync=False), SQLiteStore(path)):
+        assert store.get("transactions", "t-bad") == bad
+        assert "t-bad" in [t["transaction_id"] for t in store.transactions_for_user("user-001")]
+        assert "t-bad" not in [t["transaction_id"] for t in store.transactions_for_user("user-001", since=since)]
+        assert "t-bad" not in [t["transaction_id"] for t in store.iter_transactions_for_user("user-001")]
+
+
+def test_processes_share_revisions(sqlite_path):
+    """Two stores on one database agree on revisions and see each other's writes."""
+    first, second = SQLiteStore(sqlite_path), SQLiteStore(sqlite_path)
+    assert first.instance_id == second.instance_id
+    view = get_net_worth_view(second)
+    worth, count = view.get("user-001")
+
+    account = {"account_id": "acc-shared", "user_id": "user-001", "balance": 250.0}
+    first.insert("accounts", account)
+    assert second.revision("accounts") == first.revision("accounts")
+    assert view.get("user-001") == (pytest.approx(worth + 250.0), count + 1)
+
+    # Deletes move the revision too, and a write after a foreign one still reaches the view
+    before = first.revision("accounts")
+    first.delete("accounts", "acc-shared")
+    assert second.revision("accounts") > before
+    second.insert("accounts", {**account, "account_id": "acc-own", "balance": 5.0})
+    assert view.get("user-001") == (pytest.approx(worth + 5.0), count + 1)
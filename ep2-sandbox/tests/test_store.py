@@ -0,0 +1,257 @@
+# tests/test_store.py
+
+import json
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.store import DataStore, parse_date, transaction_position
+from main import app
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(app)
+
+
+def read_json(db_dir, file_name):
+    with open(os.path.join(db_dir, file_name), "r") as f:
+        return json.load(f)
+
+
+def test_indexes_match_linear_scan(store, db_dir):
+    """Indexed lookups return exactly what a scan of the JSON file would."""
+    accounts = read_json(db_dir, "accounts.json")
+    transactions = read_json(db_dir, "transactions.json")
+
+    for user_id in {acc["user_id"] for acc in accounts}:
+        expected_accounts = [acc for acc in accounts if acc["user_id"] == user_id]
+        assert store.find("accounts", "user_id", user_id) == expected_accounts
+
+        account_ids = {acc["account_id"] for acc in expected_accounts}
+        expected_transactions = [t for t in transactions if t["account_id"] in account_ids]
+        assert sorted(store.transactions_for_user(user_id), key=lambda t: t["transaction_id"]) == \
+            sorted(expected_transactions, key=lambda t: t["transaction_id"])
+
+    assert store.get("accounts", accounts[0]["account_id"]) == accounts[0]
+    assert store.get("accounts", "acc-does-not-exist") is None
+
+
+def test_date_filters_match_linear_scan(store, db_dir):
+    """The date-sorted timelines answer `since` and `after` exactly like parsing every row."""
+    accounts = read_json(db_dir, "accounts.json")
+    transactions = read_json(db_dir, "transactions.json")
+    dates = sorted(parse_date(t["date"]) for t in transactions)
+    cutoffs = [None, dates[0], dates[len(dates) // 2], dates[len(dates) // 2] + timedelta(seconds=1), dates[-1]]
+
+    for user_id in {acc["user_id"] for acc in accounts}:
+        account_ids = {acc["account_id"] for acc in accounts if acc["user_id"] == user_id}
+        ordered = sorted((t for t in transactions if t["account_id"] in account_ids), key=transaction_position)
+        for since in cutoffs:
+            expected = [t for t in ordered if since is None or parse_date(t["date"]) >= since]
+            assert sorted(store.transactions_for_user(user_id, since=since), key=transaction_position) == expected
+            assert list(store.iter_transactions_for_user(user_id, since=since)) == expected
+            for i in (0, len(expected) // 2):
+                if i < len(expected):
+                    after = transaction_position(expected[i])
+                    assert list(store.iter_transactions_for_user(user_id, since=since, after=after)) == expected[i + 1:]
+
+
+def test_timelines_follow_writes(store):
+    """Inserted, re-dated and deleted transactions move in the date index with the row."""
+    account_id = store.find("accounts", "user_id", "user-001")[0]["account_id"]
+    row = {
+        "transaction_id": "txn-timeline", "account_id": account_id, "date": "2099-01-01T00:00:00Z",
+        "description": "Future", "amount": -1.0, "category": "Shopping", "merchant": "Test",
+    }
+    future = parse_date("2098-01-01T00:00:00Z")
+
+    store.insert("transactions", row)
+    assert [t["transaction_id"] for t in store.transactions_for_user("user-001", since=future)] == ["txn-timeline"]
+
+    store.replace("transactions", "txn-timeline", {**row, "date": "2000-01-01T00:00:00+05:00"})
+    assert store.transactions_for_user("user-001", since=future) == []
+    assert next(store.iter_transactions_for_user("user-001"))["transaction_id"] == "txn-timeline"
+
+    store.delete("transactions", "txn-timeline")
+    assert all(t["transaction_id"] != "txn-timeline" for t in store.iter_transactions_for_user("user-001"))
+    assert store.collections["transactions"].timelines[account_id] == \
+        sorted(store.collections["transactions"].timelines[account_id])
+
+
+def test_reloads_when_file_changes(store, db_dir):
+    """Editing a JSON file on disk is picked up on the next read."""
+    users = read_json(db_dir, "users.json")
+    assert store.get("users", "user-999") is None
+
+    users.append({**users[0], "user_id": "user-999", "name": "New User"})
+    time.sleep(0.01)
+    with open(os.path.join(db_dir, "users.json"), "w") as f:
+        json.dump(users, f)
+
+    assert store.get("users", "user-999")["name"] == "New User"
+
+
+def test_collections_load_at_startup(store):
+    with TestClient(app):
+        assert all(collection.loaded for collection in store.collections.values())
+
+
+def test_writes_persist_and_update_indexes(store, db_dir):
+    """Inserts, replaces and deletes are visible immediately and survive compaction."""
+    goal = {
+        "goal_id": "goal-test",
+        "user_id": "user-001",
+        "description": "Emergency fund",
+        "target_amount": 10000.0,
+        "target_date": "2030-01-01",
+        "current_amount_saved": 0.0,
+    }
+    store.insert("life_goals", goal)
+    assert store.find("life_goals", "user_id", "user-001") == [goal]
+
+    moved = {**goal, "user_id": "user-002"}
+    store.replace("life_goals", "goal-test", moved)
+    assert store.find("life_goals", "user_id", "user-001") == []
+    assert store.find("life_goals", "user_id", "user-002") == [moved]
+    store.compact("life_goals")
+    assert read_json(db_dir, "life_goals.json") == [moved]
+
+    assert store.delete("life_goals", "goal-test") == moved
+    assert store.delete("life_goals", "goal-test") is None
+    store.compact("life_goals")
+    assert read_json(db_dir, "life_goals.json") == []
+
+
+def test_writes_append_to_journal_not_snapshot(store, db_dir):
+    """A write appends one journal line and leaves the JSON snapshot untouched."""
+    snapshot_path = os.path.join(db_dir, "accounts.json")
+    with open(snapshot_path, "rb") as f:
+        snapshot_before = f.read()
+
+    account = {**store.get("accounts", "acc-mw-c-001"), "balance": 1.0}
+    store.replace("accounts", "acc-mw-c-001", account)
+
+    with open(snapshot_path, "rb") as f:
+        assert f.read() == snapshot_before
+    with open(os.path.join(db_dir, "accounts.journal"), "r") as f:
+        lines = f.readlines()
+    assert [json.loads(line) for line in lines] == [{"op": "put", "row": account}]
+
+
+def test_recovers_from_snapshot_plus_journal(store, db_dir):
+    """A fresh store replays the journal on top of the snapshot, ignoring a torn last line."""
+    account = {**store.get("accounts", "acc-mw-c-001"), "balance": 42.0}
+    store.replace("accounts", "acc-mw-c-001", account)
+    store.delete("accounts", "acc-mw-d-006")
+    with open(os.path.join(db_dir, "accounts.journal"), "a") as f:
+        f.write('{"op": "delete", "key": "acc-mw-')
+
+    recovered = DataStore(db_dir)
+    assert recovered.get("accounts", "acc-mw-c-001") == account
+    assert recovered.get("accounts", "acc-mw-d-006") is None
+
+    # The torn line was truncated, so new appends are readable again
+    recovered.delete("accounts", "acc-mw-c-001")
+    assert DataStore(db_dir).get("accounts", "acc-mw-c-001") is None
+
+
+def test_recovers_from_interrupted_compaction(store, db_dir):
+    """Entries in a journal rotated by a compaction that never finished are replayed."""
+    account = {**store.get("accounts", "acc-mw-c-001"), "balance": 7.0}
+    store.replace("accounts", "acc-mw-c-001", account)
+    store.collections["accounts"].journal.rotate()
+
+    assert DataStore(db_dir).get("accounts", "acc-mw-c-001") == account
+
+
+def test_failed_compaction_keeps_its_entries(store, db_dir, monkeypatch):
+    """A snapshot write that fails leaves compaction enabled and its rotated journal intact."""
+    def no_space(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    first = {**store.get("accounts", "acc-mw-c-001"), "balance": 1.0}
+    store.replace("accounts", "acc-mw-c-001", first)
+    monkeypatch.setattr("core.store.write_snapshot", no_space)
+    with pytest.raises(OSError):
+        store.compact("accounts")
+    assert not store.collections["accounts"].compacting
+
+    # The next rotation adds to the leftover journal instead of replacing it
+    second = {**store.get("accounts", "acc-mw-d-006"), "balance": 2.0}
+    store.replace("accounts", "acc-mw-d-006", second)
+    with pytest.raises(OSError):
+        store.compact("accounts")
+    recovered = DataStore(db_dir)
+    assert recovered.get("accounts", "acc-mw-c-001") == first
+    assert recovered.get("accounts", "acc-mw-d-006") == second
+
+    monkeypatch.undo()
+    store.compact("accounts")
+    assert not os.path.exists(os.path.join(db_dir, "accounts.journal.compacting"))
+    assert {first["account_id"]: first, second["account_id"]: second}.items() <= \
+        {a["account_id"]: a for a in read_json(db_dir, "accounts.json")}.items()
+
+
+def test_journal_is_compacted_after_threshold(db_dir):
+    """Crossing the threshold folds the journal into the snapshot in the background."""
+    store = DataStore(db_dir, compact_threshold=5, fsync=False)
+    for i in range(5):
+        store.insert("schedules", {"schedule_id": f"s-{i}", "user_id": "user-001"})
+
+    deadline = time.time() + 5
+    while store.collections["schedules"].compacting and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert not os.path.exists(os.path.join(db_dir, "schedule.journal"))
+    snapshot_ids = {s["schedule_id"] for s in read_json(db_dir, "schedule.json")}
+    assert {f"s-{i}" for i in range(5)} <= snapshot_ids
+    assert len(store.find("schedules", "user_id", "user-001")) == 5
+
+
+def test_account_creation_is_visible_to_reads(client):
+    """A newly created account is returned by the account and net worth endpoints."""
+    before = client.get("/api/users/user-001/networth").json()["net_worth"]
+
+    response = client.post("/api/users/user-001/accounts", json={
+        "account_id": "ignored",
+        "user_id": "ignored",
+        "category": "asset",
+        "type": "savings",
+        "sub_type": "high-yield",
+        "description": "Rainy day fund",
+        "balance": 1000.0,
+    })
+    assert response.status_code == 201
+    account_id = response.json()["account_id"]
+    assert account_id.startswith("acc-mw-s-")
+
+    account_ids = [acc["account_id"] for acc in client.get("/api/users/user-001/accounts").json()]
+    assert account_id in account_ids
+    assert client.get("/api/users/user-001/networth").json()["net_worth"] == before + 1000.0
+    assert client.get("/api/users/user-001").json()["net_worth"] == before + 1000.0
+
+
+def test_goal_lifecycle(client):
+    """Goals can be created, updated and cancelled through the API."""
+    response = client.post("/api/goals", json={
+        "user_id": "user-001",
+        "description": "Buy a condo",
+        "target_amount": 50000,
+        "target_date": "2030-01-01",
+        "current_amount_saved": 500,
+    })
+    assert response.status_code == 201
+    goal = response.json()
+
+    goal["current_amount_saved"] = 1500
+    response = client.put(f"/api/goals/{goal['goal_id']}", json=goal)
+    assert response.status_code == 200
+    assert client.get("/api/goals/user-001").json() == [goal]
+
+    assert client.delete(f"/api/goals/{goal['goal_id']}").status_code == 204
+    assert client.get("/api/goals/user-001").json() == []
+    assert client.delete(f"/api/goals/{goal['goal_id']}").status_code == 404
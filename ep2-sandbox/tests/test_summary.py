@@ -0,0 +1,66 @@
+# tests/test_summary.py
+
+import threading
+
+from fastapi.testclient import TestClient
+
+from core.sqlite_store import SQLiteStore
+from main import app
+
+
+def test_summary_matches_individual_endpoints(store):
+    client = TestClient(app)
+    summary = client.get("/api/users/user_003/summary")
+    assert summary.status_code == 200
+    body = summary.json()
+
+    assert body["profile"] == client.get("/api/users/user-003").json()
+    assert body["accounts"] == client.get("/api/users/user-003/accounts").json()
+    assert body["debts"] == client.get("/api/users/user-003/debts").json()
+    assert body["investments"] == client.get("/api/users/user-003/investments").json()
+    assert body["net_worth"] == client.get("/api/users/user-003/networth").json()["net_worth"]
+    assert body["cash_flow_last_30_days"] == client.get("/api/users/user-003/cashflow").json()["cash_flow_last_30_days"]
+    assert body["average_monthly_cash_flow"] == \
+        client.get("/api/users/user-003/average_cashflow").json()["average_monthly_cash_flow"]
+    assert body["goals"] == client.get("/api/goals/user-003").json()
+    assert body["schedules"] == client.get("/api/users/user-003/schedules").json()
+    assert len(body["schedules"]) == 2
+
+
+def test_summary_unknown_user(store):
+    assert TestClient(app).get("/api/users/user-404/summary").status_code == 404
+
+
+def test_consistent_read_blocks_writers(store):
+    written = threading.Event()
+
+    def write():
+        account = store.get("accounts", "acc-mw-c-001")
+        store.replace("accounts", "acc-mw-c-001", {**account, "balance": 0.0})
+        written.set()
+
+    with store.consistent_read():
+        before = store.get("accounts", "acc-mw-c-001")["balance"]
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert not written.wait(0.2)
+        assert store.get("accounts", "acc-mw-c-001")["balance"] == before
+    writer.join()
+    assert store.get("accounts", "acc-mw-c-001")["balance"] == 0.0
+
+
+def test_sqlite_consistent_read_is_a_snapshot(store, tmp_path):
+    sqlite_store = SQLiteStore(str(tmp_path / "cymbal.sqlite3"))
+    sqlite_store.insert_many("accounts", store.all("accounts"))
+
+    def write():
+        account = sqlite_store.get("accounts", "acc-mw-c-001")
+        sqlite_store.replace("accounts", "acc-mw-c-001", {**account, "balance": 0.0})
+
+    with sqlite_store.consistent_read():
+        before = sqlite_store.get("accounts", "acc-mw-c-001")["balance"]
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join()
+        assert sqlite_store.get("accounts", "acc-mw-c-001")["balance"] == before
+    assert sqlite_store.get("accounts", "acc-mw-c-001")["balance"] == 0.0